@@ -0,0 +1,35 @@
+import sys
+import json
+
+def compare(baseline, candidate, threshold=0.1):
+    """
+    Compares two benchmark reports. Returns one row per benchmark and scale present in
+    both, with the throughput ratio (candidate / baseline) and whether it regressed by
+    more than threshold.
+    """
+    baseline_results = {(result["benchmark"], result["scale"]): result for result in baseline["results"]}
+    rows = []
+    for result in candidate["results"]:
+        previous = baseline_results.get((result["benchmark"], result["scale"]))
+        if previous is None or not previous["ops_per_sec"]:
+            continue
+        ratio = result["ops_per_sec"] / previous["ops_per_sec"]
+        rows.append({"benchmark": result["benchmark"], "scale": result["scale"],
+                     "baseline_ops_per_sec": previous["ops_per_sec"], "ops_per_sec": result["ops_per_sec"],
+                     "ratio": ratio, "regression": ratio < 1 - threshold})
+    return rows
+
+if __name__ == "__main__":
+    if len(sys.argv) < 3:
+        print("Usage: python -m benchmarks.compare <baseline.json> <candidate.json> [threshold]")
+        sys.exit(1)
+    with open(sys.argv[1], 'r') as f:
+        baseline = json.load(f)
+    with open(sys.argv[2], 'r') as f:
+        candidate = json.load(f)
+    rows = compare(baseline, candidate, float(sys.argv[3]) if len(sys.argv) > 3 else 0.1)
+    for row in rows:
+        flag = "  REGRESSION" if row["regression"] else ""
+        print(f"{row['benchmark']:<40} {row['scale']:>8} {row['baseline_ops_per_sec']:>12.1f} -> "
+              f"{row['ops_per_sec']:>12.1f} ops/s ({row['ratio']:.2f}x){flag}")
+    sys.exit(1 if any(row["regression"] for row in rows) else 0)
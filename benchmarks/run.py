@@ -0,0 +1,162 @@
+import os
+import sys
+import json
+import time
+import shutil
+import platform
+import tempfile
+import subprocess
+import numpy as np
+from core.cache import record_cache
+from core.metadata import MetadataManager
+from core.query import Query
+from core.storage import Storage
+from vector_integration.vector_db_interface import VectorDBInterface
+from .synthetic import SyntheticData, TAGS, WORDS
+
+def measure(name, scale, operation, items, **details):
+    """
+    Calls operation(item) for every item and returns the throughput and latency
+    percentiles as a result entry.
+    """
+    latencies = []
+    start = time.perf_counter()
+    for item in items:
+        begin = time.perf_counter()
+        operation(item)
+        latencies.append(time.perf_counter() - begin)
+    seconds = time.perf_counter() - start
+    latencies = np.array(latencies) * 1e6
+    return {
+        "benchmark": name,
+        "scale": scale,
+        "ops": len(latencies),
+        "seconds": seconds,
+        "ops_per_sec": len(latencies) / seconds if seconds else float("inf"),
+        "mean_us": float(latencies.mean()) if len(latencies) else 0.0,
+        "p50_us": float(np.percentile(latencies, 50)) if len(latencies) else 0.0,
+        "p95_us": float(np.percentile(latencies, 95)) if len(latencies) else 0.0,
+        "p99_us": float(np.percentile(latencies, 99)) if len(latencies) else 0.0,
+        **details,
+    }
+
+def bench_storage(base_path, scale, data, queries):
+    documents = data.documents(scale)
+    storage = Storage(base_path)
+    results = [measure("storage.save_data", scale, lambda item: storage.save_data("document", item[1], item[0]),
+                       documents)]
+    unlogged = Storage(base_path, wal=False)
+    results.append(measure("storage.save_data.no_wal", scale,
+                           lambda item: unlogged.save_data("keyvalue", item[1], item[0]), documents))
+    results.append(measure("storage.bulk_save", scale,
+                           lambda records: storage.bulk_save("document", records), [documents], records=scale))
+
+    filenames = [documents[i][0] for i in np.random.default_rng(data.seed).integers(0, scale, queries)]
+    record_cache.clear()
+    results.append(measure("storage.load_data.cold", scale, lambda filename: storage.load_data("document", filename),
+                           filenames))
+    results.append(measure("storage.load_data.warm", scale, lambda filename: storage.load_data("document", filename),
+                           filenames))
+
+    table = data.table(scale * 10)
+    for filename in ("users.csv", "users.col"):
+        results.append(measure(f"storage.save_data.relational.{filename[-3:]}", scale,
+                               lambda rows: storage.save_data("relational", rows, filename), [table], rows=len(table) - 1))
+        results.append(measure(f"storage.scan_table.{filename[-3:]}", scale,
+                               lambda age: storage.scan_table(filename, ["name"], [("age", ">", age)]),
+                               [int(age) for age in np.linspace(18, 90, queries)], rows=len(table) - 1))
+    return results
+
+def bench_query(base_path, scale, data, queries):
+    storage = Storage(base_path)
+    storage.bulk_save("document", data.documents(scale))
+    terms = [[WORDS[i % len(WORDS)]] for i in range(queries)]
+    indexed = Query(base_path, storage=storage)
+    scan = Query(base_path, use_index=False, storage=storage)
+    return [
+        measure("query.search.indexed", scale, lambda query_terms: indexed.search(query_terms, "document"), terms),
+        measure("query.search.scan", scale, lambda query_terms: scan.search(query_terms, "document"), terms),
+        measure("query.iter_search.first", scale,
+                lambda query_terms: next(indexed.iter_search(query_terms, "document"), None), terms),
+    ]
+
+def bench_graph(base_path, scale, data, queries):
+    storage = Storage(base_path)
+    graph = data.graph(scale * 5)
+    nodes = [str(i) for i in np.random.default_rng(data.seed).integers(0, len(graph["nodes"]), queries)]
+    results = [measure("graph.save_data", scale, lambda record: storage.save_data("graph", record, "graph.json"),
+                       [graph], edges=len(graph["edges"])),
+               measure("graph.rebuild", scale, lambda _: storage.rebuild_graph(), [None], edges=len(graph["edges"]))]
+    index = storage.open_graph()
+    results.append(measure("graph.k_hop.2", scale, lambda node: index.k_hop(node, 2), nodes, edges=len(graph["edges"])))
+    results.append(measure("graph.shortest_path", scale, lambda node: index.shortest_path(nodes[0], node, direction="both"),
+                           nodes, edges=len(graph["edges"])))
+    return results
+
+def bench_metadata(base_path, scale, data, queries):
+    metadata_manager = MetadataManager(os.path.join(base_path, "multimedia_metadata"))
+    assets = data.metadata(scale)
+    results = [measure("metadata.save_metadata", scale, lambda item: metadata_manager.save_metadata(*item), assets)]
+    filenames = [assets[i][0] for i in np.random.default_rng(data.seed).integers(0, scale, queries)]
+    results.append(measure("metadata.load_metadata", scale, metadata_manager.load_metadata, filenames))
+    conditions = [([TAGS[i % 4]], [TAGS[4 + i % 8], TAGS[5 + i % 8]]) for i in range(queries)]
+    results.append(measure("metadata.search", scale, lambda condition: metadata_manager.search(*condition), conditions))
+    results.append(measure("metadata.facets", scale, lambda condition: metadata_manager.facets(condition[0]), conditions))
+    return results
+
+def bench_vectors(base_path, scale, data, queries, dim=128):
+    count = scale * 10
+    ids, matrix = data.embeddings(count, dim)
+    vector_db = VectorDBInterface()
+    results = [measure("vector.add_embeddings", scale, lambda _: vector_db.add_embeddings(ids, matrix), [None],
+                       vectors=count, dim=dim)]
+    results.append(measure("vector.search_embedding", scale, lambda query: vector_db.search_embedding(query, top_k=10),
+                           data.queries(queries, dim), vectors=count, dim=dim))
+    return results
+
+SUITES = {
+    "storage": bench_storage,
+    "query": bench_query,
+    "graph": bench_graph,
+    "metadata": bench_metadata,
+    "vectors": bench_vectors,
+}
+
+def run_benchmarks(scales=(100, 1000), suites=None, seed=0, queries=50):
+    """
+    Runs the benchmark suites at every scale, each in a fresh temporary data directory,
+    and returns a JSON-serializable report.
+    """
+    data = SyntheticData(seed)
+    results = []
+    for scale in scales:
+        for name in suites or SUITES:
+            base_path = tempfile.mkdtemp(prefix=f"aidb-bench-{name}-")
+            try:
+                results.extend(SUITES[name](base_path, scale, data, queries))
+            finally:
+                shutil.rmtree(base_path, ignore_errors=True)
+    return {"seed": seed, "scales": list(scales), "queries": queries, "environment": environment(), "results": results}
+
+def environment():
+    """
+    Describes the machine and code version the benchmarks ran on.
+    """
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {"commit": commit, "python": platform.python_version(), "numpy": np.__version__,
+            "platform": platform.platform(), "cpu_count": os.cpu_count()}
+
+if __name__ == "__main__":
+    # Arguments: comma-separated scales, comma-separated suites, output file (stdout if omitted)
+    scales = [int(scale) for scale in sys.argv[1].split(",")] if len(sys.argv) > 1 else [100, 1000]
+    suites = sys.argv[2].split(",") if len(sys.argv) > 2 and sys.argv[2] != "all" else None
+    report = run_benchmarks(scales, suites)
+    if len(sys.argv) > 3:
+        with open(sys.argv[3], 'w') as f:
+            json.dump(report, f, indent=4)
+    else:
+        print(json.dumps(report, indent=4))
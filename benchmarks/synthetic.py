@@ -0,0 +1,87 @@
+import zlib
+import numpy as np
+
+WORDS = ["laptop", "phone", "camera", "garden", "coffee", "river", "violin", "rocket", "forest", "pixel",
+         "marble", "harbor", "cactus", "falcon", "lantern", "meadow", "nebula", "orchid", "quartz", "saffron"]
+TAGS = ["animal", "cat", "dog", "bird", "landscape", "portrait", "night", "beach", "city", "food",
+        "travel", "sport", "macro", "black", "white", "vintage"]
+RELATIONS = ["purchased", "viewed", "follows", "belongs_to"]
+
+class SyntheticData:
+    """
+    Deterministic generator of benchmark data for every subsystem.
+    The same seed always yields the same records, so results stay comparable between
+    runs and commits. Text fields draw from WORDS, so queries for a word hit a
+    predictable share of the records.
+    """
+    def __init__(self, seed=0):
+        self.seed = seed
+
+    def documents(self, count):
+        """
+        Returns count (filename, document) pairs.
+        """
+        rng = self._rng("documents")
+        words = rng.integers(0, len(WORDS), (count, 3))
+        prices = rng.uniform(1, 2000, count).round(2)
+        return [(f"doc_{i}.json", {"id": str(i), "name": f"{WORDS[words[i, 0]]} {WORDS[words[i, 1]]}",
+                                   "description": f"A {WORDS[words[i, 2]]} item number {i}",
+                                   "price": float(prices[i])})
+                for i in range(count)]
+
+    def table(self, rows):
+        """
+        Returns a relational table (header row first) with rows rows.
+        """
+        rng = self._rng("table")
+        ages = rng.integers(18, 90, rows)
+        cities = rng.integers(0, len(WORDS), rows)
+        return [["id", "name", "age", "city"]] + [[str(i), f"user_{i}", str(ages[i]), WORDS[cities[i]]]
+                                                  for i in range(rows)]
+
+    def graph(self, edges, nodes=None):
+        """
+        Returns a graph record with edges random edges between nodes nodes (edges // 4 by default).
+        """
+        rng = self._rng("graph")
+        nodes = nodes or max(2, edges // 4)
+        ends = rng.integers(0, nodes, (edges, 2))
+        relations = rng.integers(0, len(RELATIONS), edges)
+        return {"nodes": [{"id": str(i), "label": WORDS[i % len(WORDS)]} for i in range(nodes)],
+                "edges": [{"source": str(ends[i, 0]), "target": str(ends[i, 1]), "relation": RELATIONS[relations[i]]}
+                          for i in range(edges)]}
+
+    def embeddings(self, count, dim):
+        """
+        Returns (ids, (count, dim) float32 matrix) of clustered embeddings.
+        """
+        rng = self._rng("embeddings")
+        centers = rng.normal(size=(max(1, min(256, count // 100)), dim))
+        matrix = centers[rng.integers(0, len(centers), count)] + 0.5 * rng.normal(size=(count, dim))
+        return [f"vec_{i}" for i in range(count)], matrix.astype(np.float32)
+
+    def queries(self, count, dim):
+        """
+        Returns a (count, dim) float32 matrix of query embeddings.
+        """
+        return self._rng("queries").normal(size=(count, dim)).astype(np.float32)
+
+    def metadata(self, count, tags_per_asset=3):
+        """
+        Returns count (asset filename, metadata) pairs carrying tags_per_asset tags each.
+        """
+        rng = self._rng("metadata")
+        # Skewed tag popularity, like real collections
+        weights = 1.0 / np.arange(1, len(TAGS) + 1)
+        weights /= weights.sum()
+        assets = []
+        for i in range(count):
+            tags = rng.choice(len(TAGS), size=min(tags_per_asset, len(TAGS)), replace=False, p=weights)
+            assets.append((f"image_{i}.jpg", {"file_path": f"path/to/image_{i}.jpg",
+                                              "tags": [TAGS[tag] for tag in tags],
+                                              "description": f"Photo of a {WORDS[i % len(WORDS)]}"}))
+        return assets
+
+    def _rng(self, stream):
+        # Every data set has its own stream, so changing one generator leaves the others unchanged
+        return np.random.default_rng([self.seed, zlib.crc32(stream.encode("utf-8"))])
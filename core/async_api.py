@@ -0,0 +1,130 @@
+import os
+import asyncio
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from .metadata import MetadataManager
+from .query import Query
+from .storage import Storage
+
+class AsyncRunner:
+    """
+    Runs blocking calls on a bounded thread pool for asyncio code.
+    At most max_in_flight calls are queued or running at once; further calls wait for
+    a slot before being submitted, which gives callers backpressure instead of an
+    unbounded executor queue.
+    """
+    def __init__(self, max_workers=8, max_in_flight=64):
+        self.max_in_flight = max_in_flight
+        self.executor = ThreadPoolExecutor(max_workers)
+        self._slots = {}  # event loop -> asyncio.Semaphore
+
+    async def run(self, func, *args, **kwargs):
+        """
+        Awaits func(*args, **kwargs) executed on the thread pool.
+        """
+        loop = asyncio.get_running_loop()
+        slots = self._slots.get(loop)
+        if slots is None:
+            slots = self._slots[loop] = asyncio.Semaphore(self.max_in_flight)
+        async with slots:
+            return await loop.run_in_executor(self.executor, functools.partial(func, *args, **kwargs))
+
+    def close(self):
+        self.executor.shutdown(wait=True)
+
+class AsyncStorage:
+    """
+    asyncio facade over Storage and MetadataManager with the same semantics.
+    Reads run concurrently on the runner's thread pool; writes are applied one at a
+    time, in the order they acquire the writer lock, as they would be by a single
+    synchronous caller. Record writes to a Storage with a write-ahead log skip the lock:
+    the log orders them and concurrent writes share its fsyncs. Usable as an async
+    context manager.
+    """
+    def __init__(self, base_path="data", vector_db_enabled=False, backend="files", storage=None,
+                 metadata_manager=None, max_workers=8, max_in_flight=64, runner=None):
+        self.storage = storage or Storage(base_path, vector_db_enabled, backend)
+        # Metadata of the same data directory, sharing the Storage's blob store and codec
+        self.metadata_manager = metadata_manager or MetadataManager(
+            os.path.join(self.storage.base_path, "multimedia_metadata"), self.storage.blobs, self.storage.codec)
+        self.runner = runner or AsyncRunner(max_workers, max_in_flight)
+        self._write_lock = threading.Lock()  # Held on a worker thread, never on the event loop
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    async def save_data(self, model_type, data, filename, embed_data=None):
+        return await self.runner.run(self._write_record, self.storage.save_data, model_type, data, filename,
+                                     embed_data)
+
+    async def bulk_save(self, model_type, records, embeddings=None, batch_size=1000, sync=False):
+        return await self.runner.run(self._write_record, self.storage.bulk_save, model_type, records, embeddings,
+                                     batch_size, sync)
+
+    async def load_data(self, model_type, filename):
+        return await self.runner.run(self.storage.load_data, model_type, filename)
+
+    async def load_many(self, items, return_exceptions=False):
+        """
+        Loads many (model_type, filename) records concurrently, returning them in order.
+        """
+        return await asyncio.gather(*(self.load_data(model_type, filename) for model_type, filename in items),
+                                    return_exceptions=return_exceptions)
+
+    async def scan_table(self, filename, columns=None, where=None, limit=None):
+        return await self.runner.run(self.storage.scan_table, filename, columns, where, limit)
+
+    async def save_metadata(self, filename, metadata):
+        return await self.runner.run(self._write, self.metadata_manager.save_metadata, filename, metadata)
+
+    async def load_metadata(self, filename):
+        return await self.runner.run(self.metadata_manager.load_metadata, filename)
+
+    async def delete_metadata(self, filename):
+        return await self.runner.run(self._write, self.metadata_manager.delete_metadata, filename)
+
+    async def close(self):
+        """
+        Waits for in-flight work and shuts the thread pool down.
+        """
+        await asyncio.get_running_loop().run_in_executor(None, self.runner.close)
+
+    def _write(self, func, *args):
+        with self._write_lock:
+            return func(*args)
+
+    def _write_record(self, func, *args):
+        if self.storage.wal is not None:
+            return func(*args)
+        return self._write(func, *args)
+
+class AsyncQuery:
+    """
+    asyncio facade over Query. A search without a model type fans out across the
+    models concurrently and returns the results in the same order as Query.search.
+    Pass an AsyncStorage to search its records and share its thread pool and limits.
+    """
+    def __init__(self, base_path="data", use_index=True, storage=None, executor=None,
+                 max_workers=8, max_in_flight=64, runner=None):
+        if isinstance(storage, AsyncStorage):
+            runner = runner or storage.runner
+            storage = storage.storage
+        self.query = Query(base_path, use_index, storage, executor)
+        self.runner = runner or AsyncRunner(max_workers, max_in_flight)
+
+    async def search(self, query_terms, model_type=None):
+        if model_type:
+            return await self.runner.run(self.query.search, query_terms, model_type)
+        results = await asyncio.gather(*(self.runner.run(self.query.search, query_terms, model)
+                                         for model in Query.MODELS))
+        return [result for model_results in results for result in model_results]
+
+    async def search_many(self, queries, model_type=None):
+        """
+        Runs several searches (lists of query terms) concurrently, returning their results in order.
+        """
+        return await asyncio.gather(*(self.search(query_terms, model_type) for query_terms in queries))
@@ -0,0 +1,240 @@
+import os
+import json
+import mmap
+import hashlib
+import tempfile
+import threading
+from contextlib import contextmanager
+from urllib.parse import quote
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None  # Without advisory locks (Windows) only one process may write a store
+
+class BlobStore:
+    """
+    Content-addressed storage for multimedia payloads.
+    Blobs are stored once under their SHA-256 digest in sharded directories
+    (objects/ab/cd/<digest>), so saving the same content twice stores it once. Writes and
+    reads stream in chunks, and range reads are served from a read-only mmap without
+    copying. Every blob keeps the set of owners referencing it (names linked with link()
+    and metadata entries); it is deleted when the last reference is released.
+    Reference updates hold an exclusive lock on the store's lock file, so processes
+    sharing a store never lose a count and collect live content.
+    """
+    def __init__(self, path="data/blobs", chunk_size=1024 * 1024):
+        self.path = path
+        self.chunk_size = chunk_size
+        self._lock = threading.RLock()
+        self._lock_file = None  # Open while this process holds the store's file lock
+        self._lock_depth = 0
+
+    def put(self, data, name=None):
+        """
+        Stores bytes, a readable binary stream or the contents of a file path and returns
+        the digest. The payload is hashed while it is written in chunks to a temporary
+        file, which is discarded if the blob already exists. If name is given the blob
+        is also linked under it.
+        """
+        hasher = hashlib.sha256()
+        os.makedirs(os.path.join(self.path, "tmp"), exist_ok=True)  # The store's directories appear with its first blob
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.join(self.path, "tmp"))
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                for chunk in self._chunks_of(data):
+                    hasher.update(chunk)
+                    f.write(chunk)
+            digest = hasher.hexdigest()
+            blob_path = self.blob_path(digest)
+            with self._locked():
+                if os.path.exists(blob_path):
+                    os.remove(tmp_path)  # Duplicate content
+                else:
+                    os.makedirs(os.path.dirname(blob_path), exist_ok=True)
+                    os.replace(tmp_path, blob_path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        if name is not None:
+            self.link(name, digest)
+        return digest
+
+    def exists(self, digest):
+        return os.path.exists(self.blob_path(digest))
+
+    def size(self, digest):
+        return os.path.getsize(self.blob_path(digest))
+
+    def blob_path(self, digest):
+        return os.path.join(self.path, "objects", digest[:2], digest[2:4], digest)
+
+    def open(self, digest):
+        """
+        Opens a blob for reading as a binary file. Raises FileNotFoundError if it does not exist.
+        """
+        return open(self.blob_path(digest), 'rb')
+
+    def read(self, digest):
+        """
+        Returns the whole blob as bytes.
+        """
+        with self.open(digest) as f:
+            return f.read()
+
+    def iter_chunks(self, digest, start=0, end=None, chunk_size=None):
+        """
+        Yields the blob's bytes from start to end (exclusive; the end of the blob if None)
+        in chunks of chunk_size.
+        """
+        chunk_size = chunk_size or self.chunk_size
+        with self.open(digest) as f:
+            f.seek(start)
+            remaining = None if end is None else max(end - start, 0)
+            while remaining is None or remaining > 0:
+                chunk = f.read(chunk_size if remaining is None else min(chunk_size, remaining))
+                if not chunk:
+                    break
+                if remaining is not None:
+                    remaining -= len(chunk)
+                yield chunk
+
+    def map(self, digest):
+        """
+        Returns a read-only mmap of the blob. Empty blobs map to an empty bytes object.
+        """
+        with self.open(digest) as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                return b""
+            return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def read_range(self, digest, start, length=None):
+        """
+        Returns a zero-copy memoryview of length bytes (to the end if None) starting at start.
+        """
+        view = memoryview(self.map(digest))
+        return view[start:] if length is None else view[start:start + length]
+
+    def link(self, name, digest):
+        """
+        Points name at a blob, taking a reference on it and releasing the one held by the
+        blob name previously pointed to.
+        """
+        with self._locked():
+            if not self.exists(digest):
+                raise FileNotFoundError(f"No such blob: {digest}")
+            previous = self.resolve(name)
+            if previous == digest:
+                return
+            os.makedirs(os.path.join(self.path, "names"), exist_ok=True)
+            self.add_ref(digest, f"name:{name}")
+            _write_atomic(self._name_path(name), digest.encode("ascii"))
+            if previous is not None:
+                self.release(previous, f"name:{name}")
+
+    def unlink(self, name):
+        """
+        Removes a name, releasing its reference. Returns False if the name does not exist.
+        """
+        with self._locked():
+            digest = self.resolve(name)
+            if digest is None:
+                return False
+            os.remove(self._name_path(name))
+            self.release(digest, f"name:{name}")
+            return True
+
+    def resolve(self, name):
+        """
+        Returns the digest linked under name, or None.
+        """
+        try:
+            with open(self._name_path(name), 'r') as f:
+                return f.read().strip()
+        except FileNotFoundError:
+            return None
+
+    def refs(self, digest):
+        """
+        Returns the sorted owners referencing a blob.
+        """
+        try:
+            with open(self.blob_path(digest) + ".refs", 'r') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return []
+
+    def add_ref(self, digest, owner):
+        """
+        Records that owner references the blob. Adding the same owner twice counts once.
+        Returns the reference count.
+        """
+        with self._locked():
+            owners = set(self.refs(digest))
+            if owner not in owners:
+                owners.add(owner)
+                _write_atomic(self.blob_path(digest) + ".refs", json.dumps(sorted(owners)).encode("utf-8"))
+            return len(owners)
+
+    def release(self, digest, owner):
+        """
+        Drops owner's reference, deleting the blob once nothing references it.
+        Returns the remaining reference count.
+        """
+        with self._locked():
+            owners = set(self.refs(digest))
+            owners.discard(owner)
+            if owners:
+                _write_atomic(self.blob_path(digest) + ".refs", json.dumps(sorted(owners)).encode("utf-8"))
+                return len(owners)
+            for path in (self.blob_path(digest), self.blob_path(digest) + ".refs"):
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+            return 0
+
+    def _name_path(self, name):
+        return os.path.join(self.path, "names", quote(name, safe=""))
+
+    def _chunks_of(self, data):
+        if isinstance(data, (bytes, bytearray, memoryview)):
+            view = memoryview(data)
+            for start in range(0, len(view), self.chunk_size):
+                yield view[start:start + self.chunk_size]
+            return
+        if isinstance(data, str):
+            with open(data, 'rb') as f:
+                yield from self._chunks_of(f)
+            return
+        while True:
+            chunk = data.read(self.chunk_size)
+            if not chunk:
+                break
+            yield chunk
+
+    @contextmanager
+    def _locked(self):
+        """
+        Holds the thread lock and, for the outermost caller, the store's file lock.
+        """
+        with self._lock:
+            if self._lock_depth == 0 and fcntl is not None:
+                os.makedirs(self.path, exist_ok=True)
+                self._lock_file = open(os.path.join(self.path, "lock"), 'a')
+                fcntl.flock(self._lock_file.fileno(), fcntl.LOCK_EX)
+            self._lock_depth += 1
+            try:
+                yield
+            finally:
+                self._lock_depth -= 1
+                if self._lock_depth == 0 and self._lock_file is not None:
+                    self._lock_file.close()  # Releases the file lock
+                    self._lock_file = None
+
+def _write_atomic(path, payload):
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(payload)
+    os.replace(tmp_path, path)
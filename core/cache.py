@@ -0,0 +1,124 @@
+import os
+import threading
+from collections import OrderedDict
+
+class RecordCache:
+    """
+    LRU cache of parsed records shared by Storage, Query and MetadataManager.
+    Entries are keyed by path and remember the version they were parsed from, (mtime,
+    size) for files, so a record changed on disk is re-parsed on its next read. Eviction
+    is least-recently-used within a byte budget measured by the records' serialized size.
+    Cached records are shared between callers: code that hands them out for modification
+    must copy them first.
+    """
+    def __init__(self, max_bytes=64 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()  # key -> (version, size, record)
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+
+    def get(self, key, version, size, loader):
+        """
+        Returns the record cached under key if it was parsed from the same version,
+        otherwise calls loader() and caches its result.
+        """
+        with self._lock:
+            entry = self.entries.get(key)
+            if entry is not None and entry[0] == version:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return entry[2]
+            self.misses += 1
+        record = loader()
+        self.put(key, version, size, record)
+        return record
+
+    def load(self, path, loader):
+        """
+        Returns the parsed contents of a file, calling loader(path) only when the file is
+        not cached or has changed since it was cached.
+        """
+        stat = os.stat(path)
+        return self.get(path, (stat.st_mtime_ns, stat.st_size), stat.st_size, lambda: loader(path))
+
+    def lookup(self, path):
+        """
+        Returns (True, record) if the current contents of a file are cached, otherwise
+        (False, None) without loading it.
+        """
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            return False, None
+        with self._lock:
+            entry = self.entries.get(path)
+            if entry is not None and entry[0] == (stat.st_mtime_ns, stat.st_size):
+                self.entries.move_to_end(path)
+                self.hits += 1
+                return True, entry[2]
+        return False, None
+
+    def put(self, key, version, size, record):
+        with self._lock:
+            previous = self.entries.pop(key, None)
+            if previous is not None:
+                self.bytes -= previous[1]
+            if size > self.max_bytes:
+                return  # Larger than the whole budget; never cached
+            self.entries[key] = (version, size, record)
+            self.bytes += size
+            while self.bytes > self.max_bytes:
+                _, (_, evicted_size, _) = self.entries.popitem(last=False)
+                self.bytes -= evicted_size
+                self.evictions += 1
+
+    def invalidate(self, key):
+        """
+        Drops the cached record for key, if any.
+        """
+        with self._lock:
+            entry = self.entries.pop(key, None)
+            if entry is not None:
+                self.bytes -= entry[1]
+
+    def clear(self):
+        """
+        Drops every cached record and resets the counters.
+        """
+        with self._lock:
+            self.entries.clear()
+            self.bytes = 0
+            self.hits = self.misses = self.evictions = 0
+
+    def resize(self, max_bytes):
+        """
+        Changes the byte budget, evicting records if it shrank.
+        """
+        with self._lock:
+            self.max_bytes = max_bytes
+            while self.bytes > self.max_bytes:
+                _, (_, evicted_size, _) = self.entries.popitem(last=False)
+                self.bytes -= evicted_size
+                self.evictions += 1
+
+    def stats(self):
+        """
+        Returns the cache counters and current size.
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "entries": len(self.entries),
+                "bytes": self.bytes,
+                "max_bytes": self.max_bytes,
+            }
+
+# Shared by every Storage, Query and MetadataManager in the process
+record_cache = RecordCache()
@@ -0,0 +1,137 @@
+import json
+import math
+from .kv_store import decode_value, encode_value
+from .lazy import lazy_import
+
+# Optional; None when not installed, otherwise loaded on first use
+orjson = lazy_import("orjson")
+msgpack = lazy_import("msgpack")
+
+MAGIC = b"\x00AIDB:"  # Binary records start with MAGIC, the codec name and a newline; JSON text never starts with NUL
+
+class Codec:
+    """
+    Serializes JSON-model records to bytes.
+    Text codecs write plain JSON; binary codecs prefix their payload with a format marker
+    so decode_record can tell every stored format apart.
+    """
+    name = None
+    binary = False
+
+    def dumps(self, data):
+        raise NotImplementedError("Subclasses must implement this method")
+
+    def loads(self, payload):
+        raise NotImplementedError("Subclasses must implement this method")
+
+    def encode(self, data):
+        """
+        Returns the bytes stored for a record, marker included.
+        """
+        if self.binary:
+            return MAGIC + self.name.encode("ascii") + b"\n" + self.dumps(data)
+        return self.dumps(data)
+
+class JSONCodec(Codec):
+    """
+    Compact JSON without whitespace, produced by orjson when it is installed.
+    Records orjson cannot represent exactly are written by the json module, as before
+    orjson was used: integers beyond 53 bits, which orjson rejects under
+    OPT_STRICT_INTEGER (and would read back as floats beyond 64 bits), and NaN and
+    infinities, which orjson writes as null. That text starts with a space, so loads()
+    passes it, like pretty-printed records, straight to json.
+    """
+    name = "json"
+
+    def dumps(self, data):
+        if orjson is not None:
+            try:
+                payload = orjson.dumps(data, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_STRICT_INTEGER)
+            except TypeError:
+                pass  # E.g. integers beyond 53 bits, which json writes exactly
+            else:
+                if b"null" not in payload or not _has_non_finite(data):
+                    return payload
+        return b" " + json.dumps(data, separators=(',', ':')).encode('utf-8')
+
+    def loads(self, payload):
+        if orjson is not None and payload[:1] != b" " and payload[1:2] != b"\n":
+            try:
+                return orjson.loads(payload)
+            except orjson.JSONDecodeError:
+                pass  # Not JSON orjson accepts, e.g. NaN written by an older json.dump
+        return json.loads(payload)
+
+class PrettyJSONCodec(JSONCodec):
+    """
+    JSON indented by four spaces, the format records were written in originally.
+    """
+    name = "json-pretty"
+
+    def dumps(self, data):
+        return json.dumps(data, indent=4).encode('utf-8')
+
+class BinaryCodec(Codec):
+    """
+    The tagged binary encoding of KeyValueStore values; always available.
+    """
+    name = "binary"
+    binary = True
+
+    def dumps(self, data):
+        return encode_value(data)
+
+    def loads(self, payload):
+        return decode_value(payload)
+
+class MsgpackCodec(Codec):
+    """
+    MessagePack; requires the msgpack package.
+    """
+    name = "msgpack"
+    binary = True
+
+    def dumps(self, data):
+        return msgpack.packb(data, use_bin_type=True)
+
+    def loads(self, payload):
+        return msgpack.unpackb(payload, raw=False, strict_map_key=False)
+
+CODECS = {codec.name: codec for codec in (JSONCodec(), PrettyJSONCodec(), BinaryCodec(), MsgpackCodec())}
+
+def get_codec(codec):
+    """
+    Returns the codec with the given name (or the Codec instance passed in).
+    Raises ValueError for unknown codecs and for codecs whose package is not installed.
+    """
+    if isinstance(codec, Codec):
+        return codec
+    if codec not in CODECS:
+        raise ValueError(f"Invalid codec: {codec}")
+    if codec == "msgpack" and msgpack is None:
+        raise ValueError("The msgpack codec requires the msgpack package")
+    return CODECS[codec]
+
+def _has_non_finite(data):
+    """
+    Returns True if data contains a NaN or infinite float anywhere. Only called when
+    orjson wrote a null, which may stand for one.
+    """
+    if isinstance(data, float):
+        return not math.isfinite(data)
+    if isinstance(data, dict):
+        return any(_has_non_finite(value) for value in data.values())
+    if isinstance(data, (list, tuple)):
+        return any(_has_non_finite(item) for item in data)
+    return False
+
+def decode_record(payload):
+    """
+    Decodes a stored JSON-model record in any format: JSON (pretty or compact), or a
+    binary codec identified by its marker.
+    """
+    if not payload.startswith(MAGIC):
+        return CODECS["json"].loads(payload)
+    header_end = payload.index(b"\n", len(MAGIC))
+    name = payload[len(MAGIC):header_end].decode("ascii")
+    return get_codec(name).loads(payload[header_end + 1:])
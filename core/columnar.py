@@ -0,0 +1,248 @@
+import os
+import json
+import numbers
+from .lazy import lazy_import
+np = lazy_import("numpy")  # Loaded on first use
+
+PREDICATES = {
+    "==": lambda column, value: column == value,
+    "!=": lambda column, value: column != value,
+    "<": lambda column, value: column < value,
+    "<=": lambda column, value: column <= value,
+    ">": lambda column, value: column > value,
+    ">=": lambda column, value: column >= value,
+    "in": lambda column, value: np.isin(column, list(value)),
+}
+
+class ColumnarTable:
+    """
+    Typed columnar storage for relational tables.
+    A table is a directory holding schema.json (column names and dtypes, row count and
+    per-chunk min/max zone maps) and one .npy file per column, which is memory-mapped on
+    read. Scans read only the projected columns, evaluate predicates vectorized and skip
+    chunks whose zone maps show they cannot match.
+    Column files are prefixed with the generation of the write that made them, and
+    replacing schema.json commits a write, so a table is never seen half rewritten. The
+    previous generation's files are kept until the next write, so a table opened just
+    before a rewrite can still be scanned.
+    """
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, "schema.json"), 'r') as f:
+            self.schema = json.load(f)
+        self.columns = [column["name"] for column in self.schema["columns"]]
+        self.num_rows = self.schema["num_rows"]
+        self.chunk_size = self.schema["chunk_size"]
+        self.generation = self.schema.get("generation")  # None for tables written before generations
+
+    @classmethod
+    def write(cls, path, rows, chunk_size=65536):
+        """
+        Writes a table from a list of rows whose first row is the header (the CSV layout
+        used by RelationalModel); an empty list gives a table without columns. Column
+        types are inferred: int64, float64 or string.
+        """
+        header, body = ([str(name) for name in rows[0]], rows[1:]) if rows else ([], [])
+        os.makedirs(path, exist_ok=True)
+        try:
+            previous = cls(path).generation
+        except (FileNotFoundError, ValueError):
+            previous = None
+        generation = os.urandom(6).hex()
+
+        schema = {"version": 1, "generation": generation, "columns": [], "num_rows": len(body),
+                  "chunk_size": chunk_size, "zone_maps": {}}
+        for position, name in enumerate(header):
+            column = infer_column([row[position] if position < len(row) else "" for row in body])
+            np.save(os.path.join(path, f"{generation}.{position}.npy"), column)
+            schema["columns"].append({"name": name, "dtype": column.dtype.str})
+            schema["zone_maps"][name] = [zone_map(column[start:start + chunk_size])
+                                         for start in range(0, len(column), chunk_size)]
+        tmp_path = os.path.join(path, "schema.json.tmp")
+        with open(tmp_path, 'w') as f:
+            json.dump(schema, f)
+        os.replace(tmp_path, os.path.join(path, "schema.json"))  # Commits the new generation
+
+        for filename in os.listdir(path):
+            if filename.endswith(".npy") and not filename.startswith((f"{generation}.", f"{previous}.")):
+                os.remove(os.path.join(path, filename))
+        return cls(path)
+
+    def column(self, name):
+        """
+        Returns a column as a read-only memory-mapped array.
+        """
+        position = self.columns.index(name)
+        filename = f"{position}.npy" if self.generation is None else f"{self.generation}.{position}.npy"
+        return np.load(os.path.join(self.path, filename), mmap_mode='r')
+
+    def scan(self, columns=None, where=None, limit=None):
+        """
+        Returns {column name: array} for the rows matching every (column, operator, value)
+        predicate in where, restricted to the projected columns (all if None) and to the
+        first limit matches.
+        """
+        columns = list(columns or self.columns)
+        for name in columns + [predicate[0] for predicate in where or []]:
+            if name not in self.columns:
+                raise KeyError(f"Unknown column: {name}")
+        predicates = [(name, operator, self._coerce(name, value)) for name, operator, value in where or []]
+
+        arrays = {name: self.column(name) for name in set(columns) | {predicate[0] for predicate in predicates}}
+        selected = []
+        remaining = limit
+        for chunk_number, start in enumerate(range(0, self.num_rows, self.chunk_size)):
+            if any(not self._chunk_may_match(chunk_number, predicate) for predicate in predicates):
+                continue  # Zone maps rule the whole chunk out
+            end = min(start + self.chunk_size, self.num_rows)
+            mask = np.ones(end - start, dtype=bool)
+            for name, operator, value in predicates:
+                mask &= evaluate_predicate(arrays[name][start:end], operator, value)
+            rows = np.flatnonzero(mask) + start
+            if remaining is not None:
+                rows = rows[:remaining]
+                remaining -= len(rows)
+            selected.append(rows)
+            if remaining == 0:
+                break
+
+        rows = np.concatenate(selected) if selected else np.empty(0, dtype=np.int64)
+        return {name: np.asarray(arrays[name][rows]) for name in columns}
+
+    def to_rows(self, columns=None, where=None, limit=None):
+        """
+        Returns the scan result as a list of rows with a header row, like RelationalModel.load.
+        """
+        if not self.columns:
+            return []  # Written from an empty list of rows
+        result = self.scan(columns, where, limit)
+        names = list(result)
+        values = [result[name].tolist() for name in names]
+        return [names] + [list(row) for row in zip(*values)]
+
+    def _coerce(self, name, value):
+        """
+        Converts a predicate value to the column type (see coerce_literal).
+        """
+        return coerce_literal(np.dtype(self.schema["columns"][self.columns.index(name)]["dtype"]).kind, value)
+
+    def _chunk_may_match(self, chunk_number, predicate):
+        name, operator, value = predicate
+        low, high = self.schema["zone_maps"][name][chunk_number]
+        if low is None:
+            return operator == "!="  # Chunk holds only NaN
+        try:
+            if operator == "==":
+                return low <= value <= high
+            if operator == "!=":
+                return not (low == high == value)
+            if operator == "<":
+                return low < value
+            if operator == "<=":
+                return low <= value
+            if operator == ">":
+                return high > value
+            if operator == ">=":
+                return high >= value
+            if operator == "in":
+                return any(low <= item <= high for item in value)
+        except TypeError:
+            return True  # Mismatched types; let the row-level evaluation decide
+        return True
+
+def evaluate_predicate(column, operator, value):
+    """
+    Evaluates one predicate over a column slice, returning a boolean array. A string
+    column is compared with numeric values as numbers, as the query planner compares
+    strings holding numbers: values that are not numbers never match, except for "!=".
+    """
+    if operator not in PREDICATES:
+        raise ValueError(f"Unsupported operator: {operator}")
+    if column.dtype.kind == "U":
+        if operator == "in":
+            items = list(value)
+            numbers_in = [item for item in items if _is_number(item)]
+            if numbers_in:
+                return np.isin(column, [item for item in items if not _is_number(item)]) | \
+                    np.isin(_as_numbers(column), numbers_in)
+        elif _is_number(value):
+            with np.errstate(invalid="ignore"):
+                return np.asarray(PREDICATES[operator](_as_numbers(column), value), dtype=bool)
+    try:
+        return np.asarray(PREDICATES[operator](column, value), dtype=bool)
+    except TypeError:
+        return np.full(len(column), operator == "!=", dtype=bool)  # e.g. string column vs number
+
+def coerce_literal(kind, value):
+    """
+    Converts a predicate value to a column's dtype kind ("i", "f" or "U"). Fractional
+    numbers compared with an integer column stay floats, so 25.5 is never truncated
+    to 25, and numbers compared with a string column stay numbers (see
+    evaluate_predicate). Values that cannot be converted are left alone and simply
+    never compare equal.
+    """
+    if isinstance(value, (list, tuple, set)):
+        return [coerce_literal(kind, item) for item in value]
+    try:
+        if kind == "i":
+            if isinstance(value, str):
+                try:
+                    return int(value)
+                except ValueError:
+                    value = float(value)
+            if isinstance(value, float):
+                return int(value) if value.is_integer() else value
+            return int(value)
+        if kind == "f":
+            return float(value)
+        if kind == "U" and not _is_number(value):
+            return str(value)
+    except (TypeError, ValueError):
+        pass
+    return value
+
+def zone_map(chunk):
+    """
+    Returns [min, max] of a column chunk as JSON-serializable values.
+    """
+    if chunk.dtype.kind == "U":
+        values = chunk.tolist()
+        return [min(values), max(values)]
+    if chunk.dtype.kind == "f" and np.isnan(chunk).all():
+        return [None, None]
+    return [np.nanmin(chunk).item(), np.nanmax(chunk).item()]
+
+def infer_column(values):
+    """
+    Converts a list of values (CSV strings or Python scalars) into the narrowest of
+    int64, float64 or unicode string arrays.
+    """
+    for parse, dtype in ((_parse_int, np.int64), (float, np.float64)):
+        try:
+            return np.array([parse(value) for value in values], dtype=dtype)
+        except (TypeError, ValueError, OverflowError):
+            continue
+    return np.array([str(value) for value in values], dtype=str)
+
+def _is_number(value):
+    return isinstance(value, numbers.Number) and not isinstance(value, bool)
+
+def _as_numbers(column):
+    """
+    Parses a string column as float64, with NaN where a value is not a number.
+    """
+    try:
+        return column.astype(np.float64)
+    except ValueError:
+        return np.array([_parse_float(item) for item in column.tolist()], dtype=np.float64)
+
+def _parse_float(value):
+    try:
+        return float(value)
+    except ValueError:
+        return np.nan
+
+def _parse_int(value):
+    if isinstance(value, bool) or not isinstance(value, (int, str)):
+        raise ValueError(f"Not an integer: {value!r}")
+    return int(value)
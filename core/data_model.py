@@ -1,5 +1,10 @@
-import json
+import io
+import os
 import csv
+from .codecs import decode_record, get_codec
+from .columnar import ColumnarTable, coerce_literal, evaluate_predicate, infer_column
+from .lazy import lazy_import
+np = lazy_import("numpy")  # Loaded on first use
 
 class DataModel:
     """
@@ -20,53 +25,136 @@ class DataModel:
         """
         raise NotImplementedError("Subclasses must implement this method")
 
-class DocumentModel(DataModel):
+    def dumps(self, data):
+        """
+        Serializes data to bytes (used by record stores that do not write one file per record).
+        """
+        raise NotImplementedError("Subclasses must implement this method")
+
+    def loads(self, payload):
+        """
+        Deserializes bytes produced by dumps.
+        """
+        raise NotImplementedError("Subclasses must implement this method")
+
+class JSONModel(DataModel):
     """
-    Handles JSON documents.
+    Base class for models stored as JSON.
+    Records are written with the given codec (see core.codecs; compact JSON by default)
+    and read back whatever codec wrote them.
     """
+    def __init__(self, name, codec="json"):
+        super().__init__(name)
+        self.codec = get_codec(codec)
+
     def save(self, data, filepath):
-        with open(filepath, 'w') as f:
-            json.dump(data, f, indent=4)
+        with write_atomic(filepath, 'wb') as f:
+            f.write(self.codec.encode(data))
 
     def load(self, filepath):
-        with open(filepath, 'r') as f:
-            return json.load(f)
+        with open(filepath, 'rb') as f:
+            return decode_record(f.read())
+
+    def dumps(self, data):
+        return self.codec.encode(data)
+
+    def loads(self, payload):
+        return decode_record(payload)
 
-class GraphModel(DataModel):
+class DocumentModel(JSONModel):
     """
-    Stores data as nodes and edges.
+    Handles JSON documents.
     """
-    def save(self, data, filepath):
-        # Simplified: Storing graph as a JSON with nodes and edges
-        with open(filepath, 'w') as f:
-            json.dump(data, f, indent=4)
 
-    def load(self, filepath):
-        with open(filepath, 'r') as f:
-            return json.load(f)
+class GraphModel(JSONModel):
+    """
+    Stores data as nodes and edges.
+    """
+    # Simplified: Storing graph as a JSON with nodes and edges
 
-class KeyValueModel(DataModel):
+class KeyValueModel(JSONModel):
     """
     Stores data as key-value pairs.
     """
-    def save(self, data, filepath):
-        with open(filepath, 'w') as f:
-            json.dump(data, f, indent=4)
-
-    def load(self, filepath):
-        with open(filepath, 'r') as f:
-            return json.load(f)
 
 class RelationalModel(DataModel):
     """
     Stores data in CSV files (simplified relational model).
+    Filenames ending in .col are stored as typed ColumnarTable directories instead.
     """
     def save(self, data, filepath):
-        with open(filepath, 'w', newline='') as csvfile:
+        if filepath.endswith('.col'):
+            ColumnarTable.write(filepath, data)  # First row is the header
+            return
+        with write_atomic(filepath, newline='') as csvfile:
             writer = csv.writer(csvfile)
             writer.writerows(data)  # Data should be a list of lists
 
     def load(self, filepath):
+        if filepath.endswith('.col'):
+            return ColumnarTable(filepath).to_rows()
         with open(filepath, 'r') as csvfile:
             reader = csv.reader(csvfile)
-            return list(reader)
\ No newline at end of file
+            return list(reader)
+
+    def scan(self, filepath, columns=None, where=None, limit=None):
+        """
+        Returns the header and the rows matching every (column, operator, value) predicate,
+        projected onto columns. Columnar tables push projection, predicates (with zone-map
+        chunk skipping) and the limit into the scan; CSV tables are parsed and filtered.
+        """
+        if filepath.endswith('.col'):
+            return ColumnarTable(filepath).to_rows(columns, where, limit)
+        return self.filter_rows(self.load(filepath), columns, where, limit)
+
+    def filter_rows(self, rows, columns=None, where=None, limit=None):
+        """
+        Applies projection, predicates and a limit to already loaded rows (header first).
+        Values are compared after inferring each column's type, as in columnar tables.
+        """
+        if not rows:
+            return rows
+        header, body = rows[0], rows[1:]
+        mask = np.ones(len(body), dtype=bool)
+        for name, operator, value in where or []:
+            position = header.index(name)
+            column = infer_column([row[position] for row in body])
+            mask &= evaluate_predicate(column, operator, coerce_literal(column.dtype.kind, value))
+        positions = [header.index(name) for name in columns] if columns else list(range(len(header)))
+        selected = [body[row] for row in np.flatnonzero(mask)[:limit].tolist()]
+        return [[header[position] for position in positions]] + \
+            [[row[position] for position in positions] for row in selected]
+
+    def dumps(self, data):
+        buffer = io.StringIO(newline='')
+        csv.writer(buffer).writerows(data)
+        return buffer.getvalue().encode('utf-8')
+
+    def loads(self, payload):
+        return list(csv.reader(io.StringIO(payload.decode('utf-8'), newline='')))
+
+class write_atomic:
+    """
+    Context manager that writes a file under a temporary name in the same directory and
+    renames it over filepath on success, so readers and crashes never see a partial file.
+    The temporary file is removed if the block raises.
+    """
+    def __init__(self, filepath, mode='w', newline=None):
+        self.filepath = filepath
+        self.mode = mode
+        self.newline = newline
+
+    def __enter__(self):
+        directory, name = os.path.split(self.filepath)
+        # A random, hidden name that no record listing picks up; created with the usual permissions
+        self.tmp_path = os.path.join(directory, f".{name}.{os.urandom(6).hex()}.tmp")
+        self.file = open(self.tmp_path, self.mode.replace('w', 'x'), newline=self.newline)
+        return self.file
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.file.close()
+        if exc_type is None:
+            os.replace(self.tmp_path, self.filepath)
+        else:
+            os.remove(self.tmp_path)
+        return False
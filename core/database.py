@@ -0,0 +1,67 @@
+import os
+import functools
+from .metadata import MetadataManager
+from .planner import QueryPlanner
+from .query import Query
+from .storage import Storage
+
+class Database:
+    """
+    An opened data directory and its subsystems.
+    Opening is cheap: the Storage, Query engine, SQL planner and MetadataManager are
+    constructed the first time they are used, and each of them opens its own indexes,
+    vector database and stores lazily in turn. Nothing is written until data is.
+    Usable as a context manager, which closes the key-value stores and write-ahead log.
+    """
+    def __init__(self, path="data", vector_db_enabled=False, backend="files", wal=True, codec="json",
+                 filterable_fields=None):
+        self.path = path
+        self.vector_db_enabled = vector_db_enabled
+        self.backend = backend
+        self.wal = wal
+        self.codec = codec
+        self.filterable_fields = filterable_fields
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    @functools.cached_property
+    def storage(self):
+        return Storage(self.path, self.vector_db_enabled, self.backend, wal=self.wal, codec=self.codec,
+                       filterable_fields=self.filterable_fields)
+
+    @functools.cached_property
+    def query(self):
+        return Query(storage=self.storage)
+
+    @functools.cached_property
+    def planner(self):
+        return QueryPlanner(self.storage)
+
+    @functools.cached_property
+    def metadata(self):
+        return MetadataManager(os.path.join(self.path, "multimedia_metadata"), self.storage.blobs, self.codec)
+
+    def kv(self, name="default"):
+        """
+        Returns the key-value store with the given name (see Storage.open_kv).
+        """
+        return self.storage.open_kv(name)
+
+    def close(self):
+        """
+        Closes the Storage if it was opened (see Storage.close).
+        """
+        storage = self.__dict__.get("storage")
+        if storage is not None:
+            storage.close()
+
+def open_database(path="data", **options):
+    """
+    Opens the data directory at path without loading or writing anything yet.
+    options are passed to Database: vector_db_enabled, backend, wal, codec and filterable_fields.
+    """
+    return Database(path, **options)
@@ -0,0 +1,135 @@
+import io
+import os
+import csv
+import threading
+from .cache import record_cache
+from .codecs import decode_record
+from .index import read_record_file
+from .metrics import metrics
+
+class ScanExecutor:
+    """
+    Matches query terms against many record files using every core.
+    Files whose parsed records are in the shared record cache are matched in-process.
+    The rest are split into chunks of chunk_size file paths that a process pool reads,
+    parses and matches, so every file is read once, by the worker that parses it.
+    Results are merged in input order, so the output does not depend on scheduling.
+    Fewer than serial_threshold uncached files are matched in-process without starting
+    any pool. Workers are started with mp_context ("forkserver" where available,
+    otherwise "spawn") rather than forked from a process that may be running threads.
+    """
+    def __init__(self, max_workers=None, chunk_size=256, serial_threshold=512, mp_context=None):
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.chunk_size = chunk_size
+        self.serial_threshold = serial_threshold
+        self.mp_context = mp_context
+        self._processes = None
+        self._lock = threading.Lock()
+
+    def match(self, filepaths, query_terms):
+        """
+        Returns a list of booleans telling which files match any of the query terms.
+        """
+        if not query_terms:
+            return [True] * len(filepaths)
+        if len(filepaths) < self.serial_threshold or self.max_workers <= 1:
+            return [_match_file(filepath, query_terms) for filepath in filepaths]
+
+        matched = [None] * len(filepaths)
+        uncached = []
+        for position, filepath in enumerate(filepaths):
+            found, data = record_cache.lookup(filepath)
+            if found:
+                matched[position] = matches_query(data, query_terms)
+            else:
+                uncached.append(position)
+        if len(uncached) < self.serial_threshold:
+            for position in uncached:
+                matched[position] = _match_file(filepaths[position], query_terms)
+            return matched
+
+        processes = self._pools()
+        pending = []
+        for start in range(0, len(uncached), self.chunk_size):
+            positions = uncached[start:start + self.chunk_size]
+            pending.append((positions, processes.submit(_match_chunk, [filepaths[position] for position in positions],
+                                                        query_terms)))
+        for positions, future in pending:
+            chunk_matched, bytes_read = future.result()
+            metrics.increment("record.bytes_read", bytes_read)
+            for position, result in zip(positions, chunk_matched):
+                matched[position] = result
+        return matched
+
+    def shutdown(self):
+        """
+        Stops the worker pool; it is started again on the next parallel scan.
+        """
+        with self._lock:
+            if self._processes is not None:
+                self._processes.shutdown()
+                self._processes = None
+
+    def _pools(self):
+        # Imported on first parallel scan; multiprocessing is slow to import
+        import multiprocessing
+        from concurrent.futures import ProcessPoolExecutor
+        with self._lock:
+            if self._processes is None:
+                context = self.mp_context
+                if context is None:
+                    context = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+                if isinstance(context, str):
+                    context = multiprocessing.get_context(context)
+                self._processes = ProcessPoolExecutor(self.max_workers, mp_context=context)
+            return self._processes
+
+def matches_query(data, query_terms):
+    """
+    Checks if the data matches the query terms.
+    Returns True if query_terms is empty (equivalent to SELECT *).
+    """
+    # Return True for empty query_terms (SELECT * case)
+    if not query_terms:
+        return True
+
+    if isinstance(data, dict):
+        return any(term.lower() in str(value).lower() for term in query_terms for value in data.values())
+    elif isinstance(data, list):
+        return any(term.lower() in str(item).lower() for term in query_terms for item in data)
+    else:
+        return False
+
+def _match_file(filepath, query_terms):
+    try:
+        return matches_query(read_record_file(filepath), query_terms)
+    except FileNotFoundError:
+        return False  # Removed while the query was running
+
+def _match_chunk(filepaths, query_terms):
+    """
+    Reads, parses and matches one chunk of files inside a worker process.
+    Returns the results and the number of bytes read.
+    """
+    matched, bytes_read = [], 0
+    for filepath in filepaths:
+        if not filepath.endswith(('.json', '.csv')):
+            matched.append(_match_file(filepath, query_terms))  # Columnar tables are memory-mapped
+            continue
+        try:
+            with open(filepath, 'rb') as f:
+                content = f.read()
+        except FileNotFoundError:
+            matched.append(False)  # Removed while the query was running
+            continue
+        bytes_read += len(content)
+        if not content:
+            matched.append(False)
+        elif filepath.endswith('.json'):
+            matched.append(matches_query(decode_record(content), query_terms))
+        else:
+            matched.append(matches_query(list(csv.reader(io.StringIO(content.decode('utf-8')))), query_terms))
+    return matched, bytes_read
+
+# Shared by Query instances that are not given their own executor
+default_executor = ScanExecutor()
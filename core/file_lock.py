@@ -0,0 +1,59 @@
+import os
+import threading
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None  # Without advisory locks (Windows) only the threads of one process are excluded
+
+class FileLock:
+    """
+    Exclusive lock shared by the threads of a process and, through an advisory flock on
+    a lock file, by every process using the same path. It is re-entrant: only the
+    outermost holder takes and releases the file lock. Use it as a context manager.
+    """
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.RLock()
+        self._file = None  # Open while this process holds the file lock
+        self._depth = 0
+
+    def acquire(self, blocking=True):
+        """
+        Takes the lock. Returns False without waiting if blocking is False and another
+        process holds it.
+        """
+        self._lock.acquire()
+        try:
+            if self._depth == 0 and fcntl is not None:
+                os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+                f = open(self.path, 'a')
+                try:
+                    fcntl.flock(f.fileno(), fcntl.LOCK_EX | (0 if blocking else fcntl.LOCK_NB))
+                except BlockingIOError:
+                    f.close()
+                    self._lock.release()
+                    return False
+                except BaseException:
+                    f.close()
+                    raise
+                self._file = f
+            self._depth += 1
+            return True
+        except BaseException:
+            self._lock.release()
+            raise
+
+    def release(self):
+        self._depth -= 1
+        if self._depth == 0 and self._file is not None:
+            self._file.close()  # Releases the file lock
+            self._file = None
+        self._lock.release()
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.release()
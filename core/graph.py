@@ -0,0 +1,570 @@
+import os
+import json
+import time
+import threading
+import contextlib
+from .file_lock import FileLock
+from .lazy import lazy_import
+np = lazy_import("numpy")  # Loaded on first use
+
+class GraphIndex:
+    """
+    Adjacency index over every stored graph record.
+    Graph files ({"nodes": [...], "edges": [...]}) are merged by node id into one graph held
+    in CSR form: for node row i, targets[offsets[i]:offsets[i + 1]] are its out-neighbours and
+    edge_labels holds the matching relation ids; a second CSR holds incoming edges. Traversals
+    only touch the adjacency slices of the nodes they visit.
+    The per-file node and edge lists are persisted in graph.json next to a graph.npz copy
+    of the CSR arrays, plus an append-only journal (graph.log) of the files added or
+    removed since, so a single write appends one line. A change to a built graph only
+    touches the nodes it mentions: their adjacency is copied out of the CSR into a
+    per-node overlay that traversals read instead. save() folds the overlay and the
+    journal into new CSR arrays and a new snapshot; it runs every checkpoint_interval
+    updates and at Storage checkpoints. Threads of one process may share an index, and
+    writers in several processes take turns through a lock file, as InvertedIndex does.
+    """
+    def __init__(self, base_path="data", index_path=None, checkpoint_interval=1000):
+        self.base_path = base_path
+        self.index_path = index_path or os.path.join(base_path, "index", "graph.json")
+        self.arrays_path = os.path.splitext(self.index_path)[0] + ".npz"
+        self.journal_path = os.path.splitext(self.index_path)[0] + ".log"
+        self.checkpoint_interval = checkpoint_interval
+        self.files = {}  # record key -> {"nodes": [[id, label], ...], "edges": [[source, target, relation], ...]}
+        self._mtime = None
+        self._journal_offset = 0  # Bytes of the journal already applied
+        self._journal_entries = 0
+        self.in_memory = False  # Built by rebuild(persist=False) and not persisted
+        self._dirty = True  # CSR arrays need rebuilding from self.files
+        self._overlay_out = {}  # node row -> [(target row, relation id), ...] replacing its CSR slice
+        self._overlay_in = {}  # node row -> [(source row, relation id), ...]
+        self._node_files = None  # node row -> {record key: label}, kept once the overlay is in use
+        self._lock = threading.RLock()
+        self._file_lock = FileLock(os.path.splitext(self.index_path)[0] + ".lock")
+        self.load()
+
+    def load(self):
+        """
+        Loads the index from disk. Returns False if no index has been written yet.
+        """
+        with self._lock:
+            self.files, self._mtime, self._dirty = {}, None, True
+            self._journal_offset, self._journal_entries = 0, 0
+            self.in_memory = False
+            try:
+                with open(self.index_path, 'r') as f:
+                    stored = json.load(f)
+                self._mtime = os.path.getmtime(self.index_path)
+            except FileNotFoundError:
+                stored = None
+            if stored is not None:
+                self.files = stored.get("files", {})
+                try:
+                    with np.load(self.arrays_path) as arrays:
+                        if int(arrays["generation"]) == stored.get("generation"):
+                            self._set_arrays(stored["node_ids"], stored["node_labels"], stored["relations"], arrays)
+                except (FileNotFoundError, KeyError, ValueError):
+                    pass  # Arrays are rebuilt from the edge lists on first use
+            self._replay_journal()
+            return self.exists()
+
+    def refresh(self):
+        """
+        Picks up updates written by other Storage instances: new journal entries are
+        replayed, and a new snapshot triggers a full reload.
+        Returns False if no index has been written yet.
+        """
+        with self._lock:
+            try:
+                mtime = os.path.getmtime(self.index_path)
+            except FileNotFoundError:
+                mtime = None
+            try:
+                journal_size = os.path.getsize(self.journal_path)
+            except FileNotFoundError:
+                journal_size = 0
+            if mtime != self._mtime or journal_size < self._journal_offset:
+                return self.load()
+            if journal_size > self._journal_offset:
+                self._replay_journal()
+            return self.exists()
+
+    def exists(self):
+        """
+        Returns True if the index has been persisted.
+        """
+        return self._mtime is not None or self._journal_offset > 0
+
+    def ready(self):
+        """
+        Refreshes the index and returns True if it can answer traversals: it has been
+        persisted, or built in memory since nothing was persisted.
+        """
+        with self._lock:
+            return self.refresh() or self.in_memory
+
+    def save(self):
+        """
+        Folds the overlay into new CSR arrays, writes them and the edge lists to disk
+        atomically and clears the journal. Entries other processes journaled since the
+        last refresh are replayed first, so clearing the journal cannot drop them.
+        """
+        with self._lock, self._file_lock:
+            self.refresh()
+            self._save()
+
+    def _save(self):
+        if self._overlay_out or self._overlay_in or self._node_files is not None:
+            self._dirty = True
+        self._build()
+        os.makedirs(os.path.dirname(self.index_path), exist_ok=True)
+        generation = time.time_ns()  # Ties the arrays file to the matching edge lists
+        tmp_path = self.arrays_path + ".tmp.npz"
+        np.savez(tmp_path, generation=np.int64(generation), offsets=self.offsets, targets=self.targets,
+                 edge_labels=self.edge_labels, in_offsets=self.in_offsets, in_sources=self.in_sources,
+                 in_edge_labels=self.in_edge_labels)
+        os.replace(tmp_path, self.arrays_path)
+        tmp_path = self.index_path + ".tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump({"version": 1, "generation": generation, "files": self.files, "node_ids": self.node_ids,
+                       "node_labels": self.node_labels, "relations": self.relations}, f)
+        os.replace(tmp_path, self.index_path)
+        # Entries replayed on top of the snapshot after a crash here are idempotent
+        open(self.journal_path, 'w').close()
+        self._mtime = os.path.getmtime(self.index_path)
+        self._journal_offset, self._journal_entries = 0, 0
+
+    def pending(self):
+        """
+        Returns the number of journal entries not yet folded into the snapshot.
+        """
+        return self._journal_entries
+
+    def add(self, key, data, persist=True):
+        """
+        Adds (or replaces) the nodes and edges of the graph record stored under key.
+        Records that are not graphs are ignored. Returns True if the record was a graph.
+        """
+        with self._lock, self._writing(persist):
+            if not is_graph_record(data):
+                if key in self.files:
+                    self.remove(key, persist)
+                return False
+            self._set_file(key, _graph_entry(data))
+            if persist:
+                self._journal([(key, self.files[key])])
+            return True
+
+    def add_many(self, items, persist=True):
+        """
+        Adds several (key, data) records and journals the changes in one append.
+        Returns the number of graph records among them.
+        """
+        with self._lock, self._writing(persist):
+            entries = []
+            for key, data in items:
+                if is_graph_record(data):
+                    entry = _graph_entry(data)
+                    self._set_file(key, entry)
+                    entries.append((key, entry))
+                elif self._set_file(key, None) is not None:
+                    entries.append((key, None))
+            if entries and persist:
+                self._journal(entries)
+            return sum(1 for _, entry in entries if entry is not None)
+
+    def remove(self, key, persist=True):
+        """
+        Removes a graph record's nodes and edges.
+        """
+        with self._lock, self._writing(persist):
+            if self._set_file(key, None) is not None and persist:
+                self._journal([(key, None)])
+
+    @contextlib.contextmanager
+    def _writing(self, persist):
+        """
+        Holds the lock file around a persisted write, after replaying the entries other
+        processes journaled, so the write lands after them.
+        """
+        if not persist:
+            yield
+            return
+        with self._file_lock:
+            self.refresh()
+            yield
+
+    def _set_file(self, key, entry):
+        """
+        Stores a record's node and edge lists (removes them if entry is None) and, once
+        the CSR arrays are built, applies the change to the overlay. Returns the old lists.
+        """
+        old = self.files.get(key)
+        if old is None and entry is None:
+            return None
+        if not self._dirty:
+            self._apply_change(key, old, entry)
+        if entry is None:
+            del self.files[key]
+        else:
+            self.files[key] = entry
+        return old
+
+    def _journal(self, entries):
+        """
+        Appends updates to the journal, checkpointing when it has grown long enough.
+        """
+        if self._journal_entries + len(entries) >= self.checkpoint_interval:
+            self._save()
+            return
+        os.makedirs(os.path.dirname(self.journal_path), exist_ok=True)
+        with open(self.journal_path, 'a') as f:
+            f.write("".join(json.dumps({"key": key, "graph": entry}) + "\n" for key, entry in entries))
+        self._journal_offset = os.path.getsize(self.journal_path)
+        self._journal_entries += len(entries)
+
+    def _replay_journal(self):
+        """
+        Applies journal entries written after the current offset.
+        """
+        try:
+            with open(self.journal_path, 'r') as f:
+                f.seek(self._journal_offset)
+                for line in f:
+                    if not line.endswith("\n"):
+                        break  # Partially written entry; picked up on the next refresh
+                    entry = json.loads(line)
+                    self._set_file(entry["key"], entry["graph"])
+                    self._journal_offset += len(line.encode("utf-8"))
+                    self._journal_entries += 1
+        except FileNotFoundError:
+            pass
+
+    def rebuild(self, records, persist=True):
+        """
+        Rebuilds the index from an iterable of (key, data) pairs. Returns the number of graphs.
+        With persist=False it is only built in memory; the first write persists it.
+        """
+        with self._lock:
+            self.files, self._dirty = {}, True
+            for key, data in records:
+                self.add(key, data, persist=False)
+            if persist:
+                with self._file_lock:
+                    self._save()  # The rebuilt index replaces whatever was persisted
+            self.in_memory = not persist
+            return len(self.files)
+
+    def __contains__(self, node):
+        with self._lock:
+            self._build()
+            row = self._rows.get(str(node))
+            return row is not None and self._exists(row)
+
+    def __len__(self):
+        with self._lock:
+            self._build()
+            if self._node_files is None:
+                return len(self.node_ids)
+            return sum(1 for row in range(len(self.node_ids)) if self._exists(row))
+
+    def label(self, node):
+        """
+        Returns the label of a node (None if the node was only referenced by edges).
+        """
+        with self._lock:
+            self._build()
+            row = self._row(node)
+            if self._node_files is None:
+                return self.node_labels[row]
+            files = self._node_files.get(row)
+            return files[max(files)] if files else None  # The last record in key order wins, as in _build
+
+    def neighbors(self, node, relations=None, direction="out"):
+        """
+        Returns the ids of the nodes one edge away from node, optionally following only
+        edges whose relation is in relations. direction is "out", "in" or "both".
+        """
+        with self._lock:
+            self._build()
+            rows, _ = self._expand(np.array([self._row(node)], dtype=np.int64), self._relation_ids(relations), direction)
+            return [self.node_ids[row] for row in np.unique(rows).tolist()]
+
+    def edges(self, node, relations=None, direction="out"):
+        """
+        Returns the (source, relation, target) triples incident to node.
+        """
+        with self._lock:
+            self._build()
+            row = self._row(node)
+            relation_ids = self._relation_ids(relations)
+            triples = []
+            if direction in ("out", "both"):
+                for target, label in self._adjacency(row, "out"):
+                    if relation_ids is None or label in relation_ids:
+                        triples.append((self.node_ids[row], self.relations[label], self.node_ids[target]))
+            if direction in ("in", "both"):
+                for source, label in self._adjacency(row, "in"):
+                    if relation_ids is None or label in relation_ids:
+                        triples.append((self.node_ids[source], self.relations[label], self.node_ids[row]))
+            return triples
+
+    def bfs(self, start, max_depth=None, relations=None, direction="out"):
+        """
+        Breadth-first traversal from start. Returns {node id: depth} for every node reached
+        within max_depth edges (unbounded if None), including start at depth 0.
+        """
+        with self._lock:
+            self._build()
+            relation_ids = self._relation_ids(relations)
+            depths = {self._row(start): 0}
+            frontier = np.array(list(depths), dtype=np.int64)
+            depth = 0
+            while len(frontier) and (max_depth is None or depth < max_depth):
+                depth += 1
+                next_rows = []
+                for row in np.unique(self._expand(frontier, relation_ids, direction)[0]).tolist():
+                    if row not in depths:
+                        depths[row] = depth
+                        next_rows.append(row)
+                frontier = np.array(next_rows, dtype=np.int64)
+            return {self.node_ids[row]: node_depth for row, node_depth in depths.items()}
+
+    def k_hop(self, start, k, relations=None, direction="out"):
+        """
+        Returns the ids of the nodes at most k edges away from start, excluding start.
+        """
+        reached = self.bfs(start, k, relations, direction)
+        return sorted(node for node, depth in reached.items() if depth > 0)
+
+    def shortest_path(self, source, target, relations=None, direction="out"):
+        """
+        Returns the node ids along a shortest path from source to target (inclusive), or
+        None if target cannot be reached.
+        """
+        with self._lock:
+            self._build()
+            relation_ids = self._relation_ids(relations)
+            source_row, target_row = self._row(source), self._row(target)
+            parents = {source_row: None}
+            frontier = np.array([source_row], dtype=np.int64)
+            while len(frontier) and target_row not in parents:
+                next_rows = []
+                neighbors, origins = self._expand(frontier, relation_ids, direction)
+                for neighbor, row in zip(neighbors.tolist(), origins.tolist()):
+                    if neighbor not in parents:
+                        parents[neighbor] = row
+                        next_rows.append(neighbor)
+                frontier = np.array(next_rows, dtype=np.int64)
+            if target_row not in parents:
+                return None
+            path = [target_row]
+            while parents[path[-1]] is not None:
+                path.append(parents[path[-1]])
+            return [self.node_ids[row] for row in reversed(path)]
+
+    def _expand(self, rows, relation_ids, direction):
+        """
+        Returns the neighbour rows of all given rows, gathering their CSR slices at once,
+        and for each neighbour the row it was reached from.
+        """
+        gathered = []
+        if direction in ("out", "both"):
+            gathered.append(self._gather(self.offsets, self.targets, self.edge_labels, self._overlay_out,
+                                         rows, relation_ids))
+        if direction in ("in", "both"):
+            gathered.append(self._gather(self.in_offsets, self.in_sources, self.in_edge_labels, self._overlay_in,
+                                         rows, relation_ids))
+        if not gathered:
+            raise ValueError(f"Invalid direction: {direction}")
+        return np.concatenate([neighbors for neighbors, _ in gathered]), np.concatenate([origins for _, origins in gathered])
+
+    def _gather(self, offsets, neighbors, labels, overlay, rows, relation_ids):
+        if overlay or len(offsets) - 1 < len(self.node_ids):
+            # Rows in the overlay (or added since the CSR was built) are read from the overlay
+            in_overlay = np.fromiter((row in overlay or row >= len(offsets) - 1 for row in rows.tolist()),
+                                     dtype=bool, count=len(rows))
+            if in_overlay.any():
+                pairs = [(neighbor, label, row) for row in rows[in_overlay].tolist()
+                         for neighbor, label in overlay.get(row, ())
+                         if relation_ids is None or label in relation_ids]
+                base_neighbors, base_origins = self._gather(offsets, neighbors, labels, {}, rows[~in_overlay],
+                                                            relation_ids)
+                return (np.concatenate([base_neighbors, np.array([pair[0] for pair in pairs], dtype=np.int64)]),
+                        np.concatenate([base_origins, np.array([pair[2] for pair in pairs], dtype=np.int64)]))
+        starts, ends = offsets[rows], offsets[rows + 1]
+        lengths = ends - starts
+        total = int(lengths.sum())
+        if not total:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+        # Positions of every edge in the selected slices: start of its slice + index within it
+        positions = np.repeat(starts - np.cumsum(lengths) + lengths, lengths) + np.arange(total)
+        origins = np.repeat(rows, lengths)
+        if relation_ids is not None:
+            keep = np.isin(labels[positions], relation_ids)
+            positions, origins = positions[keep], origins[keep]
+        return neighbors[positions].astype(np.int64), origins
+
+    def _relation_ids(self, relations):
+        if relations is None:
+            return None
+        if isinstance(relations, str):
+            relations = [relations]
+        return np.array([self._relation_rows[relation] for relation in relations if relation in self._relation_rows],
+                        dtype=np.int32)
+
+    def _row(self, node):
+        row = self._rows.get(str(node))
+        if row is None or not self._exists(row):
+            raise KeyError(f"Unknown node: {node}")
+        return row
+
+    def _exists(self, row):
+        """
+        Returns True if a node is still listed by a record or incident to an edge; rows of
+        nodes whose records were removed stay allocated until the overlay is folded.
+        """
+        if self._node_files is None or self._node_files.get(row):
+            return True
+        return bool(self._adjacency(row, "out") or self._adjacency(row, "in"))
+
+    def _adjacency(self, row, direction):
+        """
+        Returns the (neighbour row, relation id) pairs of one node from the overlay or the CSR.
+        """
+        overlay = self._overlay_out if direction == "out" else self._overlay_in
+        if row in overlay:
+            return overlay[row]
+        offsets, neighbors, labels = (self.offsets, self.targets, self.edge_labels) if direction == "out" else \
+            (self.in_offsets, self.in_sources, self.in_edge_labels)
+        if row >= len(offsets) - 1:
+            return []
+        start, end = offsets[row], offsets[row + 1]
+        return list(zip(neighbors[start:end].tolist(), labels[start:end].tolist()))
+
+    def _apply_change(self, key, old, new):
+        """
+        Applies the replacement of a record's node and edge lists to the overlay: only the
+        nodes the record mentions are touched.
+        """
+        if self._node_files is None:
+            # Which records list each node, so labels and removals can be resolved per node
+            self._node_files = {}
+            for file_key, entry in self.files.items():
+                for node_id, label in entry["nodes"]:
+                    self._node_files.setdefault(self._rows[node_id], {})[file_key] = label
+        if old is not None:
+            for node_id, _ in old["nodes"]:
+                self._node_files.get(self._rows[node_id], {}).pop(key, None)
+            for source, target, relation in old["edges"]:
+                self._change_edge(source, target, relation, remove=True)
+        if new is not None:
+            for node_id, label in new["nodes"]:
+                self._node_files.setdefault(self._add_node(node_id), {})[key] = label
+            for source, target, relation in new["edges"]:
+                self._change_edge(source, target, relation)
+
+    def _change_edge(self, source, target, relation, remove=False):
+        source_row, target_row = self._add_node(source), self._add_node(target)
+        label = self._relation_rows.get(relation)
+        if label is None:
+            label = self._relation_rows[relation] = len(self.relations)
+            self.relations.append(relation)
+        for overlay, row, pair in ((self._overlay_out, source_row, (target_row, label)),
+                                   (self._overlay_in, target_row, (source_row, label))):
+            if row not in overlay:
+                overlay[row] = self._adjacency(row, "out" if overlay is self._overlay_out else "in")
+            if remove:
+                overlay[row].remove(pair)
+            else:
+                overlay[row].append(pair)
+
+    def _add_node(self, node_id):
+        row = self._rows.get(node_id)
+        if row is None:
+            row = self._rows[node_id] = len(self.node_ids)
+            self.node_ids.append(node_id)
+            self.node_labels.append(None)
+        return row
+
+    def _build(self):
+        """
+        Merges the per-file node and edge lists into the CSR arrays if they have changed.
+        """
+        if not self._dirty:
+            return
+        node_ids, node_labels, rows = [], [], {}
+
+        def row_of(node_id):
+            row = rows.get(node_id)
+            if row is None:
+                row = rows[node_id] = len(node_ids)
+                node_ids.append(node_id)
+                node_labels.append(None)
+            return row
+
+        for key in sorted(self.files):
+            for node_id, label in self.files[key]["nodes"]:
+                node_labels[row_of(node_id)] = label
+
+        relations, relation_rows = [], {}
+        sources, targets, labels = [], [], []
+        for key in sorted(self.files):
+            for source, target, relation in self.files[key]["edges"]:
+                if relation not in relation_rows:
+                    relation_rows[relation] = len(relations)
+                    relations.append(relation)
+                sources.append(row_of(source))
+                targets.append(row_of(target))
+                labels.append(relation_rows[relation])
+
+        sources = np.array(sources, dtype=np.int64)
+        targets = np.array(targets, dtype=np.int64)
+        labels = np.array(labels, dtype=np.int32)
+        arrays = {}
+        for prefix, keys, values in (("", sources, targets), ("in_", targets, sources)):
+            order = np.argsort(keys, kind="stable")
+            arrays[f"{prefix}offsets"] = np.concatenate(([0], np.cumsum(np.bincount(keys, minlength=len(node_ids))))).astype(np.int64)
+            arrays["in_sources" if prefix else "targets"] = values[order].astype(np.int32)
+            arrays[f"{prefix}edge_labels"] = labels[order]
+        self._set_arrays(node_ids, node_labels, relations, arrays)
+
+    def _set_arrays(self, node_ids, node_labels, relations, arrays):
+        self.node_ids = node_ids
+        self.node_labels = node_labels
+        self.relations = relations
+        self._rows = {node_id: row for row, node_id in enumerate(node_ids)}
+        self._relation_rows = {relation: row for row, relation in enumerate(relations)}
+        self.offsets = arrays["offsets"]
+        self.targets = arrays["targets"]
+        self.edge_labels = arrays["edge_labels"]
+        self.in_offsets = arrays["in_offsets"]
+        self.in_sources = arrays["in_sources"]
+        self.in_edge_labels = arrays["in_edge_labels"]
+        self._overlay_out, self._overlay_in, self._node_files = {}, {}, None
+        self._dirty = False
+
+def is_graph_record(data):
+    """
+    Returns True for records shaped like GraphModel data: {"nodes": [...], "edges": [...]}.
+    """
+    return isinstance(data, dict) and isinstance(data.get("nodes"), list) and isinstance(data.get("edges"), list)
+
+def _graph_entry(data):
+    """
+    Returns the node and edge lists kept per graph record.
+    """
+    return {
+        "nodes": [[str(node["id"]), node.get("label")] for node in data["nodes"]
+                  if isinstance(node, dict) and "id" in node],
+        "edges": [[str(edge["source"]), str(edge["target"]), edge_relation(edge)] for edge in data["edges"]
+                  if isinstance(edge, dict) and "source" in edge and "target" in edge],
+    }
+
+def edge_relation(edge):
+    """
+    Returns an edge's label, stored as "relation" (falling back to "label" or "type").
+    """
+    for field in ("relation", "label", "type"):
+        if field in edge:
+            return str(edge[field])
+    return ""
@@ -0,0 +1,58 @@
+import os
+from .metadata import MetadataManager
+from vector_integration.attributes import record_attributes
+
+class HybridSearch:
+    """
+    Combines attribute filters with vector similarity in a single call.
+    Filters are pushed down into the vector search (see AttributeTable for the syntax),
+    so only matching rows are scored or returned instead of filtering loaded records.
+    Only fields declared in the Storage's filterable_fields can be filtered on, e.g.
+    {"document": ["price"], "multimedia": ["tags"]}.
+    """
+    def __init__(self, storage, metadata_manager=None):
+        if not storage.vector_db_enabled:
+            raise ValueError("Hybrid search requires a Storage with vector_db_enabled=True")
+        self.storage = storage
+        # Metadata of the same data directory, sharing the Storage's blob store and codec
+        self.metadata_manager = metadata_manager or MetadataManager(
+            os.path.join(storage.base_path, "multimedia_metadata"), storage.blobs, storage.codec)
+
+    def add_multimedia_embedding(self, filename, embedding):
+        """
+        Adds an embedding for a multimedia file, using its metadata (e.g. tags) as attributes.
+        """
+        metadata = self.metadata_manager.load_metadata(filename) or {}
+        fields = self.storage.filterable_fields.get("multimedia", ())
+        self.storage.vector_db.add_embedding(filename, embedding,
+                                             attributes=record_attributes("multimedia", metadata, fields))
+
+    def search(self, query_embedding, top_k=5, model_type=None, filters=None, load=True, **search_args):
+        """
+        Returns the top_k most similar records matching the filters, e.g.
+        search(embedding, model_type="document", filters={"price": ("<", 900)}) or
+        search(embedding, model_type="multimedia", filters={"tags": ("contains", "cat")}).
+        Each result has data_id, similarity, model and, if load is True, the record itself
+        (the metadata for multimedia results).
+        """
+        filters = dict(filters or {})
+        if model_type:
+            filters["model"] = model_type
+        matches = self.storage.vector_db.search_embedding(query_embedding, top_k=top_k, filters=filters, **search_args)
+
+        results = []
+        for match in matches:
+            attributes = self.storage.vector_db.get_attributes(match["data_id"]) or {}
+            result = {**match, "model": attributes.get("model")}
+            if load:
+                result["record"] = self._load_record(result["model"], match["data_id"])
+            results.append(result)
+        return results
+
+    def _load_record(self, model_type, data_id):
+        if model_type == "multimedia":
+            return self.metadata_manager.load_metadata(data_id)
+        try:
+            return self.storage.load_data(model_type, data_id)
+        except (ValueError, FileNotFoundError):
+            return None
@@ -0,0 +1,346 @@
+import io
+import os
+import re
+import json
+import threading
+import csv
+from .cache import record_cache
+from .codecs import decode_record
+from .columnar import ColumnarTable
+from .file_lock import FileLock
+from .metrics import metrics
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+RECORD_EXTENSIONS = ('.json', '.csv', '.col')  # .col is a columnar table directory
+GRAM_SIZE = 3  # Longest term substrings indexed for substring matching
+
+class InvertedIndex:
+    """
+    Persistent inverted index mapping terms to the records that contain them.
+    Postings are record keys relative to the data directory, e.g. "structured/users.csv".
+    The index is persisted as a snapshot plus an append-only journal of updates, so a
+    single write appends one line; the journal is folded into the snapshot every
+    checkpoint_interval updates. Writers hold a lock file while they catch up with the
+    journal and append to it or replace the snapshot, so several processes can share it.
+    """
+    INDEXED_PATHS = ["structured", "unstructured/document", "unstructured/graph", "unstructured/keyvalue"]
+
+    def __init__(self, base_path="data", index_path=None, checkpoint_interval=1000):
+        self.base_path = base_path
+        self.index_path = index_path or os.path.join(base_path, "index", "inverted_index.json")
+        self.journal_path = os.path.splitext(self.index_path)[0] + ".log"
+        self.checkpoint_interval = checkpoint_interval
+        self.terms = {}  # term -> set of record keys
+        self.docs = {}  # record key -> list of terms
+        self._grams = None  # n-gram -> set of terms containing it, built on the first search
+        self._snapshot_mtime = None
+        self._journal_offset = 0  # Bytes of the journal already applied
+        self._journal_entries = 0
+        self.in_memory = False  # Built by rebuild(persist=False) and not persisted
+        self._lock = threading.RLock()  # Lets threads of one process share the index
+        self._file_lock = FileLock(os.path.splitext(self.index_path)[0] + ".lock")
+        self.load()
+
+    def load(self):
+        """
+        Loads the index from disk. Returns False if no index has been written yet.
+        """
+        with self._lock:
+            self.terms, self.docs, self._grams = {}, {}, None
+            self._snapshot_mtime, self._journal_offset, self._journal_entries = None, 0, 0
+            self.in_memory = False
+            try:
+                with open(self.index_path, 'r') as f:
+                    stored = json.load(f)
+                self._snapshot_mtime = os.path.getmtime(self.index_path)
+            except FileNotFoundError:
+                stored = {}
+
+            for key, terms in stored.get("docs", {}).items():
+                self._set(key, terms)
+            self._replay_journal()
+            return self.exists()
+
+    def refresh(self):
+        """
+        Picks up updates written by other Storage instances since the index was loaded:
+        new journal entries are replayed, and a new snapshot triggers a full reload.
+        Returns False if no index has been written yet.
+        """
+        with self._lock:
+            try:
+                snapshot_mtime = os.path.getmtime(self.index_path)
+            except FileNotFoundError:
+                snapshot_mtime = None
+            try:
+                journal_size = os.path.getsize(self.journal_path)
+            except FileNotFoundError:
+                journal_size = 0
+            if snapshot_mtime != self._snapshot_mtime or journal_size < self._journal_offset:
+                return self.load()
+            if journal_size > self._journal_offset:
+                self._replay_journal()
+            return self.exists()
+
+    def exists(self):
+        """
+        Returns True if the index has been persisted.
+        """
+        return self._snapshot_mtime is not None or self._journal_offset > 0
+
+    def ready(self):
+        """
+        Refreshes the index and returns True if it can answer queries: it has been
+        persisted, or built in memory since nothing was persisted.
+        """
+        with self._lock:
+            return self.refresh() or self.in_memory
+
+    def save(self):
+        """
+        Writes a snapshot of the index to disk atomically and clears the journal. Entries
+        other processes journaled since the last refresh are replayed first, so clearing
+        the journal cannot drop them.
+        """
+        with self._lock, self._file_lock:
+            self.refresh()
+            self._write_snapshot()
+
+    def _write_snapshot(self):
+        with self._lock, self._file_lock:
+            os.makedirs(os.path.dirname(self.index_path), exist_ok=True)
+            tmp_path = self.index_path + ".tmp"
+            with open(tmp_path, 'w') as f:
+                json.dump({"version": 1, "docs": self.docs}, f)
+            os.replace(tmp_path, self.index_path)
+            # Entries replayed on top of the snapshot after a crash here are idempotent
+            open(self.journal_path, 'w').close()
+            self._snapshot_mtime = os.path.getmtime(self.index_path)
+            self._journal_offset, self._journal_entries = 0, 0
+
+    def add(self, key, data, persist=True):
+        """
+        Indexes (or re-indexes) the record stored under key.
+        """
+        self._update([(key, sorted(tokenize_record(data)))], persist)
+
+    def add_many(self, items, persist=True):
+        """
+        Indexes several (key, data) records and journals them in one append. Unlike add,
+        it never folds the journal into the snapshot; bulk loaders call save() once done.
+        """
+        entries = [(key, sorted(tokenize_record(data))) for key, data in items]
+        if entries:
+            self._update(entries, persist, checkpoint=False)
+
+    def remove(self, key, persist=True):
+        """
+        Removes a record from the index.
+        """
+        self._update([(key, None)], persist)
+
+    def _update(self, entries, persist, checkpoint=True):
+        """
+        Applies (key, terms) updates, terms None removing the record, and journals them,
+        checkpointing when the journal has grown long enough. Entries other processes
+        journaled are replayed first, so the updates land after them.
+        """
+        with self._lock:
+            if not persist:
+                for key, terms in entries:
+                    self._apply(key, terms)
+                return
+            with self._file_lock:
+                self.refresh()
+                for key, terms in entries:
+                    self._apply(key, terms)
+                if checkpoint and self._journal_entries + len(entries) >= self.checkpoint_interval:
+                    self._write_snapshot()
+                else:
+                    self._append_journal(entries)
+
+    def _apply(self, key, terms):
+        if terms is None:
+            self._discard(key)
+        else:
+            self._set(key, terms)
+
+    def _set(self, key, terms):
+        self._discard(key)
+        self.docs[key] = terms
+        for term in terms:
+            postings = self.terms.get(term)
+            if postings is None:
+                postings = self.terms[term] = set()
+                if self._grams is not None:
+                    for gram in _grams(term):
+                        self._grams.setdefault(gram, set()).add(term)
+            postings.add(key)
+
+    def _append_journal(self, entries):
+        os.makedirs(os.path.dirname(self.journal_path), exist_ok=True)
+        with open(self.journal_path, 'a') as f:
+            f.write("".join(json.dumps({"key": key, "terms": terms}) + "\n" for key, terms in entries))
+        self._journal_offset = os.path.getsize(self.journal_path)
+        self._journal_entries += len(entries)
+
+    def _replay_journal(self):
+        """
+        Applies journal entries written after the current offset.
+        """
+        try:
+            with open(self.journal_path, 'r') as f:
+                f.seek(self._journal_offset)
+                for line in f:
+                    if not line.endswith("\n"):
+                        break  # Partially written entry; picked up on the next refresh
+                    entry = json.loads(line)
+                    self._apply(entry["key"], entry["terms"])
+                    self._journal_offset += len(line.encode("utf-8"))
+                    self._journal_entries += 1
+        except FileNotFoundError:
+            pass
+
+    def _discard(self, key):
+        for term in self.docs.pop(key, []):
+            postings = self.terms.get(term)
+            if postings is not None:
+                postings.discard(key)
+                if not postings:
+                    del self.terms[term]
+                    if self._grams is not None:
+                        for gram in _grams(term):
+                            terms = self._grams[gram]
+                            terms.discard(term)
+                            if not terms:
+                                del self._grams[gram]
+
+    def keys(self, prefix=""):
+        """
+        Returns all indexed record keys under the given path prefix.
+        """
+        with self._lock:
+            return sorted(key for key in self.docs if key.startswith(prefix))
+
+    def candidates(self, query_terms, prefix=""):
+        """
+        Returns the record keys that may match any of the query terms, or None if
+        a term cannot be answered from the index (e.g. it contains no word characters).
+        Matching is by substring, so every indexed term containing a query token is
+        considered; the terms are found through an index of their substrings of up to
+        GRAM_SIZE characters. Candidates must still be verified against the record itself.
+        """
+        with self._lock:
+            matches = set()
+            for query_term in query_terms:
+                tokens = tokenize(str(query_term))
+                if not tokens:
+                    return None
+                term_matches = None
+                for token in tokens:
+                    postings = set()
+                    for term in self._matching_terms(token):
+                        postings.update(self.terms[term])
+                    term_matches = postings if term_matches is None else term_matches & postings
+                    if not term_matches:
+                        break
+                matches.update(term_matches)
+            return sorted(key for key in matches if key.startswith(prefix))
+
+    def _matching_terms(self, token):
+        """
+        Returns the indexed terms containing token.
+        """
+        if self._grams is None:
+            self._grams = {}
+            for term in self.terms:
+                for gram in _grams(term):
+                    self._grams.setdefault(gram, set()).add(term)
+        size = min(len(token), GRAM_SIZE)
+        term_sets = sorted((self._grams.get(token[i:i + size], set()) for i in range(len(token) - size + 1)), key=len)
+        if len(token) <= GRAM_SIZE:
+            return term_sets[0]
+        return [term for term in term_sets[0].intersection(*term_sets[1:]) if token in term]
+
+    def rebuild(self, records=None, persist=True):
+        """
+        Rebuilds the index from the files currently under the data directory, or from an
+        iterable of (key, data) pairs. Returns the number of indexed records.
+        With persist=False the index is only built in memory, so reads never write;
+        the first write persists it.
+        """
+        with self._lock:
+            self.terms, self.docs, self._grams = {}, {}, None
+            if records is None:
+                records = self._read_record_files()
+            for key, data in records:
+                self.add(key, data, persist=False)
+            if persist:
+                self._write_snapshot()  # The rebuilt index replaces whatever was persisted
+            self.in_memory = not persist
+            return len(self.docs)
+
+    def _read_record_files(self):
+        for data_path in self.INDEXED_PATHS:
+            directory = os.path.join(self.base_path, data_path)
+            if not os.path.isdir(directory):
+                continue
+            for filename in sorted(os.listdir(directory)):
+                data = read_record_file(os.path.join(directory, filename))
+                if data is not None:
+                    yield f"{data_path}/{filename}", data
+
+def _grams(term):
+    """
+    Returns the substrings of a term of up to GRAM_SIZE characters.
+    """
+    return {term[i:i + size] for size in range(1, GRAM_SIZE + 1) for i in range(len(term) - size + 1)}
+
+def tokenize(text):
+    """
+    Splits text into lowercase alphanumeric terms.
+    """
+    return TOKEN_PATTERN.findall(text.lower())
+
+def tokenize_record(data):
+    """
+    Returns the set of terms for a record, using the same value stringification as Query.
+    """
+    if isinstance(data, dict):
+        values = data.values()
+    elif isinstance(data, list):
+        values = data
+    else:
+        return set()
+    terms = set()
+    for value in values:
+        terms.update(tokenize(str(value)))
+    return terms
+
+def read_record_file(filepath):
+    """
+    Parses a JSON, CSV or columnar table record. Returns None for non-data files.
+    JSON and CSV records come from the shared record cache and must not be modified.
+    """
+    if filepath.endswith(('.json', '.csv')):
+        return record_cache.load(filepath, _parse_record_file)
+    elif filepath.endswith('.col'):
+        if not os.path.isdir(filepath):
+            raise FileNotFoundError(f"No such table: {filepath}")
+        return ColumnarTable(filepath).to_rows()
+    return None
+
+def _parse_record_file(filepath):
+    start = metrics.start()
+    if filepath.endswith('.json'):
+        with open(filepath, 'rb') as f:
+            payload = f.read()
+    else:
+        with open(filepath, 'r') as f:
+            payload = f.read()
+    metrics.stop("record.read", start)
+    metrics.increment("record.bytes_read", len(payload))
+    start = metrics.start()
+    data = decode_record(payload) if filepath.endswith('.json') else list(csv.reader(io.StringIO(payload)))
+    metrics.stop("record.parse", start)
+    return data
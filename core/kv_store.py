@@ -0,0 +1,223 @@
+import time
+import struct
+from .segment_store import SegmentStore
+
+EXPIRY = struct.Struct("<d")  # Expiry timestamp prefixed to every value, 0 if it never expires
+INT64 = struct.Struct("<q")
+FLOAT64 = struct.Struct("<d")
+LENGTH = struct.Struct("<I")
+
+class KeyValueStore:
+    """
+    Key-value engine for point lookups, e.g. session data.
+    Entries live in a SegmentStore, whose in-memory hash index maps every key to the
+    position of its latest value, so get is a dictionary lookup plus one positioned read
+    regardless of the number of keys. Values are Python primitives, bytes, lists and
+    dicts in a compact tagged binary encoding, optionally with a time to live in seconds.
+    Expired entries read as missing and are removed by purge_expired (or overwritten);
+    the segment store's compaction then reclaims their space.
+    """
+    def __init__(self, path, sync=False, **segment_options):
+        self.path = path
+        self.segments = SegmentStore(path, sync=sync, **segment_options)
+
+    def __contains__(self, key):
+        return self._read(key) is not None
+
+    def __len__(self):
+        """
+        Returns the number of stored keys, including expired ones not purged yet.
+        """
+        return len(self.segments)
+
+    def get(self, key, default=None):
+        """
+        Returns the value stored under key, or default if it is missing or expired.
+        """
+        value = self._read(key)
+        return default if value is None else decode_value(value)
+
+    def multi_get(self, keys):
+        """
+        Returns {key: value} for the keys that exist and have not expired.
+        """
+        values = {}
+        for key in keys:
+            value = self._read(key)
+            if value is not None:
+                values[key] = decode_value(value)
+        return values
+
+    def put(self, key, value, ttl=None):
+        """
+        Stores value under key, expiring it after ttl seconds if given.
+        """
+        self.segments.put(key, self._frame(value, ttl))
+
+    def put_many(self, items, ttl=None):
+        """
+        Stores many (key, value) pairs with a single write, e.g. put_many(record.items())
+        to import a keyvalue record.
+        """
+        self.segments.put_many((key, self._frame(value, ttl)) for key, value in items)
+
+    def delete(self, key):
+        """
+        Deletes a key. Returns False if it does not exist.
+        """
+        return self.segments.delete(key)
+
+    def ttl(self, key):
+        """
+        Returns the seconds left before key expires, None if it never expires.
+        Raises KeyError if the key is missing or expired.
+        """
+        try:
+            expires_at, = EXPIRY.unpack(self.segments.get(key)[:EXPIRY.size])
+        except KeyError:
+            raise KeyError(key) from None
+        if not expires_at:
+            return None
+        remaining = expires_at - time.time()
+        if remaining <= 0:
+            raise KeyError(key)
+        return remaining
+
+    def keys(self, prefix=""):
+        """
+        Returns the live, unexpired keys under the given prefix, sorted.
+        """
+        return [key for key in self.segments.keys(prefix) if self._read(key) is not None]
+
+    def purge_expired(self):
+        """
+        Deletes every expired entry. Returns the number of deleted keys.
+        """
+        now = time.time()
+        purged = 0
+        for key in self.segments.keys():
+            try:
+                expires_at, = EXPIRY.unpack(self.segments.get(key)[:EXPIRY.size])
+            except KeyError:
+                continue  # Deleted concurrently
+            if expires_at and expires_at <= now and self.segments.delete(key):
+                purged += 1
+        return purged
+
+    def flush(self, sync=True):
+        self.segments.flush(sync)
+
+    def compact(self, force=False):
+        return self.segments.compact(force)
+
+    def close(self):
+        self.segments.close()
+
+    def _frame(self, value, ttl):
+        return EXPIRY.pack(time.time() + ttl if ttl is not None else 0.0) + encode_value(value)
+
+    def _read(self, key):
+        """
+        Returns the encoded value of an unexpired key, or None.
+        """
+        try:
+            payload = self.segments.get(key)
+        except KeyError:
+            return None
+        expires_at, = EXPIRY.unpack_from(payload)
+        if expires_at and expires_at <= time.time():
+            return None
+        return memoryview(payload)[EXPIRY.size:]
+
+def encode_value(value):
+    """
+    Encodes a value (None, bool, int, float, str, bytes, list/tuple, dict) as bytes.
+    Every value is a one-byte tag followed by its payload; strings, bytes and containers
+    carry a 4-byte length.
+    """
+    out = bytearray()
+    _encode(value, out)
+    return bytes(out)
+
+def decode_value(payload):
+    """
+    Decodes bytes produced by encode_value.
+    """
+    value, _ = _decode(memoryview(payload), 0)
+    return value
+
+def _encode(value, out):
+    if value is None:
+        out += b"N"
+    elif value is True:
+        out += b"T"
+    elif value is False:
+        out += b"F"
+    elif isinstance(value, int):
+        if -2 ** 63 <= value < 2 ** 63:
+            out += b"i" + INT64.pack(value)
+        else:
+            _encode_bytes(b"I", str(value).encode("ascii"), out)  # Beyond 64 bits
+    elif isinstance(value, float):
+        out += b"d" + FLOAT64.pack(value)
+    elif isinstance(value, str):
+        _encode_bytes(b"s", value.encode("utf-8"), out)
+    elif isinstance(value, (bytes, bytearray, memoryview)):
+        _encode_bytes(b"b", bytes(value), out)
+    elif isinstance(value, (list, tuple)):
+        out += b"l" + LENGTH.pack(len(value))
+        for item in value:
+            _encode(item, out)
+    elif isinstance(value, dict):
+        out += b"m" + LENGTH.pack(len(value))
+        for key, item in value.items():
+            _encode(key, out)
+            _encode(item, out)
+    else:
+        raise TypeError(f"Cannot encode value of type {type(value).__name__}")
+
+def _encode_bytes(tag, payload, out):
+    out += tag + LENGTH.pack(len(payload))
+    out += payload
+
+def _decode(view, offset):
+    """
+    Decodes the value starting at offset. Returns (value, offset after it).
+    """
+    tag = view[offset:offset + 1].tobytes()
+    offset += 1
+    if tag == b"N":
+        return None, offset
+    if tag == b"T":
+        return True, offset
+    if tag == b"F":
+        return False, offset
+    if tag == b"i":
+        return INT64.unpack_from(view, offset)[0], offset + INT64.size
+    if tag == b"d":
+        return FLOAT64.unpack_from(view, offset)[0], offset + FLOAT64.size
+    if tag in (b"s", b"b", b"I"):
+        length, = LENGTH.unpack_from(view, offset)
+        offset += LENGTH.size
+        payload = view[offset:offset + length].tobytes()
+        offset += length
+        if tag == b"s":
+            return payload.decode("utf-8"), offset
+        return (payload if tag == b"b" else int(payload)), offset
+    if tag == b"l":
+        count, = LENGTH.unpack_from(view, offset)
+        offset += LENGTH.size
+        items = []
+        for _ in range(count):
+            item, offset = _decode(view, offset)
+            items.append(item)
+        return items, offset
+    if tag == b"m":
+        count, = LENGTH.unpack_from(view, offset)
+        offset += LENGTH.size
+        mapping = {}
+        for _ in range(count):
+            key, offset = _decode(view, offset)
+            mapping[key], offset = _decode(view, offset)
+        return mapping, offset
+    raise ValueError(f"Unknown value tag {tag!r} at offset {offset - 1}")
@@ -0,0 +1,26 @@
+import sys
+import threading
+import importlib.util
+
+_lock = threading.Lock()
+
+def lazy_import(name):
+    """
+    Returns the module name without executing it until one of its attributes is first
+    used, so importing a component does not pay for heavy dependencies (such as NumPy)
+    that only some of its operations need. Returns None if the module is not installed,
+    which makes it usable for optional dependencies too.
+    """
+    with _lock:
+        module = sys.modules.get(name)
+        if module is not None:
+            return module
+        spec = importlib.util.find_spec(name)
+        if spec is None:
+            return None
+        loader = importlib.util.LazyLoader(spec.loader)
+        spec.loader = loader
+        module = importlib.util.module_from_spec(spec)
+        sys.modules[name] = module
+        loader.exec_module(module)
+        return module
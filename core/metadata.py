@@ -1,21 +1,52 @@
 import os
-import json
+import copy
+import functools
+from .blob_store import BlobStore
+from .cache import record_cache
+from .codecs import decode_record, get_codec
+from .data_model import write_atomic
+from .metadata_index import MetadataIndex
 
 class MetadataManager:
     """
     Manages metadata storage and retrieval.
+    Saves and deletes keep a MetadataIndex (in the sibling index/ directory) up to date
+    for tag and text queries with facet counts. Metadata with a "blob" field (a digest
+    returned by Storage.save_multimedia_file) holds a reference on that blob in the
+    sibling blobs/ store until the metadata is deleted or points elsewhere.
+    Metadata files are written with the given codec (see core.codecs) and read in any format.
     """
-    def __init__(self, base_path="data/multimedia_metadata"):
+    def __init__(self, base_path="data/multimedia_metadata", blobs=None, codec="json"):
         self.base_path = base_path
-        os.makedirs(self.base_path, exist_ok=True)
+        self.codec = get_codec(codec)
+        self.blobs = blobs or BlobStore(os.path.join(os.path.dirname(os.path.abspath(base_path)), "blobs"))
+
+    @functools.cached_property
+    def index(self):
+        """
+        The MetadataIndex, loaded on first use.
+        """
+        return MetadataIndex(self.base_path)
 
     def save_metadata(self, filename, metadata):
         """
         Saves metadata to a JSON file.
         """
+        os.makedirs(self.base_path, exist_ok=True)
         filepath = os.path.join(self.base_path, f"{filename}.json")
-        with open(filepath, 'w') as f:
-            json.dump(metadata, f, indent=4)
+        previous_blob = self._blob(self.load_metadata(filename))
+        blob = self._blob(metadata)
+        if blob is not None and blob != previous_blob:
+            self.blobs.add_ref(blob, f"metadata:{filename}")
+        with write_atomic(filepath, 'wb') as f:
+            f.write(self.codec.encode(metadata))
+        record_cache.invalidate(filepath)
+        if previous_blob is not None and previous_blob != blob:
+            self.blobs.release(previous_blob, f"metadata:{filename}")
+        if self.index.refresh():
+            self.index.add(filename, metadata)
+        else:
+            self.index.rebuild()  # First write into an unindexed directory
 
     def load_metadata(self, filename):
         """
@@ -23,8 +54,7 @@ class MetadataManager:
         """
         filepath = os.path.join(self.base_path, f"{filename}.json")
         try:
-            with open(filepath, 'r') as f:
-                return json.load(f)
+            return copy.deepcopy(record_cache.load(filepath, _load_json))
         except FileNotFoundError:
             return None
 
@@ -33,7 +63,47 @@ class MetadataManager:
         Deletes a metadata file.
         """
         filepath = os.path.join(self.base_path, f"{filename}.json")
+        blob = self._blob(self.load_metadata(filename))
         try:
             os.remove(filepath)
         except FileNotFoundError:
-            pass
\ No newline at end of file
+            pass
+        record_cache.invalidate(filepath)
+        if blob is not None:
+            self.blobs.release(blob, f"metadata:{filename}")
+        if self.index.refresh():
+            self.index.remove(filename)
+        else:
+            self.index.rebuild()
+
+    def search(self, all_tags=None, any_tags=None, text=None, limit=None):
+        """
+        Returns the filenames of assets carrying every tag in all_tags, at least one tag in
+        any_tags, and every word of text in their metadata.
+        """
+        index = self.open_index()
+        return index.assets(index.query(all_tags, any_tags, text), limit)
+
+    def facets(self, all_tags=None, any_tags=None, text=None, top=None):
+        """
+        Returns tag counts ({tag: assets}) over the assets matching the same conditions as search.
+        """
+        index = self.open_index()
+        return index.facets(index.query(all_tags, any_tags, text), top)
+
+    def _blob(self, metadata):
+        blob = metadata.get("blob") if isinstance(metadata, dict) else None
+        return blob if isinstance(blob, str) else None
+
+    def open_index(self):
+        """
+        Returns the metadata index, building it in memory on first use if it has not been
+        persisted yet.
+        """
+        if not self.index.ready():
+            self.index.rebuild(persist=False)
+        return self.index
+
+def _load_json(filepath):
+    with open(filepath, 'rb') as f:
+        return decode_record(f.read())
\ No newline at end of file
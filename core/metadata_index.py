@@ -0,0 +1,192 @@
+import os
+from .index import InvertedIndex, read_record_file, tokenize, tokenize_record
+from .lazy import lazy_import
+np = lazy_import("numpy")  # Loaded on first use
+
+TAG_PREFIX = "#tag:"  # Marks tag entries among an asset's index terms
+
+class MetadataIndex(InvertedIndex):
+    """
+    Index over multimedia metadata for tag and text queries with facet counts.
+    Every asset gets a row number, and each tag keeps a bitmap of the rows carrying it
+    (packed into uint64 words), so AND/OR tag queries and per-tag facet counts are
+    word-wise bitwise operations instead of scans. Text tokens of all metadata values
+    are indexed as in InvertedIndex, whose snapshot and journal persist the index; an
+    asset's tags are stored alongside its terms with TAG_PREFIX.
+    Keys are asset filenames as passed to MetadataManager, e.g. "image.jpg".
+    """
+    INDEXED_PATHS = []
+
+    def __init__(self, metadata_path="data/multimedia_metadata", index_path=None, checkpoint_interval=1000):
+        self._reset_bitmaps()
+        index_path = index_path or os.path.join(os.path.dirname(os.path.abspath(metadata_path)), "index",
+                                                "metadata_index.json")
+        super().__init__(metadata_path, index_path, checkpoint_interval)
+
+    def load(self):
+        with self._lock:
+            self._reset_bitmaps()
+            self._bulk = True
+            try:
+                return super().load()
+            finally:
+                self._bulk = False
+                self._build_bitmaps()
+
+    def add(self, key, data, persist=True):
+        """
+        Indexes (or re-indexes) the metadata of an asset.
+        """
+        tags = data.get("tags") if isinstance(data, dict) else None
+        tags = [str(tag) for tag in tags] if isinstance(tags, list) else []
+        self._update([(key, sorted(tokenize_record(data) | {TAG_PREFIX + tag for tag in tags}))], persist)
+
+    def rebuild(self, records=None, persist=True):
+        """
+        Rebuilds the index from the metadata files, or from an iterable of (asset, metadata)
+        pairs. Returns the number of indexed assets. With persist=False it is only built in memory.
+        """
+        with self._lock:
+            self._reset_bitmaps()
+            if records is None:
+                records = self._read_metadata_files()
+            self._bulk = True
+            try:
+                return super().rebuild(records, persist)
+            finally:
+                self._bulk = False
+                self._build_bitmaps()
+
+    def query(self, all_tags=None, any_tags=None, text=None):
+        """
+        Returns the bitmap of assets carrying every tag in all_tags, at least one tag in
+        any_tags, and every token of text in their metadata values. With no conditions,
+        every asset matches.
+        """
+        with self._lock:
+            result = self.alive.copy()
+            for tag in all_tags or []:
+                result &= self._tag_words(tag)
+            if any_tags:
+                either = np.zeros_like(result)
+                for tag in any_tags:
+                    either |= self._tag_words(tag)
+                result &= either
+            for token in tokenize(text or ""):
+                result &= self._rows_to_words(self.rows[key] for key in self.terms.get(token, ()))
+            return result
+
+    def assets(self, bitmap, limit=None):
+        """
+        Returns the asset filenames in a bitmap, in row order.
+        """
+        with self._lock:
+            rows = np.flatnonzero(np.unpackbits(_resize(bitmap, len(self.alive)).view(np.uint8), bitorder="little"))
+            return [self.names[row] for row in rows[:limit].tolist()]
+
+    def count(self, bitmap):
+        return popcount(bitmap)
+
+    def facets(self, bitmap=None, top=None):
+        """
+        Returns {tag: number of assets in bitmap carrying it} for every tag present,
+        most frequent first, optionally only the top entries.
+        """
+        with self._lock:
+            bitmap = self.alive if bitmap is None else _resize(bitmap, len(self.alive))
+            counts = {}
+            for tag in self.tag_bitmaps:
+                count = popcount(self._tag_words(tag) & bitmap)
+                if count:
+                    counts[tag] = count
+        ranked = sorted(counts.items(), key=lambda item: (-item[1], item[0]))
+        return dict(ranked[:top])
+
+    def _set(self, key, terms):
+        super()._set(key, terms)
+        row = self.rows.get(key)
+        if row is None:
+            row = self.rows[key] = len(self.names)
+            self.names.append(key)
+        if self._bulk:
+            return  # Bitmaps are built in one pass afterwards
+        self.alive = _set_bit(self.alive, row)
+        for term in terms:
+            if term.startswith(TAG_PREFIX):
+                tag = term[len(TAG_PREFIX):]
+                self.tag_bitmaps[tag] = _set_bit(self.tag_bitmaps.get(tag, np.zeros(0, dtype=np.uint64)), row)
+
+    def _discard(self, key):
+        row = self.rows.get(key)
+        if row is not None and key in self.docs and not self._bulk:
+            for term in self.docs[key]:
+                if term.startswith(TAG_PREFIX):
+                    _clear_bit(self.tag_bitmaps.get(term[len(TAG_PREFIX):]), row)
+            _clear_bit(self.alive, row)  # The row is reused if the asset is indexed again
+        super()._discard(key)
+
+    def _build_bitmaps(self):
+        """
+        Builds the alive and tag bitmaps from the indexed assets in one vectorized pass.
+        """
+        tag_rows = {}
+        for key, terms in self.docs.items():
+            row = self.rows[key]
+            for term in terms:
+                if term.startswith(TAG_PREFIX):
+                    tag_rows.setdefault(term[len(TAG_PREFIX):], []).append(row)
+        self.alive = self._rows_to_words(self.rows[key] for key in self.docs)
+        self.tag_bitmaps = {tag: self._rows_to_words(rows) for tag, rows in tag_rows.items()}
+
+    def _reset_bitmaps(self):
+        self._bulk = False
+        self.rows = {}  # asset -> row
+        self.names = []  # row -> asset
+        self.alive = np.zeros(0, dtype=np.uint64)
+        self.tag_bitmaps = {}  # tag -> uint64 words
+
+    def _tag_words(self, tag):
+        return _resize(self.tag_bitmaps.get(str(tag), np.zeros(0, dtype=np.uint64)), len(self.alive))
+
+    def _rows_to_words(self, rows):
+        words = np.zeros(max(len(self.alive), (len(self.names) + 63) // 64), dtype=np.uint64)
+        rows = np.fromiter(rows, dtype=np.int64)
+        if len(rows):
+            np.bitwise_or.at(words, rows >> 6, np.left_shift(np.uint64(1), (rows & 63).astype(np.uint64)))
+        return words
+
+    def _read_metadata_files(self):
+        try:
+            filenames = sorted(os.listdir(self.base_path))
+        except FileNotFoundError:
+            return
+        for filename in filenames:
+            if filename.endswith('.json'):
+                yield filename[:-len('.json')], read_record_file(os.path.join(self.base_path, filename))
+
+def popcount(words):
+    """
+    Returns the number of set bits in a uint64 word array.
+    """
+    if hasattr(np, "bitwise_count"):
+        return int(np.bitwise_count(words).sum())
+    return int(np.unpackbits(words.view(np.uint8)).sum())
+
+def _resize(words, length):
+    if len(words) >= length:
+        return words[:length]
+    return np.concatenate([words, np.zeros(length - len(words), dtype=np.uint64)])
+
+def _set_bit(words, row):
+    """
+    Sets a row's bit, growing the word array geometrically if needed. Returns the array.
+    """
+    word = row >> 6
+    if word >= len(words):
+        words = _resize(words, max(word + 1, 2 * len(words)))
+    words[word] |= np.uint64(1) << np.uint64(row & 63)
+    return words
+
+def _clear_bit(words, row):
+    if words is not None and (row >> 6) < len(words):
+        words[row >> 6] &= ~(np.uint64(1) << np.uint64(row & 63))
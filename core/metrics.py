@@ -0,0 +1,215 @@
+import time
+import bisect
+import threading
+import contextvars
+from contextlib import contextmanager
+
+# Latency histogram bucket upper bounds, in seconds
+BUCKETS = (0.00001, 0.00005, 0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0)
+
+class MetricsRegistry:
+    """
+    In-process metrics sink holding counters and latency histograms.
+    Metrics are identified by a dotted name such as "query.files_scanned" plus optional
+    labels; read them with snapshot() or export them in the Prometheus text format.
+    Any object with the same increment/observe methods can be used as a sink instead.
+    """
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counters = {}  # (name, labels) -> value
+        self.histograms = {}  # (name, labels) -> [count per bucket..., overflow count, sum]
+        self._lock = threading.Lock()
+
+    def increment(self, name, value=1, labels=None):
+        key = (name, _label_items(labels))
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def observe(self, name, seconds, labels=None):
+        key = (name, _label_items(labels))
+        with self._lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = [0] * (len(self.buckets) + 1) + [0.0]
+            histogram[bisect.bisect_left(self.buckets, seconds)] += 1
+            histogram[-1] += seconds
+
+    def snapshot(self):
+        """
+        Returns {"counters": {metric: value}, "histograms": {metric: {"count", "sum", "buckets"}}},
+        where metrics are rendered as name{label=value,...} and buckets map upper bounds to
+        cumulative counts.
+        """
+        with self._lock:
+            counters = {_render(name, labels): value for (name, labels), value in self.counters.items()}
+            histograms = {}
+            for (name, labels), histogram in self.histograms.items():
+                cumulative, buckets = 0, {}
+                for bound, count in zip(self.buckets + (float("inf"),), histogram[:-1]):
+                    cumulative += count
+                    buckets[bound] = cumulative
+                histograms[_render(name, labels)] = {"count": cumulative, "sum": histogram[-1], "buckets": buckets}
+        return {"counters": counters, "histograms": histograms}
+
+    def prometheus(self, prefix="aidb_"):
+        """
+        Returns every metric in the Prometheus text exposition format. Counters are named
+        <prefix><name>_total and histograms <prefix><name>_seconds, with dots replaced by underscores.
+        """
+        lines = []
+        with self._lock:
+            for name in sorted({name for name, _ in self.counters}):
+                metric = f"{prefix}{name.replace('.', '_')}_total"
+                lines.append(f"# TYPE {metric} counter")
+                for (counter_name, labels), value in sorted(self.counters.items()):
+                    if counter_name == name:
+                        lines.append(f"{metric}{_prometheus_labels(labels)} {value}")
+            for name in sorted({name for name, _ in self.histograms}):
+                metric = f"{prefix}{name.replace('.', '_')}_seconds"
+                lines.append(f"# TYPE {metric} histogram")
+                for (histogram_name, labels), histogram in sorted(self.histograms.items()):
+                    if histogram_name != name:
+                        continue
+                    cumulative = 0
+                    for bound, count in zip(self.buckets + (float("inf"),), histogram[:-1]):
+                        cumulative += count
+                        le = "+Inf" if bound == float("inf") else repr(bound)
+                        lines.append(f"{metric}_bucket{_prometheus_labels(labels + (('le', le),))} {cumulative}")
+                    lines.append(f"{metric}_sum{_prometheus_labels(labels)} {histogram[-1]}")
+                    lines.append(f"{metric}_count{_prometheus_labels(labels)} {cumulative}")
+        return "\n".join(lines) + "\n"
+
+    def reset(self):
+        with self._lock:
+            self.counters.clear()
+            self.histograms.clear()
+
+class Trace:
+    """
+    Timings and counters of the operations run inside one metrics.trace() block, for
+    EXPLAIN ANALYZE-style reports of a single query.
+    """
+    def __init__(self):
+        self.timings = {}  # name -> [calls, seconds]
+        self.counters = {}
+        self.seconds = None
+        self._start = time.perf_counter()
+
+    def increment(self, name, value=1, labels=None):
+        self.counters[name] = self.counters.get(name, 0) + value
+
+    def observe(self, name, seconds, labels=None):
+        timing = self.timings.setdefault(name, [0, 0.0])
+        timing[0] += 1
+        timing[1] += seconds
+
+    def finish(self):
+        self.seconds = time.perf_counter() - self._start
+
+    def report(self):
+        """
+        Returns {"seconds", "timings": {name: {"calls", "seconds"}}, "counters"}.
+        """
+        return {"seconds": self.seconds,
+                "timings": {name: {"calls": calls, "seconds": seconds} for name, (calls, seconds) in self.timings.items()},
+                "counters": dict(self.counters)}
+
+    def format(self):
+        """
+        Returns the trace as readable lines: total time, then time per operation and counters.
+        """
+        lines = [f"Execution time: {(self.seconds or 0.0) * 1000:.3f} ms"]
+        for name, (calls, seconds) in sorted(self.timings.items(), key=lambda item: -item[1][1]):
+            lines.append(f"  {name}: {seconds * 1000:.3f} ms ({calls} call{'s' if calls != 1 else ''})")
+        for name, value in sorted(self.counters.items()):
+            lines.append(f"  {name} = {value}")
+        return "\n".join(lines)
+
+class Metrics:
+    """
+    Entry point used by instrumented code. Nothing is recorded until a sink is enabled
+    or a trace is active; until then start() returns None and every call returns at
+    once, so instrumentation costs a few attribute lookups on hot paths.
+    Timed code follows the pattern:
+        start = metrics.start()
+        ...
+        metrics.stop("storage.save_data", start, {"model": model_type})
+    """
+    def __init__(self):
+        self.sink = None
+
+    @property
+    def enabled(self):
+        return self.sink is not None
+
+    def enable(self, sink=None):
+        """
+        Starts recording into sink (a new MetricsRegistry by default) and returns it.
+        """
+        self.sink = sink or MetricsRegistry()
+        return self.sink
+
+    def disable(self):
+        self.sink = None
+
+    def start(self):
+        """
+        Returns a start time for stop(), or None when nothing is recording.
+        """
+        if self.sink is None and _current_trace.get() is None:
+            return None
+        return time.perf_counter()
+
+    def stop(self, name, start, labels=None):
+        """
+        Records the time elapsed since start() under name.
+        """
+        if start is not None:
+            self.observe(name, time.perf_counter() - start, labels)
+
+    def observe(self, name, seconds, labels=None):
+        if self.sink is not None:
+            self.sink.observe(name, seconds, labels)
+        trace = _current_trace.get()
+        if trace is not None:
+            trace.observe(name, seconds, labels)
+
+    def increment(self, name, value=1, labels=None):
+        if self.sink is not None:
+            self.sink.increment(name, value, labels)
+        trace = _current_trace.get()
+        if trace is not None:
+            trace.increment(name, value, labels)
+
+    @contextmanager
+    def trace(self):
+        """
+        Context manager yielding a Trace of the operations run inside the block in this
+        thread (or asyncio task), whether or not a sink is enabled.
+        """
+        trace = Trace()
+        token = _current_trace.set(trace)
+        try:
+            yield trace
+        finally:
+            trace.finish()
+            _current_trace.reset(token)
+
+def _label_items(labels):
+    return tuple(sorted(labels.items())) if labels else ()
+
+def _render(name, labels):
+    if not labels:
+        return name
+    return name + "{" + ",".join(f"{key}={value}" for key, value in labels) + "}"
+
+def _prometheus_labels(labels):
+    if not labels:
+        return ""
+    escaped = (str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, value in labels)
+    return "{" + ",".join(f'{key}="{value}"' for (key, _), value in zip(labels, escaped)) + "}"
+
+_current_trace = contextvars.ContextVar("aidb_trace", default=None)
+
+# Shared by every instrumented component in the process
+metrics = Metrics()
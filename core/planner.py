@@ -0,0 +1,344 @@
+import os
+import re
+import numbers
+from .columnar import ColumnarTable, PREDICATES
+from .index import InvertedIndex, read_record_file, tokenize
+from .metrics import metrics
+
+TOKEN_PATTERN = re.compile(r"""\s*(?:('(?:[^']|'')*')|("(?:[^"]|"")*")|(<=|>=|<>|!=|==|[=<>(),*])|([^\s=<>!(),]+))""")
+OPERATORS = {"=": "==", "==": "==", "!=": "!=", "<>": "!=", "<": "<", "<=": "<=", ">": ">", ">=": ">=",
+             "in": "in", "like": "like"}
+TABLES = {
+    "relational": "structured",
+    "document": "unstructured/document",
+    "graph": "unstructured/graph",
+    "keyvalue": "unstructured/keyvalue",
+    "multimedia": "multimedia_metadata",
+}
+
+class SelectStatement:
+    """
+    A parsed SELECT: table (a model type), columns (None for *), predicates as a list of
+    (column, operator, value) that must all hold, and an optional row limit.
+    """
+    def __init__(self, table, columns=None, predicates=None, limit=None):
+        self.table = table
+        self.columns = columns
+        self.predicates = predicates or []
+        self.limit = limit
+
+class QueryPlan:
+    """
+    How a SELECT will be executed: the records to read, in order, and whether they were
+    narrowed down by the inverted index ("index") or are every record of the table ("scan").
+    """
+    def __init__(self, statement, keys, access):
+        self.statement = statement
+        self.keys = keys
+        self.access = access
+
+    def describe(self):
+        statement = self.statement
+        lines = [f"Select from {statement.table} ({self.access}, {len(self.keys)} record(s))"]
+        if statement.predicates:
+            lines.append("  Filter: " + " AND ".join(f"{name} {operator} {value!r}"
+                                                    for name, operator, value in statement.predicates))
+        lines.append(f"  Project: {', '.join(statement.columns) if statement.columns else '*'}")
+        if statement.limit is not None:
+            lines.append(f"  Limit: {statement.limit}")
+        return "\n".join(lines)
+
+class QueryPlanner:
+    """
+    Plans and executes SQL-like queries of the form
+    SELECT col, ... | * FROM <model> [WHERE col op value [AND ...]] [LIMIT n]
+    against a Storage. op is one of =, !=, <>, <, <=, >, >=, IN (...) or LIKE ('%' and '_'
+    wildcards). Equality predicates on literals are answered from the inverted index so only
+    candidate records are read; columnar tables get the predicates, projection and the
+    remaining limit pushed into their scan. Rows are yielded as dicts as each record is read
+    (every record is parsed at most once), and reading stops as soon as the limit is met.
+    """
+    def __init__(self, storage):
+        self.storage = storage
+
+    def plan(self, statement):
+        """
+        Builds a QueryPlan for a SelectStatement or query string.
+        """
+        if isinstance(statement, str):
+            statement = parse_select(statement)
+        data_path = TABLES[statement.table]
+        prefix = f"{data_path}/"
+        if data_path not in InvertedIndex.INDEXED_PATHS:
+            return QueryPlan(statement, self._metadata_keys(data_path), "scan")
+
+        terms = [value for _, operator, value in statement.predicates
+                 if operator == "==" and isinstance(value, (str, int)) and not isinstance(value, bool)
+                 and tokenize(str(value))]
+        if terms:
+            index = self.storage.index
+            if not index.ready():
+                self.storage.rebuild_index(persist=False)
+            keys = None
+            for term in terms:
+                # A record can only match if it contains every equality literal
+                matches = set(index.candidates([term], prefix))
+                keys = matches if keys is None else keys & matches
+            return QueryPlan(statement, sorted(keys), "index")
+        return QueryPlan(statement, self.storage.record_keys(data_path), "scan")
+
+    def execute(self, statement):
+        """
+        Yields the result rows of a query as dicts mapping column names to values.
+        """
+        plan = statement if isinstance(statement, QueryPlan) else self.plan(statement)
+        statement = plan.statement
+        remaining = statement.limit
+        if remaining is not None and remaining <= 0:
+            return
+        for key in plan.keys:
+            metrics.increment("planner.records_scanned")
+            try:
+                for row in self._rows(key, statement, remaining):
+                    yield row
+                    if remaining is not None:
+                        remaining -= 1
+                        if remaining == 0:
+                            return
+            except FileNotFoundError:
+                continue  # Stale posting; the record was removed outside of Storage
+
+    def explain(self, statement):
+        """
+        Returns a readable description of the plan for a query.
+        """
+        return self.plan(statement).describe()
+
+    def explain_analyze(self, statement):
+        """
+        Runs a query and returns its plan followed by the rows produced and a trace of
+        where the time went (planning, listing, reading, parsing) with counters.
+        """
+        with metrics.trace() as trace:
+            start = metrics.start()
+            plan = self.plan(statement)
+            metrics.stop("planner.plan", start)
+            rows = sum(1 for _ in self.execute(plan))
+        return f"{plan.describe()}\nRows: {rows}\n{trace.format()}"
+
+    def _rows(self, key, statement, limit):
+        """
+        Yields the matching, projected rows of one record.
+        """
+        if key.endswith('.col') and self.storage.segments is None:
+            yield from self._columnar_rows(os.path.join(self.storage.base_path, key), statement, limit)
+            return
+        if key.startswith(TABLES["multimedia"] + "/"):
+            data = read_record_file(os.path.join(self.storage.base_path, key))
+        else:
+            data = self.storage.read_record(key)
+        for row in record_rows(data):
+            if all(compare(row.get(name), operator, value) for name, operator, value in statement.predicates):
+                yield project(row, statement.columns)
+
+    def _columnar_rows(self, path, statement, limit):
+        table = ColumnarTable(path)
+        names = {name for name, _, _ in statement.predicates}
+        if names <= set(table.columns) and all(operator in PREDICATES for _, operator, _ in statement.predicates):
+            # Whole WHERE clause runs inside the scan, with zone-map chunk skipping
+            columns = [name for name in statement.columns or table.columns if name in table.columns]
+            result = table.scan(columns or table.columns[:1], statement.predicates, limit)
+            for position in range(len(next(iter(result.values())))):
+                row = {name: result[name][position].item() for name in columns}
+                yield project(row, statement.columns)
+            return
+        rows = table.to_rows()
+        for row in record_rows(rows):
+            if all(compare(row.get(name), operator, value) for name, operator, value in statement.predicates):
+                yield project(row, statement.columns)
+
+    def _metadata_keys(self, data_path):
+        try:
+            filenames = sorted(os.listdir(os.path.join(self.storage.base_path, data_path)))
+        except FileNotFoundError:
+            return []
+        return [f"{data_path}/{filename}" for filename in filenames if filename.endswith('.json')]
+
+def parse_select(query):
+    """
+    Parses a SELECT query into a SelectStatement. Raises ValueError on syntax errors.
+    """
+    tokens = _tokenize(query)
+    position = 0
+
+    def peek():
+        return tokens[position] if position < len(tokens) else (None, None)
+
+    def take(expected=None):
+        nonlocal position
+        kind, text = peek()
+        if kind is None or (expected is not None and (kind != "word" or text.lower() != expected)):
+            raise ValueError(f"Expected {expected or 'more input'} in query: {query}")
+        position += 1
+        return kind, text
+
+    take("select")
+    columns = []
+    while True:
+        kind, text = take()
+        if text == "*" and kind == "symbol":
+            columns = None
+        elif kind == "word":
+            columns.append(text)
+        else:
+            raise ValueError(f"Invalid column list in query: {query}")
+        if peek() != ("symbol", ","):
+            break
+        take()
+    if columns == []:
+        raise ValueError(f"No columns selected in query: {query}")
+
+    take("from")
+    _, table = take()
+    table = table.lower()
+    if table not in TABLES:
+        raise ValueError(f"Unknown table: {table}")
+
+    predicates = []
+    if peek()[0] == "word" and peek()[1].lower() == "where":
+        take()
+        while True:
+            kind, name = take()
+            if kind != "word":
+                raise ValueError(f"Expected a column name in query: {query}")
+            kind, operator = take()
+            operator = OPERATORS.get(operator.lower())
+            if operator is None:
+                raise ValueError(f"Unsupported operator in query: {query}")
+            if operator == "in":
+                if take() != ("symbol", "("):
+                    raise ValueError(f"Expected ( after IN in query: {query}")
+                values = []
+                while True:
+                    values.append(_literal(*take()))
+                    kind, text = take()
+                    if text == ")":
+                        break
+                    if text != ",":
+                        raise ValueError(f"Expected , or ) in IN list of query: {query}")
+                value = values
+            else:
+                value = _literal(*take())
+            predicates.append((name, operator, value))
+            if not (peek()[0] == "word" and peek()[1].lower() == "and"):
+                break
+            take()
+
+    limit = None
+    if peek()[0] == "word" and peek()[1].lower() == "limit":
+        take()
+        _, text = take()
+        if not text.isdigit():
+            raise ValueError(f"LIMIT must be a non-negative integer in query: {query}")
+        limit = int(text)
+
+    if peek()[0] == "symbol" and peek()[1] == ";":
+        take()
+    if position != len(tokens):
+        raise ValueError(f"Unexpected input after position {position} in query: {query}")
+    return SelectStatement(table, columns, predicates, limit)
+
+def record_rows(data):
+    """
+    Yields the rows of a record as dicts: one per data row of a relational table (header
+    first), one per object of a JSON list, or the record itself for a JSON object.
+    """
+    if isinstance(data, dict):
+        yield data
+    elif isinstance(data, list) and data and all(isinstance(item, list) for item in data):
+        header = data[0]
+        for row in data[1:]:
+            yield dict(zip(header, row))
+    elif isinstance(data, list):
+        for item in data:
+            if isinstance(item, dict):
+                yield item
+
+def project(row, columns):
+    """
+    Restricts a row to the selected columns (None selects all); missing columns are None.
+    Always returns a new dict, as rows may be shared with the record cache.
+    """
+    if columns is None:
+        return dict(row)
+    return {name: row.get(name) for name in columns}
+
+def compare(value, operator, literal):
+    """
+    Evaluates value <operator> literal. Strings holding numbers (e.g. CSV cells) are
+    compared numerically with numeric literals; missing values and incomparable types never match.
+    """
+    if value is None:
+        return False
+    if operator == "in":
+        return any(compare(value, "==", item) for item in literal)
+    if operator == "like":
+        pattern = "".join(".*" if char == "%" else "." if char == "_" else re.escape(char) for char in str(literal))
+        return re.fullmatch(pattern, str(value), re.IGNORECASE | re.DOTALL) is not None
+    value, literal = _comparable(value, literal)
+    try:
+        return bool(PREDICATES[operator](value, literal))
+    except TypeError:
+        return False
+
+def _comparable(value, literal):
+    is_number = lambda item: isinstance(item, numbers.Number) and not isinstance(item, bool)
+    try:
+        if is_number(literal) and isinstance(value, str):
+            return float(value), literal
+        if is_number(value) and isinstance(literal, str):
+            return value, float(literal)
+    except ValueError:
+        pass
+    return value, literal
+
+def _tokenize(query):
+    tokens, position = [], 0
+    query = query.strip()
+    while position < len(query):
+        match = TOKEN_PATTERN.match(query, position)
+        if match is None or match.end() == position:
+            raise ValueError(f"Cannot parse query near: {query[position:]}")
+        single, double, symbol, word = match.groups()
+        if single is not None:
+            tokens.append(("string", single[1:-1].replace("''", "'")))
+        elif double is not None:
+            tokens.append(("word", double[1:-1].replace('""', '"')))  # Quoted identifier
+        elif symbol is not None:
+            tokens.append(("symbol", symbol))
+        elif word.endswith(";") and len(word) > 1:
+            tokens.append(("word", word[:-1]))
+            tokens.append(("symbol", ";"))
+        elif word == ";":
+            tokens.append(("symbol", word))
+        else:
+            tokens.append(("word", word))
+        position = match.end()
+    return tokens
+
+def _literal(kind, text):
+    if kind == "string":
+        return text
+    if kind != "word":
+        raise ValueError(f"Expected a value, found {text!r}")
+    lowered = text.lower()
+    if lowered in ("true", "false"):
+        return lowered == "true"
+    if lowered == "null":
+        return None
+    for convert in (int, float):
+        try:
+            return convert(text)
+        except ValueError:
+            continue
+    return text
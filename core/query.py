@@ -1,67 +1,209 @@
 import os
-import json
-import csv
+import copy
+from .executor import default_executor, matches_query
+from .index import InvertedIndex, RECORD_EXTENSIONS, read_record_file
+from .metadata_index import MetadataIndex
+from .metrics import metrics
 
 class Query:
     """
     Handles querying across different data models.
+    Pass the Storage instance to search records held by a segment-backed Storage.
+    Record files are matched through a ScanExecutor, which spreads large scans over
+    worker processes (the shared default_executor unless one is given).
     """
-    def __init__(self, base_path="data"):
-        self.base_path = base_path
+    MODELS = ['document', 'graph', 'keyvalue', 'relational']
+
+    def __init__(self, base_path="data", use_index=True, storage=None, executor=None):
+        self.base_path = storage.base_path if storage is not None else base_path
+        self.storage = storage
+        self.executor = executor or default_executor
+        if not use_index:
+            self.index = None
+        else:
+            self.index = storage.index if storage is not None else InvertedIndex(self.base_path)
+        self._metadata_index = None
 
     def search(self, query_terms, model_type=None):
         """
         Searches for data based on query terms.
         """
-        results = []  # Initialize results as an empty list
-        if model_type:
-            results.extend(self._search_in_model(model_type, query_terms))
-        else:
-            for model in ['document', 'graph', 'keyvalue', 'relational']:
-                results.extend(self._search_in_model(model, query_terms))
+        start = metrics.start()
+        results = [{"model": match["model"], "filename": match["filename"]}
+                   for match in self.iter_search(query_terms, model_type, batch_size=None)]
+        metrics.stop("query.search", start, {"model": model_type or "all"})
         return results
 
+    def iter_search(self, query_terms, model_type=None, load=False, cursor=None, limit=None, batch_size=256):
+        """
+        Yields matches lazily as records are verified, in model order and then filename
+        order. Each match is {"model", "filename", "cursor"}; with load=True a (match,
+        record) pair is yielded instead. Stop iterating at any time to end the scan.
+        Pass a match's cursor to resume right after it. batch_size records are verified
+        at a time (None verifies a whole model at once, which parallelises best).
+        """
+        models = [model_type] if model_type else self.MODELS
+        after_model, after_filename = self._parse_cursor(cursor)
+        if after_model is not None and after_model not in models:
+            raise ValueError(f"Cursor does not belong to this search: {cursor}")
+        remaining = limit
+        if remaining is not None and remaining <= 0:
+            return
+        for model in models[models.index(after_model) if after_model is not None else 0:]:
+            after = after_filename if model == after_model else None
+            for filename, record in self._iter_model(model, query_terms, after, load, batch_size):
+                match = {"model": model, "filename": filename, "cursor": f"{model}:{filename}"}
+                yield (match, record) if load else match
+                if remaining is not None:
+                    remaining -= 1
+                    if remaining == 0:
+                        return
+
+    def search_page(self, query_terms, model_type=None, cursor=None, page_size=100, load=False):
+        """
+        Returns one page of matches: {"results": [...], "next_cursor": str or None}.
+        Pass next_cursor back to fetch the following page; it is None on the last page.
+        """
+        results = list(self.iter_search(query_terms, model_type, load, cursor, page_size + 1,
+                                        batch_size=page_size + 1))
+        has_more = len(results) > page_size
+        results = results[:page_size]
+        last = (results[-1][0] if load else results[-1]) if results else None
+        return {"results": results, "next_cursor": last["cursor"] if has_more else None}
+
     def _search_in_model(self, model_type, query_terms):
         """
         Searches for data within a specific data model.
         """
-        results = []  # Initialize results as an empty list
-        data_path = os.path.join(self.base_path, self._get_data_path(model_type))
+        return self.search(query_terms, model_type)
+
+    def _iter_model(self, model_type, query_terms, after, load, batch_size):
+        """
+        Yields (filename, record or None) for the matching records of one model whose
+        filename sorts after the given one.
+        """
+        data_path = self._get_data_path(model_type)
+        labels = {"model": model_type}
+        start = metrics.start()
+        keys, verify = self._model_keys(model_type, data_path, query_terms)
+        metrics.stop("query.list", start, labels)
+        prefix = f"{data_path}/"
+        if after is not None:
+            keys = [key for key in keys if key[len(prefix):] > after]
+        step = batch_size or max(len(keys), 1)
+        for start in range(0, len(keys), step):
+            batch = keys[start:start + step]
+            if verify:
+                match_start = metrics.start()
+                matched = self._match_keys(batch, query_terms)
+                metrics.stop("query.match", match_start, labels)
+                metrics.increment("query.files_scanned", len(batch), labels)
+            else:
+                matched = [True] * len(batch)
+            metrics.increment("query.records_matched", sum(matched), labels)
+            for key, hit in zip(batch, matched):
+                if not hit:
+                    continue
+                if not load:
+                    yield key[len(prefix):], None
+                    continue
+                try:
+                    record = copy.deepcopy(self._read_record(key))
+                except FileNotFoundError:
+                    continue  # Removed since it was matched
+                yield key[len(prefix):], record
+
+    def _model_keys(self, model_type, data_path, query_terms):
+        """
+        Returns the sorted keys of the records that may match, and whether they still need
+        to be checked against the query terms. Answers from the inverted index when possible,
+        so only candidate files are opened.
+        """
+        if self.index is not None and data_path == "multimedia_metadata":
+            keys = self._metadata_keys(query_terms)
+            if keys is not None:
+                return keys, bool(query_terms)
+        if self.index is not None and data_path in InvertedIndex.INDEXED_PATHS:
+            if not self.index.ready():
+                # Built in memory: a search never writes, the first write persists the index
+                if self.storage is not None:
+                    self.storage.rebuild_index(persist=False)
+                else:
+                    self.index.rebuild(persist=False)
+            prefix = f"{data_path}/"
+            if not query_terms:
+                return self.index.keys(prefix), False
+            keys = self.index.candidates(query_terms, prefix)
+            if keys is not None:
+                return keys, True
+
+        if not self._is_file_key(data_path + "/"):
+            return self.storage.record_keys(data_path), True
         try:
-            for filename in os.listdir(data_path):
-                filepath = os.path.join(data_path, filename)
-                if not filepath.endswith(('.json', '.csv')):
-                    continue  # Skip non-data files
-
-                with open(filepath, 'r') as f:
-                    if filename.endswith('.json'):
-                        data = json.load(f)
-                    elif filename.endswith('.csv'):
-                        data = list(csv.reader(f))
-                    else:
-                        continue
-
-                if self._matches_query(data, query_terms):
-                    results.append({"model": model_type, "filename": filename})
+            filenames = sorted(filename for filename in os.listdir(os.path.join(self.base_path, data_path))
+                               if filename.endswith(RECORD_EXTENSIONS))  # Skip non-data files
         except FileNotFoundError:
-            pass  # Handle cases where directories might be missing
-        return results
+            return [], False  # Handle cases where directories might be missing
+        return [f"{data_path}/{filename}" for filename in filenames], True
+
+    def _match_keys(self, keys, query_terms):
+        """
+        Returns which of the records match the query terms. Records that no longer exist do not match.
+        """
+        if all(self._is_file_key(key) for key in keys):
+            return self.executor.match([os.path.join(self.base_path, key) for key in keys], query_terms)
+        matched = []
+        for key in keys:
+            try:
+                matched.append(self._matches_query(self._read_record(key), query_terms))
+            except FileNotFoundError:
+                matched.append(False)  # Stale posting
+        return matched
+
+    def _read_record(self, key):
+        """
+        Loads a record by its key relative to the data directory.
+        """
+        if not self._is_file_key(key):
+            return self.storage.read_record(key)
+        return read_record_file(os.path.join(self.base_path, key))
+
+    def _is_file_key(self, key):
+        """
+        Returns True for records read straight from files: everything unless a segment-backed
+        Storage was given, and multimedia metadata, which is always stored as files.
+        """
+        return self.storage is None or self.storage.segments is None or key.startswith("multimedia_metadata/")
+
+    def _metadata_keys(self, query_terms):
+        """
+        Returns the keys of the metadata files that may match, from the metadata index.
+        Returns None if the query cannot be answered from the index.
+        """
+        if self._metadata_index is None:
+            self._metadata_index = MetadataIndex(os.path.join(self.base_path, "multimedia_metadata"))
+        index = self._metadata_index
+        if not index.ready():
+            index.rebuild(persist=False)
+        assets = index.keys() if not query_terms else index.candidates(query_terms)
+        if assets is None:
+            return None
+        return [f"multimedia_metadata/{asset}.json" for asset in assets]
+
+    def _parse_cursor(self, cursor):
+        if cursor is None:
+            return None, None
+        model, separator, filename = cursor.partition(":")
+        if not separator:
+            raise ValueError(f"Invalid cursor: {cursor}")
+        return model, filename
 
     def _matches_query(self, data, query_terms):
         """
         Checks if the data matches the query terms.
         Returns True if query_terms is empty (equivalent to SELECT *).
         """
-        # Return True for empty query_terms (SELECT * case)
-        if not query_terms:
-            return True
-            
-        if isinstance(data, dict):
-            return any(term.lower() in str(value).lower() for term in query_terms for value in data.values())
-        elif isinstance(data, list):
-            return any(term.lower() in str(item).lower() for term in query_terms for item in data)
-        else:
-            return False
+        return matches_query(data, query_terms)
 
     def _get_data_path(self, model_type):
         """
@@ -70,6 +212,6 @@ class Query:
         if model_type == 'relational':
             return "structured"
         elif model_type in ['document', 'keyvalue', 'graph']:
-            return "unstructured"
+            return f"unstructured/{model_type}"  # Each JSON model has its own namespace
         else:
-            return "multimedia"
\ No newline at end of file
+            return "multimedia_metadata"  # Multimedia is searched through its metadata
\ No newline at end of file
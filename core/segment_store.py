@@ -0,0 +1,301 @@
+import os
+import zlib
+import struct
+import threading
+from .file_lock import FileLock
+
+HEADER = struct.Struct("<IBHI")  # crc32, op, key length, value length
+OP_PUT = 1
+OP_DELETE = 2
+
+class SegmentStore:
+    """
+    Log-structured record storage.
+    Records are appended to segment files ("segment-000001.log", ...) as checksummed
+    frames, and an in-memory index maps each key to the segment and offset of its latest
+    value, so a read is a single positioned read. Overwrites and deletes only append;
+    compaction copies the live records out of mostly-dead segments and removes them.
+    A store has one writer: it holds an exclusive lock on the store's lock file while
+    open, and a store opened while another process holds it is read-only, sees the
+    records written before it was opened and leaves torn tails for the writer to cut.
+    """
+    def __init__(self, path, segment_size=64 * 1024 * 1024, compaction_threshold=0.5,
+                 background_compaction=True, sync=False, compaction_batch=1024):
+        self.path = path
+        self.segment_size = segment_size  # Active segment is sealed once it grows past this
+        self.compaction_threshold = compaction_threshold  # Dead-byte ratio that makes a segment compactable
+        self.background_compaction = background_compaction
+        self.sync = sync  # fsync after every write
+        self.compaction_batch = compaction_batch  # Records copied per lock hold during compaction
+        self.index = {}  # key -> (segment id, value offset, value length)
+        self._tombstones = {}  # deleted key -> segment id holding its latest tombstone
+        self._segment_bytes = {}  # segment id -> total bytes
+        self._dead_bytes = {}  # segment id -> bytes of overwritten or deleted frames
+        self._readers = {}  # segment id -> read file descriptor
+        self._lock = threading.RLock()
+        self._compaction_thread = None
+        self._compaction_lock = threading.Lock()  # One compaction at a time; it copies without self._lock
+        self._writer = None
+        os.makedirs(self.path, exist_ok=True)
+        self._file_lock = FileLock(os.path.join(self.path, "lock"))
+        self.read_only = not self._file_lock.acquire(blocking=False)
+        self._load()
+
+    def __contains__(self, key):
+        return key in self.index
+
+    def __len__(self):
+        return len(self.index)
+
+    def keys(self, prefix=""):
+        """
+        Returns the live keys under the given prefix, sorted.
+        """
+        with self._lock:
+            return sorted(key for key in self.index if key.startswith(prefix))
+
+    def get(self, key):
+        """
+        Returns the value bytes stored under key. Raises KeyError if it does not exist.
+        """
+        with self._lock:
+            segment_id, offset, length = self.index[key]
+            return os.pread(self._reader(segment_id), length, offset)
+
+    def put(self, key, value):
+        """
+        Appends a new value for key.
+        """
+        self._append(OP_PUT, key, value)
+
+    def put_many(self, items):
+        """
+        Appends values for many (key, value) pairs with a single write and flush
+        (and a single fsync when sync is enabled).
+        """
+        self._write_frames(OP_PUT, items)
+
+    def flush(self, sync=True):
+        """
+        Flushes buffered writes of the active segment, fsyncing them if sync is True.
+        """
+        with self._lock:
+            if self.read_only:
+                return
+            self._writer.flush()
+            if sync:
+                os.fsync(self._writer.fileno())
+
+    def delete(self, key):
+        """
+        Appends a tombstone for key. Returns False if the key does not exist.
+        """
+        with self._lock:
+            if key not in self.index:
+                return False
+            self._append(OP_DELETE, key, b"")
+            return True
+
+    def compact(self, force=False):
+        """
+        Rewrites the live records of sealed segments whose dead-byte ratio exceeds the
+        threshold (every sealed segment if force is True) and deletes those segments.
+        Returns the number of segments removed.
+        Records are read without holding the store lock and appended in batches of
+        compaction_batch, each under the lock and only if the key still points at the
+        copied value, so reads and writes proceed while a segment is being copied. A
+        segment is removed once everything copied so far has been fsynced.
+        """
+        with self._compaction_lock:
+            return self._compact(force)
+
+    def _compact(self, force):
+        with self._lock:
+            self._check_writable()
+            candidates = [segment_id for segment_id in sorted(self._segment_bytes)
+                          if segment_id != self._active_id and (force or self._dead_ratio(segment_id) >= self.compaction_threshold)]
+            first_target = self._active_id  # Copies land in this segment or later ones
+        for segment_id in candidates:
+            with self._lock:
+                live = [(key, location) for key, location in self.index.items() if location[0] == segment_id]
+            fd = os.open(self._segment_path(segment_id), os.O_RDONLY)  # Sealed, so never written again
+            try:
+                for start in range(0, len(live), self.compaction_batch):
+                    batch = [(key, location, os.pread(fd, location[2], location[1]))
+                             for key, location in live[start:start + self.compaction_batch]]
+                    with self._lock:
+                        # Keys overwritten or deleted meanwhile must not get their old value back
+                        self._write_frames(OP_PUT, [(key, value) for key, location, value in batch
+                                                    if self.index.get(key) == location], compact=False)
+            finally:
+                os.close(fd)
+            with self._lock:
+                # Tombstones must outlive every older segment that may still hold the deleted value
+                older_exists = any(other < segment_id for other in self._segment_bytes)
+                for key in [key for key, location in self._tombstones.items() if location == segment_id]:
+                    if older_exists:
+                        self._append(OP_DELETE, key, b"", compact=False)
+                    else:
+                        del self._tombstones[key]
+                self._sync_segments(first_target)
+                self._remove_segment(segment_id)
+        return len(candidates)
+
+    def close(self):
+        """
+        Waits for background compaction and closes all file handles.
+        """
+        thread = self._compaction_thread
+        if thread is not None:
+            thread.join()
+        with self._lock:
+            if self._writer is not None:
+                self._writer.close()
+            for fd in self._readers.values():
+                os.close(fd)
+            self._readers.clear()
+            if not self.read_only:
+                self._file_lock.release()
+                self.read_only = True
+
+    def _load(self):
+        """
+        Rebuilds the in-memory index by scanning frame headers of every segment in order.
+        The writer truncates a torn frame at the end of a segment (from a crash mid-append);
+        a read-only store ignores it.
+        """
+        segment_ids = sorted(int(name[8:-4]) for name in os.listdir(self.path)
+                             if name.startswith("segment-") and name.endswith(".log"))
+        for segment_id in segment_ids:
+            self._segment_bytes[segment_id] = 0
+            self._dead_bytes[segment_id] = 0
+            with open(self._segment_path(segment_id), 'rb') as f:
+                offset = 0
+                while True:
+                    header = f.read(HEADER.size)
+                    if len(header) < HEADER.size:
+                        break
+                    crc, op, key_length, value_length = HEADER.unpack(header)
+                    body = f.read(key_length + value_length)
+                    if len(body) < key_length + value_length or zlib.crc32(bytes([op]) + body) != crc:
+                        break
+                    key = body[:key_length].decode("utf-8")
+                    self._apply(op, key, segment_id, offset, key_length, value_length)
+                    offset += HEADER.size + key_length + value_length
+            if self.read_only:
+                self._reader(segment_id)  # Keeps the segment readable if the writer compacts it away
+            elif os.path.getsize(self._segment_path(segment_id)) > offset:
+                os.truncate(self._segment_path(segment_id), offset)
+            self._segment_bytes[segment_id] = offset
+
+        self._active_id = segment_ids[-1] if segment_ids else 1
+        if not self.read_only:
+            self._open_writer()
+
+    def _apply(self, op, key, segment_id, offset, key_length, value_length):
+        """
+        Updates the index and dead-byte accounting for a frame at the given offset.
+        """
+        frame_length = HEADER.size + key_length + value_length
+        previous = self.index.pop(key, None)
+        if previous is not None:
+            self._dead_bytes[previous[0]] += HEADER.size + len(key.encode("utf-8")) + previous[2]
+        if op == OP_PUT:
+            self.index[key] = (segment_id, offset + HEADER.size + key_length, value_length)
+            self._tombstones.pop(key, None)
+        else:
+            self._tombstones[key] = segment_id
+            self._dead_bytes[segment_id] += frame_length  # Tombstones are garbage once written
+
+    def _append(self, op, key, value, compact=True):
+        self._write_frames(op, [(key, value)], compact)
+
+    def _write_frames(self, op, items, compact=True):
+        """
+        Appends frames for (key, value) pairs with a single write and flush.
+        """
+        frames, entries = [], []
+        for key, value in items:
+            key_bytes = key.encode("utf-8")
+            body = key_bytes + value
+            frames.append(HEADER.pack(zlib.crc32(bytes([op]) + body), op, len(key_bytes), len(value)) + body)
+            entries.append((key, len(key_bytes), len(value)))
+        if not frames:
+            return
+        with self._lock:
+            self._check_writable()
+            offset = self._segment_bytes[self._active_id]
+            self._writer.write(b"".join(frames))
+            self._writer.flush()
+            if self.sync:
+                os.fsync(self._writer.fileno())
+            for frame, (key, key_length, value_length) in zip(frames, entries):
+                self._apply(op, key, self._active_id, offset, key_length, value_length)
+                offset += len(frame)
+            self._segment_bytes[self._active_id] = offset
+            if offset >= self.segment_size:
+                self._roll(compact)
+
+    def _check_writable(self):
+        if self.read_only:
+            raise OSError(f"Segment store {self.path} is open for writing in another process")
+
+    def _sync_segments(self, first_id):
+        """
+        Fsyncs the segments from first_id to the active one and the directory listing them.
+        """
+        self._writer.flush()
+        for segment_id in range(first_id, self._active_id + 1):
+            if segment_id in self._segment_bytes:
+                fd = os.open(self._segment_path(segment_id), os.O_RDONLY)
+                try:
+                    os.fsync(fd)
+                finally:
+                    os.close(fd)
+        fd = os.open(self.path, os.O_RDONLY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+    def _roll(self, compact):
+        """
+        Seals the active segment and starts a new one, kicking off compaction if any
+        sealed segment has become mostly garbage.
+        """
+        self._writer.close()
+        self._active_id += 1
+        self._open_writer()
+        if compact and self.background_compaction and any(
+                self._dead_ratio(segment_id) >= self.compaction_threshold
+                for segment_id in self._segment_bytes if segment_id != self._active_id):
+            if self._compaction_thread is None or not self._compaction_thread.is_alive():
+                self._compaction_thread = threading.Thread(target=self.compact, daemon=True)
+                self._compaction_thread.start()
+
+    def _open_writer(self):
+        self._writer = open(self._segment_path(self._active_id), 'ab')
+        self._segment_bytes.setdefault(self._active_id, 0)
+        self._dead_bytes.setdefault(self._active_id, 0)
+
+    def _reader(self, segment_id):
+        fd = self._readers.get(segment_id)
+        if fd is None:
+            fd = os.open(self._segment_path(segment_id), os.O_RDONLY)
+            self._readers[segment_id] = fd
+        return fd
+
+    def _remove_segment(self, segment_id):
+        fd = self._readers.pop(segment_id, None)
+        if fd is not None:
+            os.close(fd)
+        os.remove(self._segment_path(segment_id))
+        del self._segment_bytes[segment_id]
+        del self._dead_bytes[segment_id]
+
+    def _dead_ratio(self, segment_id):
+        total = self._segment_bytes.get(segment_id, 0)
+        return self._dead_bytes.get(segment_id, 0) / total if total else 0.0
+
+    def _segment_path(self, segment_id):
+        return os.path.join(self.path, f"segment-{segment_id:06d}.log")
@@ -1,79 +1,648 @@
 import os
+import copy
 import json
-import csv
-from .data_model import DocumentModel, GraphModel, KeyValueModel, RelationalModel
-from utils.file_utils import save_file, load_file, delete_file  # Import file utils
-from vector_integration.vector_db_interface import VectorDBInterface  # Import VectorDBInterface
+import time
+import atexit
+import logging
+import weakref
+import functools
+import threading
+from .data_model import DocumentModel, GraphModel, KeyValueModel, RelationalModel, write_atomic
+from .blob_store import BlobStore
+from .cache import record_cache
+from .codecs import decode_record, get_codec
+from .graph import GraphIndex, is_graph_record
+from .index import InvertedIndex, RECORD_EXTENSIONS, read_record_file
+from .kv_store import KeyValueStore
+from .lazy import lazy_import
+from .metrics import metrics
+from .segment_store import SegmentStore
+from .wal import RecordVersions, WriteAheadLog, new_log_path, orphaned_logs
+from utils.file_utils import load_file, delete_file  # Legacy multimedia files
+np = lazy_import("numpy")  # Loaded on first use
+
+logger = logging.getLogger(__name__)
 
 class Storage:
     """
     Handles storage and retrieval of data.
+    With backend="files" (the default) every record is its own file under structured/ or
+    unstructured/<model>/. With backend="segments" records are appended to a log-structured
+    SegmentStore under segments/ instead; pass the Storage to Query to search them.
+
+    With wal=True (the default) every write is first committed to a write-ahead log in
+    wal/ and only then applied to the record, search index, graph index and vector store,
+    in log order. Each Storage logs to its own file there, and concurrent writers share
+    fsyncs through group commit. Logs left behind by a crash (or by a Storage that was
+    never checkpointed) are replayed when a Storage is opened, so the record and its
+    index and vector entries end up consistent. Logged writes carry sequence numbers
+    shared by all processes, so a log replayed late never overwrites a newer write to the
+    same record (see RecordVersions); writes made with wal=False are not versioned. The
+    log is emptied at checkpoints, once checkpoint_bytes have been logged, and removed by
+    close().
+
+    JSON-model records are written with codec: "json" (compact, via orjson when installed),
+    "json-pretty", "binary" or "msgpack" (see core.codecs). Records in any of these
+    formats can be read, so the codec can be changed at any time; migrate_codec rewrites
+    existing records in the current one.
+
+    Embeddings saved with a record carry its model and the record fields listed for its
+    model in filterable_fields (e.g. {"document": ["price", "tags"]}) as vector attributes
+    that searches can filter on; other fields are not copied into the vector store.
+
+    Opening a Storage reads nothing but orphaned write-ahead logs and writes nothing
+    unless one needs replaying: directories are created by the first write, and the
+    graph index, blob store and vector database are opened when first used.
     """
-    def __init__(self, base_path="data", vector_db_enabled=False):
+    def __init__(self, base_path="data", vector_db_enabled=False, backend="files", wal=True,
+                 checkpoint_bytes=64 * 1024 * 1024, codec="json", filterable_fields=None):
+        if backend not in ("files", "segments"):
+            raise ValueError(f"Invalid storage backend: {backend}")
         self.base_path = base_path
+        self.backend = backend
+        self.codec = get_codec(codec)
         self.models = {
-            'document': DocumentModel("document"),
-            'graph': GraphModel("graph"),
-            'keyvalue': KeyValueModel("keyvalue"),
+            'document': DocumentModel("document", self.codec),
+            'graph': GraphModel("graph", self.codec),
+            'keyvalue': KeyValueModel("keyvalue", self.codec),
             'relational': RelationalModel("relational")
         }
-        self._create_directories()
-
+        self._directories_created = False
+        self.segments = SegmentStore(os.path.join(base_path, "segments")) if backend == "segments" else None
+        self.index = InvertedIndex(base_path)
+        self.kv_stores = {}  # name -> KeyValueStore opened by open_kv
         self.vector_db_enabled = vector_db_enabled
-        if self.vector_db_enabled:
-            self.vector_db = VectorDBInterface()
+        self.filterable_fields = filterable_fields or {}  # model type -> record fields stored as vector attributes
+
+        self.checkpoint_bytes = checkpoint_bytes
+        self.wal = WriteAheadLog(new_log_path(os.path.join(base_path, "wal")), codec=self.codec) if wal else None
+        self.versions = RecordVersions(os.path.join(base_path, "wal")) if wal else None
+        self._unsynced = set()  # Record files (and their directories) written since the last checkpoint
+        self._apply_cond = threading.Condition()  # Applies logged writes in LSN order
+        self._applied_lsn = 0
+        if self.wal is not None:
+            self.recover()
+            # A clean exit checkpoints, so later Storages have nothing stale to replay
+            atexit.register(_close_at_exit, weakref.ref(self))
+
+    @functools.cached_property
+    def graph(self):
+        """
+        The GraphIndex over graph records, loaded on first use.
+        """
+        return GraphIndex(self.base_path)
+
+    @functools.cached_property
+    def blobs(self):
+        """
+        The BlobStore holding multimedia file contents.
+        """
+        return BlobStore(os.path.join(self.base_path, "blobs"))
+
+    @functools.cached_property
+    def vector_db(self):
+        """
+        The VectorDBInterface holding embeddings, opened on first use. Only available with vector_db_enabled.
+        """
+        if not self.vector_db_enabled:
+            raise AttributeError("vector_db requires a Storage with vector_db_enabled=True")
+        # Imported here so that Storage users without vectors never load the vector engine
+        from vector_integration.vector_db_interface import VectorDBInterface
+        # Embeddings are persisted under the data directory so every process shares them
+        return VectorDBInterface(path=os.path.join(self.base_path, "vectors"))
 
     def _create_directories(self):
         """
-        Creates necessary directories for storage.
+        Creates necessary directories for storage. Called before the first write.
         """
+        if self._directories_created:
+            return
         os.makedirs(os.path.join(self.base_path, "structured"), exist_ok=True)
-        os.makedirs(os.path.join(self.base_path, "unstructured"), exist_ok=True)
+        for model_type in ['document', 'graph', 'keyvalue']:
+            os.makedirs(os.path.join(self.base_path, self._get_data_path(model_type)), exist_ok=True)
         os.makedirs(os.path.join(self.base_path, "multimedia"), exist_ok=True)
+        self._directories_created = True
 
     def save_data(self, model_type, data, filename, embed_data=None):
         """
         Saves data using the specified data model.
         If embed_data is provided and vector_db_enabled, it also saves vector embeddings.
+        With the write-ahead log enabled, calls from several threads are committed together.
+        """
+        self._check_write(model_type, filename)
+        start = metrics.start()
+        if self.wal is None:
+            self._apply(model_type, data, filename, embed_data)
+        else:
+            sequence = self.versions.next_sequence()
+            lsn = self.wal.append(_wal_entry(model_type, filename, data, embed_data, sequence))
+            self._commit(lsn, lsn, lambda: self._apply(model_type, data, filename, embed_data, sequence))
+        metrics.stop("storage.save_data", start, {"model": model_type})
+
+    def _check_write(self, model_type, filename):
+        """
+        Rejects writes that could not be applied, before they reach the write-ahead log:
+        a logged write that fails would fail again every time the log is replayed.
         """
         if model_type not in self.models:
             raise ValueError(f"Invalid model type: {model_type}")
+        if not isinstance(filename, str) or filename in ("", ".", "..") or "/" in filename or \
+                os.sep in filename or (os.altsep and os.altsep in filename):
+            raise ValueError(f"Invalid record filename: {filename!r}")
 
-        filepath = os.path.join(self.base_path, self._get_data_path(model_type), filename)
-        self.models[model_type].save(data, filepath)
+    def _apply(self, model_type, data, filename, embed_data=None, sequence=None):
+        """
+        Writes a record and updates the search index, graph index and vector store.
+        Replaying it with the same arguments gives the same result. A logged write
+        (with a sequence number) is skipped if the record already holds a newer one.
+        """
+        data_path = self._get_data_path(model_type)
+        key = f"{data_path}/{filename}"
+        if sequence is not None:
+            with self.versions.locked():
+                if self.versions.is_current(key, sequence):
+                    self._apply(model_type, data, filename, embed_data)
+                    self.versions.record([(key, sequence)])  # Only once every step is done
+            return
+
+        self._create_directories()
+        if self.segments is not None:
+            self.segments.put(key, self.models[model_type].dumps(data))
+            record_cache.invalidate(os.path.join(self.segments.path, key))
+        else:
+            filepath = os.path.join(self.base_path, data_path, filename)
+            self.models[model_type].save(data, filepath)
+            record_cache.invalidate(filepath)
+            if self.wal is not None:
+                self._unsynced.update((filepath, os.path.dirname(filepath)))
+
+        # Keep the search index in step with the record files
+        if self.index.refresh():
+            self.index.add(key, data)
+        else:
+            self.rebuild_index()  # First write into an unindexed tree
+        if model_type == "graph":
+            if self.graph.refresh():
+                self.graph.add(key, data)
+            elif self.graph.in_memory:
+                self.rebuild_graph()  # Persisted by the first write, like the search index
 
         # Handle vector embeddings
         if self.vector_db_enabled and embed_data is not None:
             data_id = filename  # Using filename as a simple ID
-            self.vector_db.add_embedding(data_id, embed_data)
+            self.vector_db.add_embedding(data_id, embed_data, attributes=self._record_attributes(model_type, data))
+
+    def bulk_save(self, model_type, records, embeddings=None, batch_size=1000, sync=False):
+        """
+        Saves an iterable of (filename, data) records in batches.
+        embeddings, if given, is an (N, D) array or iterable aligned with records (None
+        entries are skipped) and must have one entry per record. Within each batch the
+        search index is journaled in one append, segment frames go out in a single write,
+        embeddings are added as one matrix append and, with sync=True, the files the batch
+        wrote are fsynced together. The index snapshot is written once, at the end.
+        Returns {"records", "seconds", "records_per_sec"}.
+        A count mismatch is reported before anything is written when records and
+        embeddings both have a length. Otherwise it is only found on reaching the end of
+        the shorter one; the ValueError is raised then, and the batches before it stay saved.
+        """
+        if model_type not in self.models:
+            raise ValueError(f"Invalid model type: {model_type}")
+        if hasattr(records, "__len__") and hasattr(embeddings, "__len__") and len(records) != len(embeddings):
+            raise ValueError(f"bulk_save got {len(embeddings)} embeddings for {len(records)} records")
+        if not self.index.refresh():
+            self.rebuild_index()
+
+        embedding_iter = iter(embeddings) if embeddings is not None else None
+        start = time.perf_counter()
+        count = 0
+        batch = []
+        for filename, data in records:
+            self._check_write(model_type, filename)
+            embedding = None
+            if embedding_iter is not None:
+                embedding = next(embedding_iter, _MISSING)
+                if embedding is _MISSING:
+                    raise ValueError(f"bulk_save got {count + len(batch)} embeddings for more records")
+            batch.append((filename, data, embedding))
+            if len(batch) >= batch_size:
+                self._save_batch(model_type, batch, sync)
+                count += len(batch)
+                batch = []
+        if batch:
+            self._save_batch(model_type, batch, sync)
+            count += len(batch)
+        self.index.save()
+        if embedding_iter is not None and next(embedding_iter, _MISSING) is not _MISSING:
+            raise ValueError(f"bulk_save got more embeddings than its {count} records")
+
+        seconds = time.perf_counter() - start
+        return {"records": count, "seconds": seconds, "records_per_sec": count / seconds if seconds else float("inf")}
+
+    def _save_batch(self, model_type, batch, sync):
+        """
+        Writes one bulk_save batch, logging it first as one group commit when the write-ahead log is enabled.
+        """
+        if self.wal is None:
+            self._apply_batch(model_type, batch, sync)
+            return
+        first = self.versions.next_sequence(len(batch))
+        last = self.wal.append_many(_wal_entry(model_type, filename, data, embedding, first + i)
+                                    for i, (filename, data, embedding) in enumerate(batch))
+        self._commit(last - len(batch) + 1, last, lambda: self._apply_batch(model_type, batch, sync, first))
+
+    def _apply_batch(self, model_type, batch, sync, first_sequence=None):
+        if first_sequence is not None:
+            data_path = self._get_data_path(model_type)
+            with self.versions.locked():
+                versioned = [(item, f"{data_path}/{item[0]}", first_sequence + i) for i, item in enumerate(batch)]
+                versioned = [(item, key, sequence) for item, key, sequence in versioned
+                             if self.versions.is_current(key, sequence)]
+                if versioned:
+                    self._apply_batch(model_type, [item for item, _, _ in versioned], sync)
+                    self.versions.record((key, sequence) for _, key, sequence in versioned)
+            return
+        self._create_directories()
+        model = self.models[model_type]
+        data_path = self._get_data_path(model_type)
+        if self.segments is not None:
+            self.segments.put_many((f"{data_path}/{filename}", model.dumps(data)) for filename, data, _ in batch)
+            for filename, _, _ in batch:
+                record_cache.invalidate(os.path.join(self.segments.path, data_path, filename))
+            if sync:
+                self.segments.flush()
+        else:
+            filepaths = []
+            for filename, data, _ in batch:
+                filepath = os.path.join(self.base_path, data_path, filename)
+                model.save(data, filepath)
+                record_cache.invalidate(filepath)
+                filepaths.append(filepath)
+            if sync:
+                _fsync_files(filepaths + [os.path.join(self.base_path, data_path)])
+            elif self.wal is not None:
+                self._unsynced.update(filepaths + [os.path.join(self.base_path, data_path)])
+
+        self.index.add_many((f"{data_path}/{filename}", data) for filename, data, _ in batch)
+        if model_type == "graph":
+            if self.graph.refresh():
+                self.graph.add_many((f"{data_path}/{filename}", data) for filename, data, _ in batch)
+            elif self.graph.in_memory:
+                self.rebuild_graph()
+
+        embedded = [(filename, data, embedding) for filename, data, embedding in batch if embedding is not None]
+        if self.vector_db_enabled and embedded:
+            self.vector_db.add_embeddings([filename for filename, _, _ in embedded],
+                                          np.stack([np.asarray(embedding, dtype=np.float32) for _, _, embedding in embedded]),
+                                          [self._record_attributes(model_type, data) for _, data, _ in embedded])
+
+    def _record_attributes(self, model_type, data):
+        """
+        Returns the vector attributes of a record: its model and its filterable_fields.
+        """
+        from vector_integration.attributes import record_attributes  # Loads NumPy; see vector_db
+        return record_attributes(model_type, data, self.filterable_fields.get(model_type, ()))
+
+    def recover(self):
+        """
+        Replays the writes left in orphaned write-ahead logs (by a crash, or by a Storage
+        that was not closed), checkpoints and removes those logs. Returns the number of
+        replayed writes. Called when the Storage is opened.
+        Writes that fail to apply are moved to wal/quarantine.jsonl and logged rather than
+        keeping the directory from being opened. Entries are applied like live writes, so
+        one whose record has since been overwritten by a newer write is skipped, and one
+        that was cut short is applied again in full.
+        """
+        replayed = 0
+        logs = orphaned_logs(os.path.dirname(self.wal.path))
+        try:
+            for log in logs:
+                for entry in log.replay():
+                    try:
+                        self._check_write(entry["model"], entry["filename"])
+                        # Entries logged before writes were versioned count as older than any versioned write
+                        self._apply(entry["model"], entry["data"], entry["filename"], entry.get("embedding"),
+                                    entry.get("seq", 0))
+                    except Exception as e:
+                        self._quarantine(entry, e)
+                        continue
+                    replayed += 1
+            if replayed:
+                self.checkpoint()
+            for log in logs:
+                log.discard()
+        finally:
+            for log in logs:
+                log.close()
+        return replayed
+
+    def _quarantine(self, entry, error):
+        path = os.path.join(os.path.dirname(self.wal.path), "quarantine.jsonl")
+        with open(path, 'a') as f:
+            f.write(json.dumps({"error": repr(error), "entry": entry}) + "\n")
+        logger.warning("Skipped write-ahead log entry for %s/%s that failed to apply (%r); moved to %s",
+                       entry.get("model"), entry.get("filename"), error, path)
+
+    def checkpoint(self):
+        """
+        Makes every applied write durable on its own and empties the write-ahead log.
+        Returns False if writes that are logged but not yet applied kept the log from
+        being emptied; a later checkpoint will catch up.
+        """
+        if self.wal is None:
+            return False
+        with self._apply_cond:
+            if self.index.refresh():
+                self.index.save()  # Never writes an index that was not built or not loaded
+            graph = self.__dict__.get("graph")
+            if graph is not None and graph.refresh() and graph.pending():
+                graph.save()  # Folds the graph journal and stores the rebuilt CSR arrays
+            if self.segments is not None:
+                self.segments.flush()
+            self.versions.compact()
+            unsynced, self._unsynced = self._unsynced, set()
+            _fsync_files(sorted(unsynced) + self._checkpoint_paths())
+            return self.wal.truncate(self._applied_lsn)
+
+    def _checkpoint_paths(self):
+        """
+        Returns the files other than records that applied writes append to or replace,
+        and their directories, for checkpoint() to fsync.
+        """
+        paths = [self.index.index_path, self.index.journal_path, self.versions.path]
+        graph = self.__dict__.get("graph")
+        if graph is not None:
+            paths += [graph.index_path, graph.arrays_path, graph.journal_path]
+        vector_db = self.__dict__.get("vector_db")
+        if vector_db is not None and vector_db.store is not None:
+            paths += vector_db.store.files()
+        return paths + sorted({os.path.dirname(path) for path in paths})
+
+    def _commit(self, first_lsn, last_lsn, apply):
+        """
+        Waits for log entries first_lsn..last_lsn to be durable, then runs apply once
+        every earlier entry has been applied, checkpointing if the log has grown large.
+        """
+        committed = False
+        try:
+            self.wal.sync(last_lsn)
+            committed = True
+        finally:
+            # Even a failed commit takes its turn, so later writers do not wait for it forever
+            with self._apply_cond:
+                while self._applied_lsn != first_lsn - 1:
+                    self._apply_cond.wait()
+                try:
+                    if committed:
+                        apply()
+                finally:
+                    self._applied_lsn = last_lsn
+                    self._apply_cond.notify_all()
+                if committed and self.wal.size() >= self.checkpoint_bytes:
+                    self.checkpoint()
 
     def load_data(self, model_type, filename):
         """
         Loads data using the specified data model.
+        Parsed records are served from the shared record cache; callers get their own copy.
         """
         if model_type not in self.models:
             raise ValueError(f"Invalid model type: {model_type}")
 
-        filepath = os.path.join(self.base_path, self._get_data_path(model_type), filename)
-        return self.models[model_type].load(filepath)
+        start = metrics.start()
+        if self.segments is not None:
+            data = copy.deepcopy(self.read_record(f"{self._get_data_path(model_type)}/{filename}"))
+        else:
+            filepath = os.path.join(self.base_path, self._get_data_path(model_type), filename)
+            if filepath.endswith('.col'):
+                data = self.models[model_type].load(filepath)  # Columns are memory-mapped, not cached
+            else:
+                data = copy.deepcopy(record_cache.load(filepath, self.models[model_type].load))
+        metrics.stop("storage.load_data", start, {"model": model_type})
+        return data
+
+    def scan_table(self, filename, columns=None, where=None, limit=None):
+        """
+        Reads a relational table with column projection, predicate pushdown and a row limit.
+        where is a list of (column, operator, value) predicates that must all hold, e.g.
+        [("age", ">", 25)]. Returns rows with a header row, like load_data.
+        """
+        model = self.models['relational']
+        if self.segments is not None:
+            return model.filter_rows(self.load_data('relational', filename), columns, where, limit)
+        return model.scan(os.path.join(self.base_path, self._get_data_path('relational'), filename),
+                          columns, where, limit)
+
+    def read_record(self, key):
+        """
+        Loads a record by its key relative to the data directory, e.g. "structured/users.csv".
+        Raises FileNotFoundError if it does not exist. The record is shared with the record
+        cache and must not be modified.
+        """
+        if self.segments is None:
+            return read_record_file(os.path.join(self.base_path, key))
+        location = self.segments.index.get(key)
+        if location is None:
+            raise FileNotFoundError(f"No such record: {key}")
+        model = self.models['relational'] if key.startswith("structured/") else self.models['document']
+        # A record's segment location changes whenever it is rewritten, so it versions the entry
+        return record_cache.get(os.path.join(self.segments.path, key), location, location[2],
+                                lambda: model.loads(self.segments.get(key)))
+
+    def record_keys(self, data_path):
+        """
+        Returns the keys of all records stored under a data path such as "unstructured/document".
+        """
+        if self.segments is not None:
+            return self.segments.keys(f"{data_path}/")
+        try:
+            filenames = sorted(os.listdir(os.path.join(self.base_path, data_path)))
+        except FileNotFoundError:
+            return []
+        return [f"{data_path}/{filename}" for filename in filenames if filename.endswith(RECORD_EXTENSIONS)]
+
+    def rebuild_index(self, persist=True):
+        """
+        Rebuilds the search index from every stored record. Returns the number of records.
+        With persist=False it is only built in memory (see InvertedIndex.rebuild).
+        """
+        if self.segments is None:
+            return self.index.rebuild(persist=persist)
+        keys = [key for data_path in InvertedIndex.INDEXED_PATHS for key in self.record_keys(data_path)]
+        return self.index.rebuild(((key, self.read_record(key)) for key in keys), persist)
+
+    def rebuild_graph(self, persist=True):
+        """
+        Rebuilds the graph adjacency index from every stored graph record. Returns the number of graphs.
+        """
+        return self.graph.rebuild(((key, self.read_record(key)) for key in self.record_keys(self._get_data_path("graph"))),
+                                  persist)
+
+    def open_graph(self):
+        """
+        Returns the GraphIndex merging all graph records, building it in memory on first
+        use if it has not been persisted yet.
+        """
+        if not self.graph.ready():
+            self.rebuild_graph(persist=False)
+        return self.graph
+
+    def open_kv(self, name="default"):
+        """
+        Returns the KeyValueStore stored under kv/<name>/, opening it on first use.
+        Unlike keyvalue records, which are whole JSON files, it reads and writes single keys.
+        """
+        store = self.kv_stores.get(name)
+        if store is None:
+            store = self.kv_stores[name] = KeyValueStore(os.path.join(self.base_path, "kv", name))
+        return store
+
+    def close(self):
+        """
+        Closes the key-value stores and segment files, checkpoints and removes the
+        write-ahead log. Records already written stay durable.
+        """
+        for store in self.kv_stores.values():
+            store.close()
+        self.kv_stores.clear()
+        if self.wal is not None:
+            if self.wal.size():
+                self.checkpoint()
+            self.wal.close()
+        if self.segments is not None:
+            self.segments.close()
+
+    def migrate_namespaces(self, overrides=None):
+        """
+        One-shot migration of records written before each JSON model had its own namespace:
+        moves every record directly under unstructured/ into unstructured/<model>/ and
+        rebuilds the search and graph indexes. The model is taken from overrides
+        ({filename: model_type}) or guessed with classify_record, and every guess is
+        logged. Records it cannot tell apart (flat objects of strings, which may be
+        documents or key-value records) need an override: if any lacks one, a ValueError
+        naming them is raised before anything is moved.
+        Returns {filename: model_type} for the moved records.
+        """
+        overrides = overrides or {}
+        if self.segments is not None:
+            legacy = {key.split("/", 1)[1]: key for key in self.segments.keys("unstructured/") if key.count("/") == 1}
+            load = lambda filename: self.models['document'].loads(self.segments.get(legacy[filename]))
+        else:
+            self._create_directories()
+            legacy_path = os.path.join(self.base_path, "unstructured")
+            legacy = {filename: os.path.join(legacy_path, filename) for filename in sorted(os.listdir(legacy_path))
+                      if filename.endswith('.json') and os.path.isfile(os.path.join(legacy_path, filename))}
+            load = lambda filename: read_record_file(legacy[filename])
+
+        models, ambiguous = {}, []
+        for filename in legacy:
+            if filename in overrides:
+                models[filename] = overrides[filename]
+                continue
+            model_type = classify_record(load(filename))
+            if model_type is None:
+                ambiguous.append(filename)
+            else:
+                logger.info("Classified legacy record %s as %s", filename, model_type)
+                models[filename] = model_type
+        if ambiguous:
+            raise ValueError(f"Cannot tell whether these records are documents or key-value records; "
+                             f"pass their models in overrides: {', '.join(ambiguous)}")
+
+        moved = {}
+        for filename, model_type in models.items():
+            if self.segments is not None:
+                self.segments.put(f"{self._get_data_path(model_type)}/{filename}", self.segments.get(legacy[filename]))
+                self.segments.delete(legacy[filename])
+            else:
+                os.replace(legacy[filename], os.path.join(self.base_path, self._get_data_path(model_type), filename))
+            moved[filename] = model_type
+        if moved:
+            self.rebuild_index()
+            self.rebuild_graph()
+        return moved
+
+    def migrate_codec(self):
+        """
+        Rewrites every document, graph and keyvalue record, and the multimedia metadata
+        files, with this Storage's codec. Records already in that format are left alone.
+        Meant to run while nothing else writes to the data directory. Returns the number
+        of rewritten files.
+        """
+        rewritten = 0
+        keys = [key for model_type in ['document', 'graph', 'keyvalue']
+                for key in self.record_keys(self._get_data_path(model_type))]
+        for key in keys:
+            if self.segments is not None:
+                payload = self.segments.get(key)
+                encoded = self.codec.encode(decode_record(payload))
+                if encoded != payload:
+                    self.segments.put(key, encoded)
+                    record_cache.invalidate(os.path.join(self.segments.path, key))
+                    rewritten += 1
+            elif self._rewrite_file(os.path.join(self.base_path, key)):
+                rewritten += 1
+
+        metadata_path = os.path.join(self.base_path, "multimedia_metadata")
+        if os.path.isdir(metadata_path):
+            for filename in sorted(os.listdir(metadata_path)):
+                if filename.endswith('.json') and self._rewrite_file(os.path.join(metadata_path, filename)):
+                    rewritten += 1
+        return rewritten
+
+    def _rewrite_file(self, filepath):
+        with open(filepath, 'rb') as f:
+            payload = f.read()
+        encoded = self.codec.encode(decode_record(payload))
+        if encoded == payload:
+            return False
+        with write_atomic(filepath, 'wb') as f:
+            f.write(encoded)
+        record_cache.invalidate(filepath)
+        return True
 
     def save_multimedia_file(self, file_path, file_data):
         """
-        Saves a multimedia file to the specified path.
+        Saves a multimedia file (bytes or a readable binary stream) under the given path.
+        The content is streamed into the blob store, so identical files are stored once,
+        and the path is linked to it. Returns the content digest, which can be stored in
+        the file's metadata as "blob" to keep the content alive while the metadata exists.
         """
-        save_file(file_path, file_data)
+        return self.blobs.put(file_data, name=file_path)
 
     def load_multimedia_file(self, file_path):
         """
         Loads a multimedia file from the specified path.
         """
-        return load_file(file_path)
+        digest = self.blobs.resolve(file_path)
+        if digest is None:
+            return load_file(file_path)  # Written before the blob store existed
+        return self.blobs.read(digest)
+
+    def iter_multimedia_file(self, file_path, start=0, end=None, chunk_size=None):
+        """
+        Yields a multimedia file's bytes from start to end in chunks, without loading it whole.
+        """
+        digest = self.blobs.resolve(file_path)
+        if digest is None:
+            raise FileNotFoundError(f"No such multimedia file: {file_path}")
+        return self.blobs.iter_chunks(digest, start, end, chunk_size)
+
+    def read_multimedia_range(self, file_path, start, length=None):
+        """
+        Returns a zero-copy memoryview of a byte range of a multimedia file, backed by mmap.
+        """
+        digest = self.blobs.resolve(file_path)
+        if digest is None:
+            raise FileNotFoundError(f"No such multimedia file: {file_path}")
+        return self.blobs.read_range(digest, start, length)
 
     def delete_multimedia_file(self, file_path):
         """
         Deletes a multimedia file from the specified path.
+        The content itself is removed once nothing else references it.
         """
-        delete_file(file_path)
+        if not self.blobs.unlink(file_path):
+            delete_file(file_path)
 
     def _get_data_path(self, model_type):
         """
@@ -82,6 +651,47 @@ class Storage:
         if model_type == 'relational':
             return "structured"
         elif model_type in ['document', 'keyvalue', 'graph']:
-            return "unstructured"
+            return f"unstructured/{model_type}"  # Each JSON model has its own namespace
         else:
-            return "multimedia"
\ No newline at end of file
+            return "multimedia"
+
+_MISSING = object()
+
+def _fsync_files(paths):
+    """
+    Flushes the given files (and directories, so renames into them persist) to disk.
+    """
+    for path in paths:
+        try:
+            fd = os.open(path, os.O_RDONLY)
+        except OSError:
+            continue  # Directories cannot be opened on Windows
+        try:
+            os.fsync(fd)
+        except OSError:
+            pass  # Nor fsynced on some platforms
+        finally:
+            os.close(fd)
+
+def _close_at_exit(storage_ref):
+    storage = storage_ref()
+    if storage is not None and storage.wal is not None and storage.wal.size():
+        storage.checkpoint()
+        storage.wal.close()
+
+def _wal_entry(model_type, filename, data, embedding, sequence):
+    if embedding is not None:
+        embedding = np.asarray(embedding, dtype=np.float32).tolist()
+    return {"model": model_type, "filename": filename, "data": data, "embedding": embedding, "seq": sequence}
+
+def classify_record(data):
+    """
+    Guesses the model of a legacy unstructured record: graph for {"nodes", "edges"} records,
+    document for anything else except flat objects whose values are all strings, which
+    may be documents or key-value records and give None.
+    """
+    if is_graph_record(data):
+        return "graph"
+    if isinstance(data, dict) and data and all(isinstance(value, str) for value in data.values()):
+        return None
+    return "document"
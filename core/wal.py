@@ -0,0 +1,344 @@
+import os
+import json
+import zlib
+import time
+import struct
+import threading
+from .codecs import CODECS, decode_record
+from .file_lock import FileLock
+from .metrics import metrics
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None  # Without advisory locks (Windows) every log looks orphaned, so one process per directory
+
+HEADER = struct.Struct("<II")  # crc32, payload length
+
+class WriteAheadLog:
+    """
+    Append-only redo log with group commit.
+    Writers append entries (dicts) and then wait in sync() until their entry is on
+    disk. The first waiting writer becomes the leader and writes and fsyncs every entry
+    appended so far in one go, so concurrent writers share a single fsync; entries
+    appended during that fsync are committed together by the next leader. Entries are
+    checksummed frames; replay stops at a torn tail left by a crash.
+    Entry numbers (LSNs) count appends made through this instance, starting at 1.
+    The log file is created by the first commit and locked while open, so several
+    processes can each log to their own file in one directory and orphaned_logs() can
+    tell which logs were left behind.
+    Entries are encoded with codec, the records' codec, if it is binary, so they can hold
+    whatever records can (e.g. bytes); otherwise as compact JSON. Replay reads either.
+    """
+    def __init__(self, path, sync=True, codec=None):
+        self.path = path
+        self.sync_enabled = sync  # fsync on commit; without it entries only reach the OS
+        self.codec = codec if codec is not None and codec.binary else CODECS["json"]
+        self.syncs = 0  # Number of group commits
+        self._cond = threading.Condition(threading.Lock())
+        self._pending = []  # Frames appended but not yet written
+        self._last_lsn = 0
+        self._synced_lsn = 0
+        self._syncing = False
+        self._error = None
+        self._file = None
+
+    def append(self, entry):
+        """
+        Queues an entry for the next commit and returns its LSN.
+        """
+        return self.append_many([entry])
+
+    def append_many(self, entries):
+        """
+        Queues several entries with consecutive LSNs and returns the LSN of the last one.
+        """
+        frames = [_encode(self.codec, entry) for entry in entries]
+        with self._cond:
+            self._pending.extend(frames)
+            self._last_lsn += len(frames)
+            return self._last_lsn
+
+    def sync(self, lsn):
+        """
+        Returns once the entry with the given LSN (and every earlier one) is durable.
+        """
+        with self._cond:
+            while self._synced_lsn < lsn:
+                if self._error is not None:
+                    raise OSError(f"Write-ahead log {self.path} failed: {self._error}")
+                if self._syncing:
+                    self._cond.wait()
+                    continue
+                # Become the leader for everything queued so far
+                frames, target = self._pending, self._last_lsn
+                self._pending = []
+                self._syncing = True
+                self._cond.release()
+                try:
+                    start = metrics.start()
+                    if self._file is None:
+                        self._open()  # Only the leader touches the file
+                    self._file.write(b"".join(frames))
+                    self._file.flush()
+                    if self.sync_enabled:
+                        os.fsync(self._file.fileno())
+                    metrics.stop("wal.commit", start)
+                    metrics.increment("wal.entries_committed", len(frames))
+                except OSError as e:
+                    self._error = e  # The log can no longer vouch for later entries either
+                    raise
+                finally:
+                    self._cond.acquire()
+                    self._syncing = False
+                    self._cond.notify_all()
+                self._synced_lsn = target
+                self.syncs += 1
+
+    def replay(self):
+        """
+        Yields the entries currently on disk, oldest first.
+        """
+        for frame in self._frames():
+            yield decode_record(frame[HEADER.size:])
+
+    def size(self):
+        """
+        Returns the number of bytes written to the log.
+        """
+        with self._cond:
+            if self._file is None:
+                return os.path.getsize(self.path) if os.path.exists(self.path) else 0
+            return self._file.tell()
+
+    def truncate(self, applied_lsn):
+        """
+        Empties the log once every appended entry up to applied_lsn has been applied and
+        made durable elsewhere. Returns False, leaving the log untouched, if later entries
+        have been appended in the meantime.
+        """
+        with self._cond:
+            if self._last_lsn != applied_lsn or self._synced_lsn != applied_lsn or self._syncing:
+                return False
+            if self._file is None:
+                if not os.path.exists(self.path):
+                    return True
+                self._open()
+            self._file.truncate(0)
+            self._file.seek(0)
+            if self.sync_enabled:
+                os.fsync(self._file.fileno())
+            return True
+
+    def close(self):
+        """
+        Closes the log, removing its file if it is empty.
+        """
+        with self._cond:
+            if self._file is not None:
+                if self._file.tell() == 0 and not self._pending:
+                    os.remove(self.path)  # Still locked, so no other process is reading it
+                self._file.close()
+                self._file = None
+
+    def discard(self):
+        """
+        Removes the log file, once its entries have been applied elsewhere, and closes it.
+        """
+        with self._cond:
+            try:
+                os.remove(self.path)
+            except FileNotFoundError:
+                pass
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    def _open(self):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        self._file = open(self.path, 'ab')
+        if not self._lock(blocking=False):
+            self._file.close()
+            self._file = None
+            raise OSError(f"Write-ahead log {self.path} is in use by another process")
+
+    def _lock(self, blocking=True):
+        if fcntl is None:
+            return True
+        try:
+            fcntl.flock(self._file.fileno(), fcntl.LOCK_EX | (0 if blocking else fcntl.LOCK_NB))
+        except BlockingIOError:
+            return False
+        return True
+
+    def _frames(self):
+        """
+        Yields the raw frames of the log up to the first torn or corrupt one.
+        """
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, 'rb') as f:
+            while True:
+                header = f.read(HEADER.size)
+                if len(header) < HEADER.size:
+                    return
+                crc, length = HEADER.unpack(header)
+                payload = f.read(length)
+                if len(payload) < length or zlib.crc32(payload) != crc:
+                    return
+                yield header + payload
+
+class RecordVersions:
+    """
+    Orders writes to the same record across the per-process write-ahead logs, which have
+    no common order of their own.
+    Every logged write takes a sequence number from a counter shared by all processes
+    (sequence), and applying it stores that number as the record's version in an
+    append-only table (versions.jsonl). A write is only applied if it is at least as new as
+    the record's version, so a log replayed late never overwrites a newer write, while a
+    write cut short by a crash is applied again in full. Writers hold locked() for the
+    whole apply, so checking, writing and recording a version are atomic across processes.
+    """
+    def __init__(self, directory, compact_ratio=2):
+        self.directory = directory
+        self.path = os.path.join(directory, "versions.jsonl")
+        self.compact_ratio = compact_ratio  # Rewrites the table once it has this many lines per record
+        self.versions = {}  # record key -> sequence number of the write it holds
+        self._lines = 0
+        self._offset = 0
+        self._inode = None
+        self._sequence_lock = FileLock(os.path.join(directory, "sequence"))
+        self._apply_lock = FileLock(os.path.join(directory, "versions.lock"))
+
+    def next_sequence(self, count=1):
+        """
+        Reserves count consecutive sequence numbers and returns the first.
+        Numbers never fall behind the wall clock, so they keep increasing even if the
+        counter was lost in a crash.
+        """
+        with self._sequence_lock:
+            os.makedirs(self.directory, exist_ok=True)
+            with open(self._sequence_lock.path, 'a+') as counter:
+                counter.seek(0)
+                try:
+                    last = int(counter.read() or 0)
+                except ValueError:
+                    last = 0  # Torn by a crash
+                first = max(last + 1, time.time_ns())
+                counter.truncate(0)
+                counter.write(str(first + count - 1))
+            return first
+
+    def locked(self):
+        """
+        Returns the lock writers hold while they apply versioned writes. Holding it also
+        brings the versions up to date.
+        """
+        return _RefreshingLock(self)
+
+    def is_current(self, key, sequence):
+        """
+        Returns True if a write with this sequence number is at least as new as the record.
+        """
+        return sequence >= self.versions.get(key, -1)
+
+    def record(self, items):
+        """
+        Stores the versions of applied writes from (key, sequence) pairs.
+        """
+        items = list(items)
+        if not items:
+            return
+        with open(self.path, 'a') as f:
+            f.write("".join(json.dumps([key, sequence]) + "\n" for key, sequence in items))
+            self._offset, self._inode = f.tell(), os.fstat(f.fileno()).st_ino
+        for key, sequence in items:
+            self.versions[key] = sequence
+        self._lines += len(items)
+
+    def compact(self):
+        """
+        Rewrites the table with one line per record once it has grown compact_ratio times
+        longer than that.
+        """
+        with self.locked():
+            if os.path.exists(self.path) and self._lines > self.compact_ratio * max(len(self.versions), 1):
+                tmp_path = self.path + ".tmp"
+                with open(tmp_path, 'w') as f:
+                    f.write("".join(json.dumps([key, sequence]) + "\n" for key, sequence in self.versions.items()))
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(tmp_path, self.path)
+                stat = os.stat(self.path)
+                self._lines, self._offset, self._inode = len(self.versions), stat.st_size, stat.st_ino
+
+    def _refresh(self):
+        """
+        Reads the versions other processes stored since the last refresh.
+        """
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            self.versions, self._lines, self._offset, self._inode = {}, 0, 0, None
+            return
+        if stat.st_ino != self._inode or stat.st_size < self._offset:
+            self.versions, self._lines, self._offset, self._inode = {}, 0, 0, stat.st_ino  # Compacted
+        if stat.st_size == self._offset:
+            return
+        with open(self.path, 'rb') as f:
+            f.seek(self._offset)
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break  # Torn by a crash; the write it belonged to is replayed
+                key, sequence = json.loads(line)
+                self.versions[key] = sequence
+                self._offset += len(line)
+                self._lines += 1
+
+class _RefreshingLock:
+    def __init__(self, versions):
+        self.versions = versions
+
+    def __enter__(self):
+        self.versions._apply_lock.acquire()
+        try:
+            self.versions._refresh()
+        except BaseException:
+            self.versions._apply_lock.release()
+            raise
+        return self.versions
+
+    def __exit__(self, *exc_info):
+        self.versions._apply_lock.release()
+
+def orphaned_logs(directory):
+    """
+    Returns the logs in directory that no open WriteAheadLog holds, i.e. those left
+    behind by processes that exited or crashed without checkpointing, oldest first.
+    Each returned log stays locked until it is discarded or closed.
+    """
+    try:
+        names = os.listdir(directory)
+    except FileNotFoundError:
+        return []
+    logs = []
+    for name in names:
+        if not name.endswith(".log"):
+            continue
+        log = WriteAheadLog(os.path.join(directory, name))
+        try:
+            log._open()
+        except OSError:
+            continue  # Held by a live WriteAheadLog
+        logs.append(log)
+    return sorted(logs, key=lambda log: os.path.getmtime(log.path))
+
+def new_log_path(directory):
+    """
+    Returns an unused path for a new log in directory.
+    """
+    return os.path.join(directory, f"{os.getpid()}-{os.urandom(6).hex()}.log")
+
+def _encode(codec, entry):
+    payload = codec.encode(entry)
+    return HEADER.pack(zlib.crc32(payload), len(payload)) + payload
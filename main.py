@@ -1,18 +1,20 @@
-from core.storage import Storage
-from core.query import Query
-from core.metadata import MetadataManager
-from scripts.load_data import storage, metadata_manager  # Import the instances
+import sys
+from core.database import open_database
 
 def main():
     print("Starting the Multi-Model Database...")
+    # Nothing is read or written until the first query
+    db = open_database(vector_db_enabled=True)
 
     # Demonstrate loading data
-    print("Loading example data:")
-    # The load_data script has already loaded the data
-    print("Example data loaded.")
+    if "--load-examples" in sys.argv[1:]:
+        print("Loading example data:")
+        from scripts.load_data import load_example_data
+        load_example_data(db)
+        print("Example data loaded.")
 
     # Demonstrate querying
-    query_engine = Query()
+    query_engine = db.query
     print("\nQuery examples:")
     print("Searching for 'Alice':", query_engine.search(["Alice"]))
     print("Searching for 'Product' in graph:", query_engine.search(["Product"], model_type="graph"))
@@ -20,4 +22,8 @@ def main():
     # Demonstrate multimedia metadata query
     print("\nMultimedia metadata query:")
     multimedia_results = query_engine.search(["cat"], model_type="multimedia")
-    print("Multimedia search results:", multimedia_results)
\ No newline at end of file
+    print("Multimedia search results:", multimedia_results)
+    db.close()
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,7 @@
-from core.storage import Storage
-from core.metadata import MetadataManager  # Import MetadataManager
-import numpy as np  # Import numpy for generating embeddings if needed
+from core.database import open_database
 
-# Initialize storage with vector DB enabled
-storage = Storage(vector_db_enabled=True)
-metadata_manager = MetadataManager()  # Initialize MetadataManager
+# Storage and metadata manager are opened on first use, with vector DB enabled
+db = open_database(vector_db_enabled=True)
 
 # Example of adding structured data (CSV)
 def add_structured_data():
@@ -13,7 +10,7 @@ def add_structured_data():
         ["3", "Charlie", "28"],
         ["4", "Diana", "22"]
     ]
-    storage.save_data("relational", structured_data, "new_users.csv")
+    db.storage.save_data("relational", structured_data, "new_users.csv")
 
 # Example of adding unstructured data (JSON)
 def add_unstructured_data():
@@ -23,8 +20,9 @@ def add_unstructured_data():
         "price": 799.99
     }
     # Generate dummy embedding for demonstration
+    import numpy as np
     product_embedding = np.random.rand(128).tolist()  # Generate a 128-dimensional vector
-    storage.save_data("document", unstructured_data, "smartphone.json", embed_data=product_embedding)
+    db.storage.save_data("document", unstructured_data, "smartphone.json", embed_data=product_embedding)
 
 # Example of adding graph data (JSON)
 def add_graph_data():
@@ -32,12 +30,12 @@ def add_graph_data():
         "nodes": [{"id": "3", "label": "User"}, {"id": "4", "label": "Product"}],
         "edges": [{"source": "3", "target": "4", "relation": "viewed"}]
     }
-    storage.save_data("graph", graph_data, "view_graph.json")
+    db.storage.save_data("graph", graph_data, "view_graph.json")
 
 # Example of adding key-value data
 def add_key_value_data():
     key_value_data = {"session_id": "xyz789abc", "user_id": "3"}
-    storage.save_data("keyvalue", key_value_data, "new_session.json")
+    db.storage.save_data("keyvalue", key_value_data, "new_session.json")
 
 # Example of adding multimedia metadata
 def add_multimedia_metadata():
@@ -46,11 +44,11 @@ def add_multimedia_metadata():
         "tags": ["dog", "animal", "pet"],
         "description": "Image of a dog"
     }
-    metadata_manager.save_metadata("new_image.jpg", multimedia_metadata)  # Use MetadataManager
+    db.metadata.save_metadata("new_image.jpg", multimedia_metadata)
 
     # Save a dummy multimedia file (replace with actual file loading)
     dummy_image_data = b"New dummy image data"  # Example binary data
-    storage.save_multimedia_file("data/multimedia/new_image.jpg", dummy_image_data)
+    db.storage.save_multimedia_file("data/multimedia/new_image.jpg", dummy_image_data)
 
 if __name__ == "__main__":
     add_structured_data()
@@ -58,4 +56,5 @@ if __name__ == "__main__":
     add_graph_data()
     add_key_value_data()
     add_multimedia_metadata()
+    db.close()
     print("Custom data added successfully.")
@@ -0,0 +1,36 @@
+import sys
+import json
+import tempfile
+import numpy as np
+from vector_integration.vector_db_interface import VectorDBInterface
+from vector_integration.ann_index import IVFFlatIndex, recall_latency_report
+
+def run_report(num_vectors=100000, dim=128, num_queries=100, top_k=10, seed=0, compression=None):
+    """
+    Builds a synthetic clustered vector store and prints recall vs latency of the IVF index,
+    or of the compressed representation ("int8" or "pq") at several re-rank depths, whose
+    float rows are kept in a temporary on-disk store.
+    """
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(256, dim))
+    vectors = centers[rng.integers(0, 256, num_vectors)] + 2.0 * rng.normal(size=(num_vectors, dim))
+
+    if compression:
+        vector_db = VectorDBInterface(path=tempfile.mkdtemp(prefix="ann_recall_"), compression=compression)
+        settings = [{"rerank": rerank} for rerank in (0, 2 * top_k, 5 * top_k, 10 * top_k)]
+    else:
+        vector_db = VectorDBInterface(index=IVFFlatIndex())
+        settings = None
+    vector_db.add_embeddings([f"vec_{i}" for i in range(num_vectors)], vectors)
+    vector_db.search_embedding(vectors[0], top_k=1)  # Trains the index or quantizer
+
+    queries = centers[rng.integers(0, 256, num_queries)] + 2.0 * rng.normal(size=(num_queries, dim))
+    report = recall_latency_report(vector_db, queries, top_k=top_k, settings=settings)
+    print(json.dumps(report, indent=4))
+    if compression:
+        print("Memory usage (bytes):", vector_db.memory_usage())
+    return report
+
+if __name__ == "__main__":
+    run_report(int(sys.argv[1]) if len(sys.argv) > 1 else 100000,
+               compression=sys.argv[2] if len(sys.argv) > 2 else None)
@@ -0,0 +1,35 @@
+import sys
+import json
+import itertools
+from core.storage import Storage
+
+def read_records(path):
+    """
+    Yields (filename, data, embedding) tuples from a JSON-lines file whose lines look like
+    {"filename": "...", "data": {...}, "embedding": [...]} ("embedding" is optional).
+    """
+    with open(path, 'r') as f:
+        for line in f:
+            if line.strip():
+                entry = json.loads(line)
+                yield entry["filename"], entry["data"], entry.get("embedding")
+
+def bulk_load(path, model_type="document", base_path="data", backend="files", batch_size=1000):
+    """
+    Ingests a JSON-lines file with Storage.bulk_save and reports throughput.
+    """
+    storage = Storage(base_path, vector_db_enabled=True, backend=backend)
+    # Two views of one stream; tee only buffers the single entry between them
+    record_entries, embedding_entries = itertools.tee(read_records(path))
+    records = ((filename, data) for filename, data, _ in record_entries)
+    embeddings = (embedding for _, _, embedding in embedding_entries)
+    stats = storage.bulk_save(model_type, records, embeddings=embeddings, batch_size=batch_size)
+    print(f"Loaded {stats['records']} records in {stats['seconds']:.2f}s ({stats['records_per_sec']:.0f} records/sec)")
+    return stats
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("Usage: python -m scripts.bulk_load <records.jsonl> [model_type] [files|segments]")
+    else:
+        bulk_load(sys.argv[1], *(sys.argv[2:3] or ["document"]),
+                  backend=sys.argv[3] if len(sys.argv) > 3 else "files")
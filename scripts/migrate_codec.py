@@ -0,0 +1,17 @@
+import os
+import sys
+from core.storage import Storage
+
+def migrate_codec(base_path="data", codec="json"):
+    """
+    Rewrites the JSON-model records and multimedia metadata of a data directory with the
+    given codec ("json", "json-pretty", "binary" or "msgpack").
+    """
+    backend = "segments" if os.path.isdir(os.path.join(base_path, "segments")) else "files"
+    storage = Storage(base_path, backend=backend, codec=codec)
+    rewritten = storage.migrate_codec()
+    print(f"Rewrote {rewritten} files with the {codec} codec")
+    return rewritten
+
+if __name__ == "__main__":
+    migrate_codec(sys.argv[1] if len(sys.argv) > 1 else "data", sys.argv[2] if len(sys.argv) > 2 else "json")
@@ -0,0 +1,22 @@
+import os
+import sys
+import json
+from core.storage import Storage
+
+def migrate_namespaces(base_path="data", overrides=None):
+    """
+    Moves records from the shared unstructured/ directory into per-model namespaces
+    (unstructured/document/, unstructured/graph/, unstructured/keyvalue/).
+    """
+    backend = "segments" if os.path.isdir(os.path.join(base_path, "segments")) else "files"
+    storage = Storage(base_path, backend=backend)
+    moved = storage.migrate_namespaces(overrides)
+    for filename, model_type in sorted(moved.items()):
+        print(f"{filename} -> {model_type}")
+    print(f"Migrated {len(moved)} records")
+    return moved
+
+if __name__ == "__main__":
+    # Optional second argument: JSON object mapping filenames to model types
+    overrides = json.loads(sys.argv[2]) if len(sys.argv) > 2 else None
+    migrate_namespaces(sys.argv[1] if len(sys.argv) > 1 else "data", overrides)
@@ -1,12 +1,7 @@
-from core.query import Query
-from core.metadata import MetadataManager
-from core.storage import Storage
-import numpy as np  # Import numpy for dummy query embeddings
+from core.database import open_database
 
-# Initialize query engine, metadata manager, and storage
-query_engine = Query()
-metadata_manager = MetadataManager()
-storage = Storage(vector_db_enabled=True)  # Enable vector DB
+# Storage, query engine and metadata manager are opened on first use
+db = open_database(vector_db_enabled=True)  # Enable vector DB
 
 def parse_query(query):
     """
@@ -15,14 +10,8 @@ def parse_query(query):
     query = query.strip().lower()
     if query.startswith("select * from"):
         table = query.split("from")[1].strip()
-        if table == "relational":
-            query_structured_data([])
-        elif table == "document":
-            query_unstructured_data([])
-        elif table == "graph":
-            query_graph_data([])
-        elif table == "keyvalue":
-            query_key_value_data([])
+        if table in MODEL_DESCRIPTIONS:
+            query_model_data(table, [])
         elif table == "multimedia":
             query_multimedia_metadata([])
         else:
@@ -63,81 +52,66 @@ def parse_query(query):
     else:
         print(f"Unsupported query: {query}")
 
-# Function to query structured data (CSV)
-def query_structured_data(query_terms):
-    results = query_engine.search(query_terms, model_type="relational")
-    print("Structured data search results:", results)
-    if results:
-        for result in results:
-            data = storage.load_data("relational", result["filename"])
-            print(f"Data in {result['filename']}:", data)
-
-# Function to query unstructured data (JSON)
-def query_unstructured_data(query_terms):
-    results = query_engine.search(query_terms, model_type="document")
-    print("Unstructured data search results:", results)
-    if results:
-        for result in results:
-            data = storage.load_data("document", result["filename"])
-            print(f"Data in {result['filename']}:", data)
+# Kind of data held by each record model, as shown in messages
+MODEL_DESCRIPTIONS = {"relational": "Structured", "document": "Unstructured", "graph": "Graph", "keyvalue": "Key-value"}
 
-# Function to query graph data (JSON)
-def query_graph_data(query_terms):
-    results = query_engine.search(query_terms, model_type="graph")
-    print("Graph data search results:", results)
-    if results:
-        for result in results:
-            data = storage.load_data("graph", result["filename"])
-            print(f"Data in {result['filename']}:", data)
-
-# Function to query key-value data
-def query_key_value_data(query_terms):
-    results = query_engine.search(query_terms, model_type="keyvalue")
-    print("Key-value data search results:", results)
-    if results:
-        for result in results:
-            data = storage.load_data("keyvalue", result["filename"])
-            print(f"Data in {result['filename']}:", data)
+# Function to query structured (CSV), unstructured and graph (JSON) or key-value data
+def query_model_data(model_type, query_terms):
+    # Records are loaded one at a time as matches stream in
+    for result, data in db.query.iter_search(query_terms, model_type=model_type, load=True):
+        print(f"{MODEL_DESCRIPTIONS[model_type]} data search result:", {"model": result["model"], "filename": result["filename"]})
+        print(f"Data in {result['filename']}:", data)
 
 # Function to query multimedia metadata
 def query_multimedia_metadata(query_terms):
-    results = query_engine.search(query_terms, model_type="multimedia")
+    results = db.query.search(query_terms, model_type="multimedia")
     print("Multimedia metadata search results:", results)
     if results:
         for result in results:
-            metadata = metadata_manager.load_metadata(result["filename"].replace(".json", ""))
+            metadata = db.metadata.load_metadata(result["filename"].replace(".json", ""))
             print(f"Metadata for {result['filename']}:", metadata)
 
 # Function to perform vector search
 def query_vector_data(query_embedding, top_k=3):
-    vector_results = storage.vector_db.search_embedding(query_embedding, top_k=top_k)
+    import numpy as np
+    queries = np.asarray(query_embedding)
+    if queries.ndim == 2 and queries.shape[0] > 1:
+        # Several queries submitted: score them all in one batched search
+        ids, scores = db.storage.vector_db.search_embeddings_batch(queries, top_k=top_k)
+        for query_number, (query_ids, query_scores) in enumerate(zip(ids, scores)):
+            print(f"Vector search results for query {query_number}:",
+                  [{"data_id": data_id, "similarity": float(score)} for data_id, score in zip(query_ids, query_scores)])
+        return
+    if queries.ndim == 2:
+        query_embedding = queries[0]
+    vector_results = db.storage.vector_db.search_embedding(query_embedding, top_k=top_k)
     print("Vector search results:", vector_results)
     if vector_results:
         for result in vector_results:
             data_id = result["data_id"]
             # Assuming data_id corresponds to filename for simplicity
-            data = storage.load_data("document", data_id)  # Load the data
+            data = db.storage.load_data("document", data_id)  # Load the data
             print(f"Data for {data_id}:", data)
 
 # Function to add structured data (CSV)
 def add_structured_data(values):
-    storage.save_data("relational", values, "new_users.csv")
+    db.storage.save_data("relational", values, "new_users.csv")
 
 # Function to add unstructured data (JSON)
 def add_unstructured_data(values):
-    storage.save_data("document", values, "new_document.json")
+    db.storage.save_data("document", values, "new_document.json")
 
 # Function to add graph data (JSON)
 def add_graph_data(values):
-    storage.save_data("graph", values, "new_graph.json")
+    db.storage.save_data("graph", values, "new_graph.json")
 
 # Function to add key-value data
 def add_key_value_data(values):
-    storage.save_data("keyvalue", values, "new_keyvalue.json")
+    db.storage.save_data("keyvalue", values, "new_keyvalue.json")
 
 # Function to add multimedia metadata
 def add_multimedia_metadata(values):
-    metadata_manager.save_metadata("new_image.jpg", values)
+    db.metadata.save_metadata("new_image.jpg", values)
 
 # Function to delete data
 def delete_data(model_type):
@@ -154,5 +128,6 @@ if __name__ == "__main__":
     if len(sys.argv) > 1:
         query = " ".join(sys.argv[1:])
         parse_query(query)
+        db.close()
     else:
         print("Please provide a query.")
@@ -0,0 +1,18 @@
+import os
+import sys
+from core.storage import Storage
+
+def rebuild_index(base_path="data"):
+    """
+    Rebuilds the inverted search index and the graph index for an existing data directory.
+    """
+    backend = "segments" if os.path.isdir(os.path.join(base_path, "segments")) else "files"
+    storage = Storage(base_path, backend=backend)
+    count = storage.rebuild_index()
+    print(f"Indexed {count} records ({len(storage.index.terms)} terms) into {storage.index.index_path}")
+    graphs = storage.rebuild_graph()
+    print(f"Indexed {graphs} graphs ({len(storage.graph)} nodes) into {storage.graph.index_path}")
+    return count
+
+if __name__ == "__main__":
+    rebuild_index(sys.argv[1] if len(sys.argv) > 1 else "data")
@@ -0,0 +1,18 @@
+import asyncio
+import os
+from core.async_api import AsyncStorage
+from core.codecs import MAGIC
+from core.storage import Storage
+
+def test_metadata_shares_the_storage_codec_and_blob_store(tmp_path):
+    storage = Storage(str(tmp_path), codec="binary")
+
+    async def run():
+        async with AsyncStorage(storage=storage) as db:
+            await db.save_metadata("photo.jpg", {"tags": ["cat"]})
+            return await db.load_metadata("photo.jpg")
+
+    assert asyncio.run(run()) == {"tags": ["cat"]}
+    with open(os.path.join(str(tmp_path), "multimedia_metadata", "photo.jpg.json"), 'rb') as f:
+        assert f.read().startswith(MAGIC)
+    assert AsyncStorage(storage=storage).metadata_manager.blobs is storage.blobs
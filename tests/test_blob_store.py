@@ -0,0 +1,32 @@
+import io
+import os
+from core.blob_store import BlobStore
+from core.metadata import MetadataManager
+from core.storage import Storage
+
+def test_identical_content_is_stored_once_and_released_with_its_last_reference(tmp_path):
+    blobs = BlobStore(str(tmp_path), chunk_size=4)
+    digest = blobs.put(b"same bytes", name="a.jpg")
+    assert blobs.put(io.BytesIO(b"same bytes"), name="b.jpg") == digest
+    assert os.listdir(os.path.join(str(tmp_path), "tmp")) == []
+    assert blobs.refs(digest) == ["name:a.jpg", "name:b.jpg"]
+    assert blobs.add_ref(digest, "metadata:a.jpg") == 3 and blobs.add_ref(digest, "metadata:a.jpg") == 3
+    assert bytes(blobs.read_range(digest, 5, 3)) == b"byt"
+    assert b"".join(blobs.iter_chunks(digest, 2, 9)) == b"me byte"
+    assert blobs.unlink("a.jpg") and not blobs.unlink("a.jpg")
+    assert blobs.resolve("a.jpg") is None and blobs.release(digest, "metadata:a.jpg") == 1
+    blobs.link("b.jpg", blobs.put(b"other"))  # Relinking drops the name's reference on the old blob
+    assert not blobs.exists(digest) and blobs.refs(digest) == []
+    assert blobs.read(blobs.resolve("b.jpg")) == b"other"
+
+def test_metadata_keeps_a_multimedia_file_alive(tmp_path):
+    storage = Storage(str(tmp_path))
+    digest = storage.save_multimedia_file("clips/a.mp4", b"frames")
+    assert storage.save_multimedia_file("clips/copy.mp4", b"frames") == digest
+    metadata = MetadataManager(os.path.join(str(tmp_path), "multimedia_metadata"), storage.blobs)
+    metadata.save_metadata("a.mp4", {"blob": digest})
+    storage.delete_multimedia_file("clips/a.mp4")
+    storage.delete_multimedia_file("clips/copy.mp4")
+    assert storage.blobs.read(digest) == b"frames"
+    metadata.delete_metadata("a.mp4")
+    assert not storage.blobs.exists(digest)
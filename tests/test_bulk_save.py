@@ -0,0 +1,26 @@
+import os
+import pytest
+import core.storage
+from core.storage import Storage
+
+def test_embedding_count_is_checked_before_writing(tmp_path):
+    storage = Storage(str(tmp_path))
+    records = [(f"r{i}.json", {"i": i}) for i in range(3)]
+    with pytest.raises(ValueError):
+        storage.bulk_save("document", records, embeddings=[[1.0, 0.0]] * 2, batch_size=1)
+    assert not os.path.exists(os.path.join(str(tmp_path), "unstructured", "document", "r0.json"))
+
+def test_checkpoint_fsyncs_the_files_writes_touched(tmp_path, monkeypatch):
+    storage = Storage(str(tmp_path))
+    storage.save_data("document", {"title": "a"}, "a.json")
+    storage.bulk_save("document", [("b.json", {"title": "b"})])
+    synced = []
+    monkeypatch.setattr(core.storage, "_fsync_files", lambda paths: synced.extend(paths))
+    storage.checkpoint()
+    document_dir = os.path.join(str(tmp_path), "unstructured", "document")
+    for path in (os.path.join(document_dir, "a.json"), os.path.join(document_dir, "b.json"), document_dir,
+                 storage.index.journal_path, storage.versions.path):
+        assert path in synced
+    synced.clear()
+    storage.checkpoint()
+    assert os.path.join(document_dir, "a.json") not in synced  # Already durable
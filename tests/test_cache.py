@@ -0,0 +1,39 @@
+import json
+import os
+import pytest
+from core.cache import RecordCache, record_cache
+from core.storage import Storage
+
+@pytest.mark.parametrize("backend", ["files", "segments"])
+def test_loads_are_cached_until_the_record_is_rewritten(tmp_path, backend):
+    storage = Storage(str(tmp_path), backend=backend)
+    storage.save_data("document", {"title": "first"}, "a.json")
+    record_cache.clear()
+    assert storage.load_data("document", "a.json") == {"title": "first"}
+    loaded = storage.load_data("document", "a.json")
+    assert record_cache.stats()["hits"] == 1
+    loaded["title"] = "changed by a caller"  # Callers get their own copy
+    assert storage.load_data("document", "a.json") == {"title": "first"}
+    storage.save_data("document", {"title": "second"}, "a.json")
+    assert storage.load_data("document", "a.json") == {"title": "second"}
+
+def test_a_file_changed_behind_the_cache_is_reparsed(tmp_path):
+    storage = Storage(str(tmp_path))
+    storage.save_data("document", {"title": "first"}, "a.json")
+    assert storage.load_data("document", "a.json") == {"title": "first"}
+    filepath = os.path.join(str(tmp_path), "unstructured", "document", "a.json")
+    with open(filepath, 'w') as f:
+        json.dump({"title": "edited elsewhere"}, f)
+    assert storage.load_data("document", "a.json") == {"title": "edited elsewhere"}
+
+def test_least_recently_used_records_are_evicted_within_the_budget():
+    cache = RecordCache(max_bytes=10)
+    cache.put("a", 1, 4, "A")
+    cache.put("b", 1, 4, "B")
+    assert cache.get("a", 1, 4, lambda: "reloaded") == "A"  # Now the most recent
+    cache.put("c", 1, 4, "C")
+    assert list(cache.entries) == ["a", "c"] and cache.stats()["evictions"] == 1
+    cache.put("huge", 1, 11, "H")
+    assert "huge" not in cache.entries and cache.bytes == 8
+    cache.invalidate("a")
+    assert cache.get("a", 1, 4, lambda: "reloaded") == "reloaded"
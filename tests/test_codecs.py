@@ -0,0 +1,41 @@
+import json
+import math
+import os
+from core.codecs import CODECS, decode_record
+from core.storage import Storage
+
+def test_json_codec_round_trips_non_finite_floats():
+    record = {"nan": float("nan"), "values": [float("inf"), -float("inf"), 1.5]}
+    decoded = decode_record(CODECS["json"].encode(record))
+    assert math.isnan(decoded["nan"])
+    assert decoded["values"] == [float("inf"), -float("inf"), 1.5]
+
+def test_json_codec_round_trips_integers_beyond_64_bits():
+    record = {"big": 2 ** 70, "negative": -2 ** 65, "small": 7}
+    decoded = decode_record(CODECS["json"].encode(record))
+    assert decoded == record
+    assert isinstance(decoded["big"], int)
+
+def test_pretty_json_written_before_codecs_still_loads(tmp_path):
+    storage = Storage(str(tmp_path))
+    storage.save_data("document", {"title": "first"}, "first.json")
+    # A record written with json.dump, as Storage did before codecs existed
+    with open(os.path.join(str(tmp_path), "unstructured", "document", "old.json"), 'w') as f:
+        json.dump({"title": "old", "score": float("nan")}, f, indent=4)
+    assert math.isnan(storage.load_data("document", "old.json")["score"])
+    storage.save_data("document", {"title": "second"}, "second.json")
+    assert Storage(str(tmp_path)).load_data("document", "second.json") == {"title": "second"}
+
+def test_json_codec_keeps_null_apart_from_nan():
+    record = {"missing": None, "nan": float("nan"), "large": 2 ** 60}
+    decoded = decode_record(CODECS["json"].encode(record))
+    assert decoded["missing"] is None and math.isnan(decoded["nan"]) and decoded["large"] == 2 ** 60
+    assert decode_record(CODECS["json"].encode({"missing": None})) == {"missing": None}
+
+def test_binary_codec_logs_and_replays_bytes(tmp_path):
+    record = {"name": "thumbnail", "content": b"\x00\xffpng"}
+    storage = Storage(str(tmp_path), codec="binary")
+    storage.save_data("document", record, "thumb.json")
+    assert storage.load_data("document", "thumb.json") == record
+    entries = list(storage.wal.replay())
+    assert entries[-1]["data"] == record  # The write-ahead log holds the bytes too
@@ -0,0 +1,18 @@
+import os
+from core.database import open_database
+
+def test_opening_and_reading_an_empty_directory_writes_nothing(tmp_path):
+    path = os.path.join(str(tmp_path), "db")
+    with open_database(path, vector_db_enabled=True) as db:
+        assert "storage" not in db.__dict__  # Subsystems are constructed on first use
+        assert db.query.search(["anything"]) == []
+        assert db.metadata.search(all_tags=["cat"]) == []
+        assert list(db.planner.execute("SELECT * FROM document")) == []
+    assert not os.path.exists(path)
+
+def test_the_first_write_creates_the_directory(tmp_path):
+    path = os.path.join(str(tmp_path), "db")
+    with open_database(path) as db:
+        db.storage.save_data("document", {"title": "a"}, "a.json")
+    with open_database(path) as db:
+        assert db.storage.load_data("document", "a.json") == {"title": "a"}
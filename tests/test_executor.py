@@ -0,0 +1,25 @@
+import json
+import os
+from core.cache import record_cache
+from core.executor import ScanExecutor
+
+def test_parallel_scan_matches_the_serial_scan_in_input_order(tmp_path):
+    filepaths = []
+    for i in range(40):
+        filepath = os.path.join(str(tmp_path), f"r{i}.json")
+        with open(filepath, 'w') as f:
+            json.dump({"title": "match me" if i % 3 == 0 else "other"}, f)
+        filepaths.append(filepath)
+    filepaths.append(os.path.join(str(tmp_path), "missing.json"))
+    record_cache.clear()
+    record_cache.load(filepaths[0], lambda path: {"title": "cached copy"})  # Served in-process
+    executor = ScanExecutor(max_workers=2, chunk_size=7, serial_threshold=4)
+    try:
+        parallel = executor.match(filepaths, ["MATCH"])
+        assert executor._processes is not None  # The uncached files went to the pool
+    finally:
+        executor.shutdown()
+    serial = ScanExecutor(max_workers=1).match(filepaths, ["MATCH"])
+    record_cache.clear()
+    assert parallel == serial
+    assert serial == [False] + [i % 3 == 0 for i in range(1, 40)] + [False]
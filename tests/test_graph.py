@@ -0,0 +1,55 @@
+import pytest
+from core.graph import GraphIndex
+
+def graph(edges, labels=None):
+    nodes = sorted({node for edge in edges for node in edge[:2]})
+    return {"nodes": [{"id": node, "label": (labels or {}).get(node)} for node in nodes],
+            "edges": [{"source": source, "target": target, "relation": relation} for source, target, relation in edges]}
+
+def test_bfs_and_shortest_path(tmp_path):
+    index = GraphIndex(str(tmp_path))
+    index.add("a.json", graph([("a", "b", "knows"), ("b", "c", "knows"), ("c", "d", "works_with")]))
+    index.add("b.json", graph([("a", "e", "knows"), ("e", "d", "knows")]))
+    assert index.bfs("a") == {"a": 0, "b": 1, "e": 1, "c": 2, "d": 2}
+    assert index.bfs("a", max_depth=1) == {"a": 0, "b": 1, "e": 1}
+    assert len(index.shortest_path("a", "d")) == 3
+    assert index.shortest_path("a", "d", relations="knows") == ["a", "e", "d"]
+    assert index.shortest_path("d", "a") is None
+    assert index.shortest_path("d", "a", direction="both") == ["d", "e", "a"]
+
+def test_traversal_after_writes_sees_the_overlay_and_survives_a_save(tmp_path):
+    index = GraphIndex(str(tmp_path))
+    index.add("a.json", graph([("a", "b", "knows"), ("b", "c", "knows")], {"a": "person"}))
+    index.save()
+    assert index.bfs("a") == {"a": 0, "b": 1, "c": 2}
+    index.add("a.json", graph([("a", "x", "knows")], {"a": "robot"}))  # Replaces the record's edges
+    index.add("c.json", graph([("x", "y", "knows")]))
+    assert not index._dirty and index._overlay_out  # Applied without rebuilding the CSR arrays
+    assert index.bfs("a") == {"a": 0, "x": 1, "y": 2}
+    assert "b" not in index and index.label("a") == "robot"
+    index.remove("c.json")
+    assert "y" not in index and index.neighbors("a") == ["x"]
+    assert len(index) == 2
+    index.save()
+    reopened = GraphIndex(str(tmp_path))
+    assert reopened.bfs("a") == {"a": 0, "x": 1} and reopened.label("a") == "robot"
+
+def test_another_process_writes_are_replayed_into_the_overlay(tmp_path):
+    writer = GraphIndex(str(tmp_path))
+    writer.add("a.json", graph([("a", "b", "knows")]))
+    writer.save()
+    reader = GraphIndex(str(tmp_path))
+    assert reader.bfs("a") == {"a": 0, "b": 1}
+    writer.add("b.json", graph([("b", "c", "knows")]))
+    reader.refresh()
+    assert reader.edges("c", direction="in") == [("b", "knows", "c")]
+    assert reader.shortest_path("a", "c") == ["a", "b", "c"]
+    with pytest.raises(KeyError):
+        reader.bfs("missing")
+
+def test_save_keeps_entries_another_instance_journaled(tmp_path):
+    first, second = GraphIndex(str(tmp_path)), GraphIndex(str(tmp_path))
+    first.add("a.json", graph([("a", "b", "knows")]))
+    second.add("b.json", graph([("b", "c", "knows")]))
+    first.save()
+    assert GraphIndex(str(tmp_path)).bfs("a") == {"a": 0, "b": 1, "c": 2}
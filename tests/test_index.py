@@ -0,0 +1,27 @@
+from core.index import InvertedIndex
+
+def test_candidates_match_substrings_of_terms(tmp_path):
+    index = InvertedIndex(str(tmp_path))
+    index.add("structured/a.json", {"name": "Alexandra", "city": "Paris"})
+    index.add("structured/b.json", {"name": "Alex", "zip": 75011})
+    index.add("unstructured/document/c.json", {"text": "paradox"})
+    assert index.candidates(["alex"]) == ["structured/a.json", "structured/b.json"]
+    assert index.candidates(["par"]) == ["structured/a.json", "unstructured/document/c.json"]
+    assert index.candidates(["x"], prefix="structured/") == ["structured/a.json", "structured/b.json"]
+    assert index.candidates(["750"]) == ["structured/b.json"]
+    assert index.candidates(["alex paris"]) == ["structured/a.json"]
+    index.remove("structured/a.json")
+    index.add("structured/b.json", {"name": "Bo"})
+    assert index.candidates(["alex"]) == [] and index.candidates(["b"]) == ["structured/b.json"]
+    assert index.candidates(["?"]) is None
+
+def test_save_keeps_entries_another_instance_journaled(tmp_path):
+    first, second = InvertedIndex(str(tmp_path)), InvertedIndex(str(tmp_path))
+    first.add("structured/a.json", {"v": "apple"})
+    second.add("structured/b.json", {"v": "banana"})
+    first.add("structured/c.json", {"v": "cherry"})
+    first.save()
+    reopened = InvertedIndex(str(tmp_path))
+    assert reopened.keys() == ["structured/a.json", "structured/b.json", "structured/c.json"]
+    second.refresh()
+    assert second.candidates(["cherry"]) == ["structured/c.json"]
@@ -0,0 +1,34 @@
+import time
+import pytest
+from core.kv_store import KeyValueStore
+
+def test_get_put_and_reopen(tmp_path):
+    store = KeyValueStore(str(tmp_path))
+    store.put("session:1", {"user": "ann", "roles": ["admin"], "token": b"\x00\x01"})
+    store.put_many([("counter", 2 ** 70), ("ratio", 0.5)])
+    store.put("counter", 3)
+    assert store.delete("ratio") and not store.delete("ratio")
+    assert store.get("session:1") == {"user": "ann", "roles": ["admin"], "token": b"\x00\x01"}
+    assert store.get("missing", "default") == "default"
+    assert store.multi_get(["counter", "ratio", "session:1"]).keys() == {"counter", "session:1"}
+    store.close()
+    reopened = KeyValueStore(str(tmp_path))
+    assert reopened.get("counter") == 3 and reopened.keys("session:") == ["session:1"]
+    reopened.close()
+
+def test_expired_entries_read_as_missing_and_are_purged(tmp_path, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(time, "time", lambda: now[0])
+    store = KeyValueStore(str(tmp_path))
+    store.put("short", "a", ttl=10)
+    store.put("forever", "b")
+    assert store.ttl("short") == 10 and store.ttl("forever") is None
+    now[0] += 11
+    assert store.get("short") is None and "short" not in store
+    with pytest.raises(KeyError):
+        store.ttl("short")
+    assert store.keys() == ["forever"] and len(store) == 2
+    assert store.purge_expired() == 1 and len(store) == 1
+    store.put("short", "again", ttl=10)  # An expired key can be written again
+    assert store.get("short") == "again"
+    store.close()
@@ -0,0 +1,33 @@
+import os
+from core.metadata import MetadataManager
+
+def manager(tmp_path):
+    return MetadataManager(os.path.join(str(tmp_path), "multimedia_metadata"))
+
+def test_tag_and_text_search_with_facets(tmp_path):
+    metadata = manager(tmp_path)
+    metadata.save_metadata("cat.jpg", {"tags": ["animal", "cat"], "caption": "A sleeping cat"})
+    metadata.save_metadata("dog.jpg", {"tags": ["animal", "dog"], "caption": "A running dog"})
+    metadata.save_metadata("car.jpg", {"tags": ["vehicle"], "caption": "A red car, sleeping"})
+    assert metadata.search(all_tags=["animal"]) == ["cat.jpg", "dog.jpg"]
+    assert metadata.search(any_tags=["cat", "vehicle"]) == ["cat.jpg", "car.jpg"]
+    assert metadata.search(all_tags=["animal"], text="sleeping") == ["cat.jpg"]
+    assert metadata.search(all_tags=["missing"]) == []
+    assert metadata.search(limit=2) == ["cat.jpg", "dog.jpg"]
+    assert metadata.facets() == {"animal": 2, "cat": 1, "dog": 1, "vehicle": 1}
+    assert list(metadata.facets(text="sleeping", top=2)) == ["animal", "cat"]  # Ties ranked by tag
+
+def test_delete_and_retag_update_the_bitmaps_across_reopen(tmp_path):
+    metadata = manager(tmp_path)
+    for i in range(100):  # Spans several bitmap words
+        metadata.save_metadata(f"a{i}.png", {"tags": ["even" if i % 2 == 0 else "odd", f"n{i % 3}"]})
+    metadata.delete_metadata("a0.png")
+    metadata.save_metadata("a2.png", {"tags": ["odd"]})
+    expected = [f"a{i}.png" for i in range(100) if i % 2 == 0 and i % 3 == 0 and i > 0]
+    assert metadata.search(all_tags=["even", "n0"]) == expected
+    reopened = manager(tmp_path)
+    assert reopened.load_metadata("a0.png") is None
+    assert reopened.search(all_tags=["even", "n0"]) == expected
+    assert reopened.facets()["even"] == 48 and reopened.facets()["odd"] == 51
+    reopened.save_metadata("a0.png", {"tags": ["even"]})  # Reuses the deleted asset's row
+    assert reopened.search(all_tags=["even"])[0] == "a0.png"
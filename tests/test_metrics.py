@@ -0,0 +1,37 @@
+from core.metrics import MetricsRegistry, metrics
+from core.storage import Storage
+
+def test_enabled_sink_records_operations_and_exports_them(tmp_path):
+    storage = Storage(str(tmp_path))
+    registry = metrics.enable()
+    try:
+        storage.save_data("document", {"title": "a"}, "a.json")
+        storage.load_data("document", "a.json")
+    finally:
+        metrics.disable()
+    storage.save_data("document", {"title": "b"}, "b.json")  # Not recorded once disabled
+    histograms = registry.snapshot()["histograms"]
+    assert histograms["storage.save_data{model=document}"]["count"] == 1
+    assert histograms["storage.load_data{model=document}"]["count"] == 1
+    text = registry.prometheus()
+    assert "# TYPE aidb_storage_save_data_seconds histogram" in text
+    assert 'aidb_storage_save_data_seconds_bucket{model="document",le="+Inf"} 1' in text
+
+def test_histogram_buckets_are_cumulative():
+    registry = MetricsRegistry(buckets=(0.1, 1.0))
+    for seconds in (0.05, 0.5, 2.0):
+        registry.observe("op", seconds)
+    registry.increment("hits", 2, {"kind": "x"})
+    snapshot = registry.snapshot()
+    assert snapshot["histograms"]["op"]["buckets"] == {0.1: 1, 1.0: 2, float("inf"): 3}
+    assert snapshot["counters"] == {"hits{kind=x}": 2}
+
+def test_trace_collects_the_block_without_a_sink(tmp_path):
+    storage = Storage(str(tmp_path))
+    storage.save_data("document", {"title": "a"}, "a.json")
+    assert metrics.start() is None
+    with metrics.trace() as trace:
+        storage.load_data("document", "a.json")
+    report = trace.report()
+    assert report["timings"]["storage.load_data"]["calls"] == 1 and report["seconds"] > 0
+    assert trace.format().startswith("Execution time:")
@@ -0,0 +1,32 @@
+import json
+import os
+import pytest
+from core.storage import Storage
+
+def write_legacy(base_path, records):
+    os.makedirs(os.path.join(base_path, "unstructured"), exist_ok=True)
+    for filename, data in records.items():
+        with open(os.path.join(base_path, "unstructured", filename), 'w') as f:
+            json.dump(data, f)
+
+def test_migration_moves_records_into_their_model_namespaces(tmp_path):
+    base_path = str(tmp_path)
+    write_legacy(base_path, {"g.json": {"nodes": [{"id": "a"}], "edges": []},
+                             "d.json": {"title": "doc", "pages": 3},
+                             "kv.json": {"color": "blue"}})
+    storage = Storage(base_path)
+    moved = storage.migrate_namespaces(overrides={"kv.json": "keyvalue"})
+    assert moved == {"d.json": "document", "g.json": "graph", "kv.json": "keyvalue"}
+    assert storage.load_data("keyvalue", "kv.json") == {"color": "blue"}
+    assert storage.load_data("document", "d.json")["pages"] == 3
+    assert "a" in storage.open_graph()
+    assert not [name for name in os.listdir(os.path.join(base_path, "unstructured")) if name.endswith(".json")]
+
+def test_ambiguous_records_need_an_override(tmp_path):
+    base_path = str(tmp_path)
+    write_legacy(base_path, {"d.json": {"title": "doc", "pages": 3}, "flat.json": {"name": "only strings"}})
+    storage = Storage(base_path)
+    with pytest.raises(ValueError, match="flat.json"):
+        storage.migrate_namespaces()
+    assert os.path.exists(os.path.join(base_path, "unstructured", "d.json"))  # Nothing was moved
+    assert storage.migrate_namespaces({"flat.json": "document"}) == {"d.json": "document", "flat.json": "document"}
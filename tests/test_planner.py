@@ -0,0 +1,41 @@
+import pytest
+from core.metrics import metrics
+from core.planner import QueryPlanner, parse_select
+from core.storage import Storage
+
+def test_parse_select():
+    statement = parse_select("SELECT name, age FROM relational WHERE age >= 30 AND city IN ('Paris', 'Rome') LIMIT 5;")
+    assert statement.table == "relational" and statement.columns == ["name", "age"]
+    assert statement.predicates == [("age", ">=", 30), ("city", "in", ["Paris", "Rome"])]
+    assert statement.limit == 5
+    assert parse_select("select * from document where title like 'a%'").predicates == [("title", "like", "a%")]
+    for query in ["SELECT FROM document", "SELECT * FROM nowhere", "SELECT * FROM document WHERE a ~ 1",
+                  "SELECT * FROM document LIMIT -1", "SELECT * FROM document extra"]:
+        with pytest.raises(ValueError):
+            parse_select(query)
+
+@pytest.fixture
+def planner(tmp_path):
+    storage = Storage(str(tmp_path))
+    storage.save_data("relational", [["name", "age", "city"], ["Ann", "24", "Paris"], ["Bob", "35", "Rome"],
+                                     ["Cy", "41", "Paris"]], "people.csv")
+    for i in range(5):
+        storage.save_data("document", {"title": f"note {i}", "author": "ann" if i % 2 else "bob"}, f"n{i}.json")
+    return QueryPlanner(storage)
+
+def test_execute_filters_and_projects(planner):
+    rows = list(planner.execute("SELECT name FROM relational WHERE city = 'Paris' AND age > 30"))
+    assert rows == [{"name": "Cy"}]
+    assert [row["title"] for row in planner.execute("SELECT * FROM document WHERE title LIKE '%3'")] == ["note 3"]
+
+def test_equality_uses_the_index(planner):
+    plan = planner.plan("SELECT title FROM document WHERE author = 'ann'")
+    assert plan.access == "index" and plan.keys == ["unstructured/document/n1.json", "unstructured/document/n3.json"]
+    assert [row["title"] for row in planner.execute(plan)] == ["note 1", "note 3"]
+
+def test_limit_stops_reading_records(planner):
+    with metrics.trace() as trace:
+        rows = list(planner.execute("SELECT title FROM document LIMIT 2"))
+    assert len(rows) == 2
+    assert trace.counters["planner.records_scanned"] == 2
+    assert list(planner.execute("SELECT title FROM document LIMIT 0")) == []
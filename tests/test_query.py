@@ -0,0 +1,34 @@
+import pytest
+from core.query import Query
+from core.storage import Storage
+
+def populated(tmp_path):
+    storage = Storage(str(tmp_path))
+    for i in range(7):
+        storage.save_data("document", {"title": f"report {i}", "topic": "sales" if i % 2 == 0 else "hr"},
+                          f"doc{i}.json")
+    storage.save_data("keyvalue", {"note": "sales target"}, "kv0.json")
+    return Query(storage=storage)
+
+def test_pages_follow_each_other_without_gaps_or_repeats(tmp_path):
+    query = populated(tmp_path)
+    pages, cursor = [], None
+    while True:
+        page = query.search_page(["sales"], cursor=cursor, page_size=2)
+        pages.append([match["filename"] for match in page["results"]])
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+    assert pages == [["doc0.json", "doc2.json"], ["doc4.json", "doc6.json"], ["kv0.json"]]
+    assert [match["filename"] for match in query.search(["sales"])] == sum(pages, [])
+
+def test_iter_search_resumes_after_a_cursor_and_loads_records(tmp_path):
+    query = populated(tmp_path)
+    first = next(query.iter_search(["report"], "document"))
+    rest = list(query.iter_search(["report"], "document", load=True, cursor=first["cursor"], limit=2))
+    assert [(match["filename"], record["title"]) for match, record in rest] == \
+        [("doc1.json", "report 1"), ("doc2.json", "report 2")]
+    with pytest.raises(ValueError):
+        list(query.iter_search(["report"], "graph", cursor=first["cursor"]))
+    with pytest.raises(ValueError):
+        list(query.iter_search(["report"], cursor="no separator"))
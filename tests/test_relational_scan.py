@@ -0,0 +1,51 @@
+import os
+import pytest
+from core.columnar import ColumnarTable
+from core.data_model import RelationalModel
+
+ROWS = [["name", "age"], ["Ann", "24"], ["Bob", "25"], ["Cy", "26"]]
+
+@pytest.fixture(params=["t.csv", "t.col"])
+def table(request, tmp_path):
+    model = RelationalModel("relational")
+    filepath = str(tmp_path / request.param)
+    model.save(ROWS, filepath)
+    return model, filepath
+
+def names(rows):
+    return [row[0] for row in rows[1:]]
+
+def test_fractional_literal_is_not_truncated_for_less_than(table):
+    model, filepath = table
+    assert names(model.scan(filepath, where=[("age", "<", 25.5)])) == ["Ann", "Bob"]
+    assert names(model.scan(filepath, where=[("age", ">", "24.5")])) == ["Bob", "Cy"]
+
+def test_fractional_literal_never_equals_an_integer(table):
+    model, filepath = table
+    assert names(model.scan(filepath, where=[("age", "==", 25.5)])) == []
+    assert names(model.scan(filepath, where=[("age", "!=", 25.5)])) == ["Ann", "Bob", "Cy"]
+    assert names(model.scan(filepath, where=[("age", "==", 25.0)])) == ["Bob"]
+
+def test_numeric_literals_compare_numbers_in_a_string_column(table):
+    model, filepath = table
+    rows = [["code"], ["9"], ["10"], ["x"]]
+    model.save(rows, filepath)
+    assert names(model.scan(filepath, where=[("code", "<", 10)])) == ["9"]  # Not "10" < "9" as text
+    assert names(model.scan(filepath, where=[("code", "!=", 9)])) == ["10", "x"]
+    assert names(model.scan(filepath, where=[("code", "in", [10, "x"])])) == ["10", "x"]
+    assert names(model.scan(filepath, where=[("code", "<", "9")])) == ["10"]
+
+def test_empty_rows_give_an_empty_table(table):
+    model, filepath = table
+    model.save([], filepath)
+    assert model.load(filepath) == []
+
+def test_rewrite_keeps_the_previous_generation_for_open_readers(tmp_path):
+    filepath = str(tmp_path / "t.col")
+    ColumnarTable.write(filepath, ROWS)
+    reader = ColumnarTable(filepath)
+    ColumnarTable.write(filepath, [["name", "age"], ["Dee", "30"]])
+    assert reader.to_rows() == [["name", "age"], ["Ann", 24], ["Bob", 25], ["Cy", 26]]
+    ColumnarTable.write(filepath, [["name"], ["Eve"]])
+    assert ColumnarTable(filepath).to_rows() == [["name"], ["Eve"]]
+    assert len([name for name in os.listdir(filepath) if name.endswith(".npy")]) == 3  # Two generations
@@ -0,0 +1,75 @@
+import os
+import pytest
+from core.segment_store import SegmentStore
+
+def test_records_survive_reopen(tmp_path):
+    store = SegmentStore(str(tmp_path), segment_size=256, background_compaction=False)
+    for i in range(20):
+        store.put(f"k{i}", f"v{i}".encode())
+    store.put("k3", b"new")
+    store.delete("k4")
+    store.close()
+    reopened = SegmentStore(str(tmp_path))
+    assert reopened.get("k3") == b"new"
+    assert "k4" not in reopened and reopened.get("k19") == b"v19"
+    assert len(reopened) == 19
+
+def test_torn_tail_is_cut_by_the_writer(tmp_path):
+    store = SegmentStore(str(tmp_path))
+    store.put("a", b"1")
+    store.close()
+    segment = os.path.join(str(tmp_path), "segment-000001.log")
+    with open(segment, 'ab') as f:
+        f.write(b"\x00\x01torn")
+    reopened = SegmentStore(str(tmp_path))
+    reopened.put("b", b"2")
+    reopened.close()
+    again = SegmentStore(str(tmp_path))
+    assert again.get("a") == b"1" and again.get("b") == b"2"
+
+def test_compaction_keeps_live_records_and_newer_writes(tmp_path):
+    store = SegmentStore(str(tmp_path), segment_size=200, background_compaction=False, compaction_batch=2)
+    for round_number in range(3):
+        for i in range(10):
+            store.put(f"k{i}", f"{round_number}-{i}".encode())
+    store.delete("k0")
+    segments = len(os.listdir(str(tmp_path)))
+    assert store.compact(force=True) > 0
+    assert len(os.listdir(str(tmp_path))) < segments
+    assert "k0" not in store and store.get("k9") == b"2-9"
+    store.close()
+    reopened = SegmentStore(str(tmp_path))
+    assert "k0" not in reopened
+    assert [reopened.get(f"k{i}") for i in range(1, 10)] == [f"2-{i}".encode() for i in range(1, 10)]
+
+def test_compaction_does_not_restore_a_value_overwritten_during_the_copy(tmp_path):
+    store = SegmentStore(str(tmp_path), segment_size=64, background_compaction=False)
+    store.put("a", b"old")
+    store.put("b", b"x" * 64)  # Seals the first segment
+    original_pread = os.pread
+
+    def pread_then_overwrite(fd, length, offset):
+        value = original_pread(fd, length, offset)
+        if value == b"old":
+            store.put("a", b"new")  # A write landing while the segment is being copied
+        return value
+
+    os.pread = pread_then_overwrite
+    try:
+        store.compact(force=True)
+    finally:
+        os.pread = original_pread
+    assert store.get("a") == b"new"
+    store.close()
+    assert SegmentStore(str(tmp_path)).get("a") == b"new"
+
+def test_second_opener_is_read_only(tmp_path):
+    writer = SegmentStore(str(tmp_path))
+    writer.put("a", b"1")
+    writer.flush()
+    reader = SegmentStore(str(tmp_path))
+    assert reader.read_only and reader.get("a") == b"1"
+    with pytest.raises(OSError):
+        reader.put("b", b"2")
+    writer.close()
+    reader.close()
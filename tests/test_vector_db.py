@@ -0,0 +1,80 @@
+import tracemalloc
+import pytest
+import numpy as np
+from core.storage import Storage
+from vector_integration.ann_index import IVFFlatIndex, recall_latency_report
+from vector_integration.vector_db_interface import VectorDBInterface
+
+def test_batch_search_matches_single_search():
+    rng = np.random.default_rng(0)
+    db = VectorDBInterface(batch_memory_limit=64 * 1024)
+    db.add_embeddings([f"id{i}" for i in range(2000)], rng.random((2000, 8), dtype=np.float32))
+    queries = rng.random((50, 8), dtype=np.float32)
+    ids, scores = db.search_embeddings_batch(queries, top_k=5)
+    for query, row_ids, row_scores in zip(queries, ids, scores):
+        expected = db.search_embedding(query, top_k=5)
+        assert list(row_ids) == [match["data_id"] for match in expected]
+        assert np.allclose(row_scores, [match["similarity"] for match in expected], atol=1e-5)
+
+def test_batch_search_peak_memory_stays_within_limit():
+    rng = np.random.default_rng(1)
+    rows, limit = 20000, 1 << 20
+    db = VectorDBInterface(batch_memory_limit=limit)
+    db.add_embeddings([f"id{i}" for i in range(rows)], rng.random((rows, 16), dtype=np.float32))
+    queries = rng.random((300, 16), dtype=np.float32)
+    tracemalloc.start()
+    try:
+        db.search_embeddings_batch(queries, top_k=5)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    # Besides the chunk arrays, only per-row bookkeeping (ids, masks, norms) is allocated
+    assert peak <= limit + rows * 16
+
+def test_compression_keeps_only_codes_in_memory(tmp_path):
+    with pytest.raises(ValueError):
+        VectorDBInterface(compression="int8")
+    rng = np.random.default_rng(2)
+    vectors = rng.random((3000, 16), dtype=np.float32)
+    db = VectorDBInterface(path=str(tmp_path / "vectors"), compression="int8", rerank=20)
+    db.add_embeddings([f"id{i}" for i in range(len(vectors))], vectors)
+    assert db.search_embedding(vectors[7], top_k=1)[0]["data_id"] == "id7"
+    usage = db.memory_usage()
+    assert usage["vectors"] == 0 and 0 < usage["codes"] < vectors.nbytes / 2
+
+def test_filters_follow_appended_and_replaced_rows():
+    db = VectorDBInterface()
+    db.add_embedding("a", [1.0, 0.0], {"price": 10, "tags": ["cat", "dog"]})
+    db.add_embedding("b", [0.9, 0.1], {"price": 20, "tags": ["dog"]})
+    def ids(filters):
+        return sorted(match["data_id"] for match in db.search_embedding([1.0, 0.0], top_k=10, filters=filters))
+    assert ids({"tags": ("contains", "cat")}) == ["a"]
+    db.add_embedding("c", [0.8, 0.2], {"price": "n/a", "tags": ["cat"]})
+    assert ids({"tags": ("contains", "cat")}) == ["a", "c"]
+    assert ids({"price": ("in", [20, "n/a"])}) == ["b", "c"]
+    assert ids({"price": ("<", 15)}) == ["a"]
+    db.add_embedding("a", [1.0, 0.0], {"price": 30, "tags": ["bird"]})  # Replaces a's attributes
+    assert ids({"tags": ("contains", "cat")}) == ["c"]
+    assert ids({"price": ("!=", 20)}) == ["a", "c"]
+
+def test_only_declared_fields_become_attributes(tmp_path):
+    storage = Storage(str(tmp_path), vector_db_enabled=True, filterable_fields={"document": ["price"]})
+    storage.save_data("document", {"price": 5, "body": "long text"}, "a.json", embed_data=[1.0, 0.0])
+    assert storage.vector_db.get_attributes("a.json") == {"model": "document", "price": 5}
+
+def test_ivf_search_probes_lists_and_follows_writes():
+    rng = np.random.default_rng(5)
+    centers = rng.normal(size=(16, 8)).astype(np.float32)
+    vectors = centers[rng.integers(0, 16, 2000)] + rng.normal(scale=0.05, size=(2000, 8)).astype(np.float32)
+    db = VectorDBInterface(index=IVFFlatIndex(n_lists=16, min_train_size=500))
+    db.add_embeddings([f"id{i}" for i in range(len(vectors))], vectors)
+    query = vectors[3]
+    exact = [match["data_id"] for match in db.search_embedding(query, top_k=10, exact=True)]
+    assert [match["data_id"] for match in db.search_embedding(query, top_k=10, nprobe=16)] == exact
+    assert db.index.is_trained() and len(db.index.candidates(query, nprobe=1)) < len(vectors)  # Trained on first search
+    db.add_embedding("new", query * 1.01)
+    assert "new" in [match["data_id"] for match in db.search_embedding(query, top_k=3, nprobe=1)]
+    assert db.delete_embedding("new")
+    assert "new" not in [match["data_id"] for match in db.search_embedding(query, top_k=3, nprobe=1)]
+    report = recall_latency_report(db, vectors[:20], top_k=5, nprobes=(1, 16))
+    assert report[0]["exact"] and report[-1]["recall"] == 1.0
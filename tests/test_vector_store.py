@@ -0,0 +1,68 @@
+import os
+import numpy as np
+from vector_integration.vector_db_interface import VectorDBInterface
+
+def test_torn_append_is_ignored_and_cut_by_the_next_writer(tmp_path):
+    path = str(tmp_path / "vectors")
+    db = VectorDBInterface(path=path)
+    db.add_embedding("a", [1.0, 0.0, 0.0])
+    db.add_embedding("b", [0.0, 1.0, 0.0])
+    # A crash after the vector and norm appends but before the id line
+    with open(db.store.vectors_path, 'ab') as f:
+        f.write(np.array([0, 0, 1], dtype=np.float32).tobytes())
+    with open(db.store.norms_path, 'ab') as f:
+        f.write(np.array([1], dtype=np.float32).tobytes())
+
+    db = VectorDBInterface(path=path)
+    db.add_embedding("c", [0.0, 0.5, 0.5])
+    assert db.search_embedding([0.0, 0.5, 0.5], top_k=1)[0]["data_id"] == "c"
+    db = VectorDBInterface(path=path)
+    assert [match["data_id"] for match in db.search_embedding([1.0, 0.0, 0.0], top_k=3)][:1] == ["a"]
+    assert db.search_embedding([0.0, 0.5, 0.5], top_k=1)[0]["data_id"] == "c"
+
+def test_torn_id_line_is_cut_by_the_next_writer(tmp_path):
+    path = str(tmp_path / "vectors")
+    db = VectorDBInterface(path=path)
+    db.add_embedding("a", [1.0, 0.0])
+    with open(db.store.ids_path, 'a') as f:
+        f.write('{"id": "tor')
+    db = VectorDBInterface(path=path)
+    db.add_embedding("b", [0.0, 1.0])
+    db = VectorDBInterface(path=path)
+    assert db.search_embedding([0.0, 1.0], top_k=1)[0]["data_id"] == "b"
+
+def test_opening_leaves_a_live_writers_tail_alone(tmp_path):
+    path = str(tmp_path / "vectors")
+    writer = VectorDBInterface(path=path)
+    writer.add_embedding("a", [1.0, 0.0])
+    # The writer is between its vector and id appends
+    with open(writer.store.vectors_path, 'ab') as f:
+        f.write(np.array([0, 1], dtype=np.float32).tobytes())
+    size = os.path.getsize(writer.store.vectors_path)
+    reader = VectorDBInterface(path=path)
+    assert len(reader) == 1
+    assert os.path.getsize(writer.store.vectors_path) == size
+
+def test_writers_in_several_processes_share_a_store(tmp_path):
+    path = str(tmp_path / "vectors")
+    first, second = VectorDBInterface(path=path), VectorDBInterface(path=path)
+    first.add_embedding("a", [1.0, 0.0, 0.0])
+    second.add_embedding("b", [0.0, 1.0, 0.0], attributes={"kind": "b"})
+    first.add_embedding("c", [0.0, 0.0, 1.0])
+    second.delete_embedding("a")
+    first.refresh()
+    assert first.search_embedding([0.0, 1.0, 0.0], top_k=1)[0]["data_id"] == "b"
+    assert "a" not in first and first.get_attributes("b") == {"kind": "b"}
+    reopened = VectorDBInterface(path=path)
+    assert sorted(match["data_id"] for match in reopened.search_embedding([1.0, 1.0, 1.0], top_k=3)) == ["b", "c"]
+    assert reopened.get_embedding("c").tolist() == [0.0, 0.0, 1.0]
+
+def test_open_reads_no_ids_until_needed(tmp_path):
+    path = str(tmp_path / "vectors")
+    db = VectorDBInterface(path=path)
+    db.add_embeddings(["a", "b"], np.eye(2), [{"n": 1}, {"n": 2}])
+    reopened = VectorDBInterface(path=path)
+    assert reopened._id_index is None and reopened._attributes is None
+    assert reopened.search_embedding([0.0, 1.0], top_k=1)[0]["data_id"] == "b"
+    assert reopened._id_index is None
+    assert [match["data_id"] for match in reopened.search_embedding([0.0, 1.0], top_k=1, filters={"n": 1})] == ["a"]
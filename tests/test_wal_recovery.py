@@ -0,0 +1,67 @@
+import json
+import os
+import pytest
+from core.storage import Storage, _wal_entry
+from core.wal import WriteAheadLog
+
+def leave_log(base_path, entries):
+    """
+    Writes entries to a write-ahead log and abandons it, as a crashed process would.
+    """
+    log = WriteAheadLog(os.path.join(base_path, "wal", "crashed.log"))
+    log.sync(log.append_many(entries))
+    log.close()
+
+def test_invalid_filename_is_rejected_before_logging(tmp_path):
+    storage = Storage(str(tmp_path))
+    with pytest.raises(ValueError):
+        storage.save_data("document", {"a": 1}, "missing_dir/x.json")
+    assert storage.wal.size() == 0
+
+def test_failing_entry_is_quarantined_and_the_rest_replayed(tmp_path):
+    base_path = str(tmp_path)
+    leave_log(base_path, [_wal_entry("document", "missing_dir/x.json", {"a": 1}, None, 1),
+                          _wal_entry("document", "ok.json", {"a": 2}, None, 2)])
+    storage = Storage(base_path)
+    assert storage.load_data("document", "ok.json") == {"a": 2}
+    with open(os.path.join(base_path, "wal", "quarantine.jsonl")) as f:
+        quarantined = [json.loads(line) for line in f]
+    assert [item["entry"]["filename"] for item in quarantined] == ["missing_dir/x.json"]
+    assert not [name for name in os.listdir(os.path.join(base_path, "wal")) if name.endswith(".log")]
+    Storage(base_path)  # Opens again without replaying anything
+
+def test_replay_keeps_a_newer_write_from_another_process(tmp_path):
+    base_path = str(tmp_path)
+    other = Storage(base_path)  # Still open, so it does not replay the crashed log
+    other.save_data("document", {"v": 0}, "r.json")
+    # Logged by a process that crashed before applying it, then overwritten by a later write
+    stale = _wal_entry("document", "r.json", {"v": 1, "term": "stale"}, None, other.versions.next_sequence())
+    other.save_data("document", {"v": 2, "term": "fresh"}, "r.json")
+    leave_log(base_path, [stale])
+    storage = Storage(base_path)
+    assert storage.load_data("document", "r.json") == {"v": 2, "term": "fresh"}
+    assert storage.index.candidates(["fresh"]) == ["unstructured/document/r.json"]
+    assert storage.index.candidates(["stale"]) == []
+    other.close()
+    storage.close()
+
+def test_replay_applies_a_newer_logged_write_however_soon_it_followed(tmp_path):
+    base_path = str(tmp_path)
+    storage = Storage(base_path)
+    storage.save_data("document", {"v": 1}, "r.json")
+    leave_log(base_path, [_wal_entry("document", "r.json", {"v": 2}, None, storage.versions.next_sequence())])
+    storage.close()
+    assert Storage(base_path).load_data("document", "r.json") == {"v": 2}
+
+def test_replay_restores_the_embedding_of_a_write_cut_short(tmp_path):
+    base_path = str(tmp_path)
+    storage = Storage(base_path, vector_db_enabled=True)
+    entry = _wal_entry("document", "x.json", {"a": 1}, [1.0, 0.0, 0.0], storage.versions.next_sequence())
+    os.makedirs(os.path.join(base_path, "unstructured", "document"))
+    # The crash came after the record file was written but before its vector was added
+    storage.models["document"].save({"a": 1}, os.path.join(base_path, "unstructured", "document", "x.json"))
+    leave_log(base_path, [entry])
+    storage.close()
+    reopened = Storage(base_path, vector_db_enabled=True)
+    assert "x.json" in reopened.vector_db
+    assert reopened.load_data("document", "x.json") == {"a": 1}
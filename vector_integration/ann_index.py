@@ -0,0 +1,140 @@
+import time
+import numpy as np
+from typing import List, Dict, Optional, Sequence
+
+class IVFFlatIndex:
+    """
+    Approximate nearest-neighbour index using an inverted file (IVF-Flat).
+    Unit-normalised vectors are clustered with spherical k-means; a search only scores
+    the rows in the nprobe lists whose centroids are closest to the query.
+    """
+    def __init__(self, n_lists: Optional[int] = None, nprobe: int = 8, min_train_size: int = 1024,
+                 kmeans_iterations: int = 20, max_train_samples: int = 256, seed: int = 0):
+        self.n_lists = n_lists  # Defaults to sqrt(N) at training time
+        self.nprobe = nprobe
+        self.min_train_size = min_train_size
+        self.kmeans_iterations = kmeans_iterations
+        self.max_train_samples = max_train_samples  # Training rows sampled per list
+        self.seed = seed
+        self.centroids = None
+        self.lists = []  # list number -> rows assigned to it
+        self._row_list = {}  # row -> list number
+        self.trained_size = 0
+
+    def is_trained(self):
+        return self.centroids is not None
+
+    def needs_training(self, size):
+        """
+        Returns True once enough rows exist to train, or the store has outgrown the centroids.
+        """
+        if not self.is_trained():
+            return size >= self.min_train_size
+        return size >= 4 * self.trained_size
+
+    def train(self, vectors: np.ndarray, rows: Optional[Sequence[int]] = None):
+        """
+        Learns the coarse quantizer from the given vectors and assigns them to lists.
+        rows gives the store row of each vector and defaults to 0..N-1.
+        """
+        units = normalize_rows(vectors)
+        n_lists = self.n_lists or max(1, int(np.sqrt(units.shape[0])))
+        n_lists = min(n_lists, units.shape[0])
+        rng = np.random.default_rng(self.seed)
+
+        sample_size = min(units.shape[0], n_lists * self.max_train_samples)
+        sample = units[rng.choice(units.shape[0], sample_size, replace=False)]
+        centroids = sample[rng.choice(sample_size, n_lists, replace=False)].copy()
+        for _ in range(self.kmeans_iterations):
+            assignments = np.argmax(sample @ centroids.T, axis=1)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, assignments, sample)
+            empty = ~np.bincount(assignments, minlength=n_lists).astype(bool)
+            sums[empty] = sample[rng.choice(sample_size, int(empty.sum()))]  # Reseed empty lists
+            centroids = normalize_rows(sums)
+
+        self.centroids = centroids.astype(np.float32)
+        self.lists = [[] for _ in range(n_lists)]
+        self._row_list = {}
+        self.trained_size = units.shape[0]
+        self.add(np.arange(units.shape[0]) if rows is None else rows, units)
+
+    def add(self, rows: Sequence[int], vectors: np.ndarray):
+        """
+        Assigns rows to their nearest list, moving rows that were already indexed.
+        """
+        if not self.is_trained():
+            return
+        assignments = np.argmax(normalize_rows(vectors) @ self.centroids.T, axis=1)
+        for row, list_number in zip(np.asarray(rows).tolist(), assignments.tolist()):
+            previous = self._row_list.get(row)
+            if previous == list_number:
+                continue
+            if previous is not None:
+                self.lists[previous].remove(row)
+            self.lists[list_number].append(row)
+            self._row_list[row] = list_number
+
+    def remove(self, row: int):
+        """
+        Removes a row from its list.
+        """
+        previous = self._row_list.pop(row, None)
+        if previous is not None:
+            self.lists[previous].remove(row)
+
+    def candidates(self, query_vector: np.ndarray, nprobe: Optional[int] = None) -> np.ndarray:
+        """
+        Returns the rows in the nprobe lists closest to the query.
+        """
+        nprobe = min(nprobe or self.nprobe, len(self.lists))
+        centroid_scores = self.centroids @ normalize_rows(query_vector[np.newaxis, :])[0]
+        probes = np.argpartition(-centroid_scores, nprobe - 1)[:nprobe]
+        rows = [self.lists[list_number] for list_number in probes.tolist() if self.lists[list_number]]
+        if not rows:
+            return np.empty(0, dtype=np.int64)
+        return np.concatenate([np.asarray(list_rows, dtype=np.int64) for list_rows in rows])
+
+def normalize_rows(vectors):
+    """
+    Scales each row to unit length, leaving zero rows untouched.
+    """
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return np.divide(vectors, norms, out=np.zeros_like(vectors), where=norms > 0)
+
+def recall_latency_report(vector_db, queries: np.ndarray, top_k: int = 10,
+                          nprobes: Sequence[int] = (1, 2, 4, 8, 16, 32),
+                          settings: Optional[Sequence[Dict]] = None) -> List[Dict]:
+    """
+    Measures recall@top_k and latency of the approximate search against the exact path.
+    Each setting is a dict of search_embedding arguments (by default one per nprobe).
+    Returns one row per setting, starting with the exact baseline.
+    """
+    def run(**search_args):
+        latencies, results = [], []
+        for query in queries:
+            start = time.perf_counter()
+            matches = vector_db.search_embedding(query, top_k=top_k, **search_args)
+            latencies.append((time.perf_counter() - start) * 1000)
+            results.append({match["data_id"] for match in matches})
+        return results, np.array(latencies)
+
+    if settings is None:
+        settings = [{"nprobe": nprobe} for nprobe in nprobes]
+    exact_results, exact_latencies = run(exact=True)
+    report = [_report_row({"exact": True}, 1.0, exact_latencies)]
+    for search_args in settings:
+        results, latencies = run(**search_args)
+        hits = sum(len(found & expected) for found, expected in zip(results, exact_results))
+        expected_total = sum(len(expected) for expected in exact_results) or 1
+        report.append(_report_row(search_args, hits / expected_total, latencies))
+    return report
+
+def _report_row(search_args, recall, latencies):
+    return {
+        **search_args,
+        "recall": round(recall, 4),
+        "mean_ms": round(float(latencies.mean()), 3),
+        "p99_ms": round(float(np.percentile(latencies, 99)), 3),
+    }
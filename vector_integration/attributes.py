@@ -0,0 +1,247 @@
+import numbers
+import numpy as np
+from typing import Dict, Optional
+
+OPERATORS = {
+    "==": lambda column, value: column == value,
+    "!=": lambda column, value: column != value,
+    "<": lambda column, value: column < value,
+    "<=": lambda column, value: column <= value,
+    ">": lambda column, value: column > value,
+    ">=": lambda column, value: column >= value,
+}
+
+MISSING, UNCODED = -1, -2  # Codes of rows without a value, and with a list or unhashable value
+
+class AttributeTable:
+    """
+    Per-row filterable attributes stored alongside the embeddings.
+    Filters are dicts mapping an attribute name to a value (equality) or an
+    (operator, value) tuple, where operator is one of ==, !=, <, <=, >, >=, "in" or
+    "contains" (for list attributes such as tags), e.g.
+    {"model": "document", "price": ("<", 900)} or {"tags": ("contains", "cat")}.
+    Filters are evaluated column-at-a-time into a boolean row bitmap. Columns are built
+    on first use and then kept up to date as rows are added or replaced.
+    """
+    def __init__(self):
+        self.rows = []  # row -> attribute dict
+        self._columns = {}  # name -> AttributeColumn
+
+    def __len__(self):
+        return len(self.rows)
+
+    def append(self, attributes: Optional[Dict]):
+        self.rows.append(attributes or {})
+
+    def set(self, row: int, attributes: Optional[Dict]):
+        self.rows[row] = attributes or {}
+        for name, column in self._columns.items():
+            if row < column.size:
+                column.set(row, self.rows[row].get(name))
+
+    def column(self, name):
+        """
+        Returns the AttributeColumn of an attribute, covering every row.
+        """
+        column = self._columns.get(name)
+        if column is None:
+            column = self._columns[name] = AttributeColumn()
+        if column.size < len(self.rows):
+            column.extend([row.get(name) for row in self.rows[column.size:]])
+        return column
+
+    def evaluate(self, filters: Dict, rows: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Returns a boolean bitmap of the rows (all rows, or only the given ones) matching every filter.
+        """
+        size = len(self.rows) if rows is None else len(rows)
+        mask = np.ones(size, dtype=bool)
+        for name, condition in filters.items():
+            mask &= self.column(name).evaluate(condition, rows)
+            if not mask.any():
+                break
+        return mask
+
+    def estimate_selectivity(self, filters: Dict, rows: np.ndarray, sample_size: int = 1024, seed: int = 0) -> float:
+        """
+        Estimates the fraction of the given rows matching the filters from a random sample.
+        """
+        if len(rows) > sample_size:
+            rows = np.random.default_rng(seed).choice(rows, sample_size, replace=False)
+        if not len(rows):
+            return 0.0
+        return float(self.evaluate(filters, rows).mean())
+
+class AttributeColumn:
+    """
+    One attribute over all rows, grown in place: float64 (NaN when missing) while every
+    present value is numeric, otherwise an object array (None when missing). An object
+    column also codes each hashable value as an integer and maps each item of list
+    values to the rows holding it, so "==", "in" and "contains" are array operations.
+    """
+    def __init__(self):
+        self.values = np.empty(0, dtype=object)
+        self.size = 0
+        self.numeric = None  # Unknown until a value is present
+        self.codes = np.empty(0, dtype=np.int64)  # Object columns: value code per row, or MISSING / UNCODED
+        self.categories = {}  # Object columns: value -> code
+        self.members = {}  # Object columns: list item -> set of rows holding it
+        self.text = np.empty(0, dtype=bool)  # Object columns: True for rows holding a string
+
+    def array(self):
+        return self.values[:self.size]
+
+    def extend(self, values):
+        present = [value for value in values if value is not None]
+        if present:
+            numeric = all(_is_number(value) for value in present)
+            if self.numeric is None or (self.numeric and not numeric):
+                self._convert(numeric)
+        start, end = self.size, self.size + len(values)
+        self._reserve(end)
+        self.size = end
+        if self.numeric:
+            self.values[start:end] = [np.nan if value is None else value for value in values]
+            return
+        self.codes[start:end] = MISSING
+        self.text[start:end] = False
+        for row, value in enumerate(values, start):
+            self.values[row] = value
+            self._encode(row, value)
+
+    def set(self, row, value):
+        if value is not None and (self.numeric is None or (self.numeric and not _is_number(value))):
+            self._convert(_is_number(value))
+        if self.numeric:
+            self.values[row] = np.nan if value is None else value
+            return
+        old = self.values[row]
+        if isinstance(old, (list, tuple, set)):
+            for item in old:
+                self.members.get(item, set()).discard(row)
+        self.values[row] = value
+        self.codes[row], self.text[row] = MISSING, False
+        self._encode(row, value)
+
+    def evaluate(self, condition, rows=None):
+        """
+        Evaluates one filter condition, returning a boolean array over all rows or the given ones.
+        """
+        operator, value = condition if isinstance(condition, tuple) else ("==", condition)
+        if operator == "contains":
+            return self._contains(value, rows)
+        if operator == "in":
+            return self._in(list(value), rows)
+        if operator not in OPERATORS:
+            raise ValueError(f"Unsupported filter operator: {operator}")
+        column = self.array() if rows is None else self.values[rows]
+        if self.numeric:
+            if not isinstance(value, numbers.Number):
+                return np.full(len(column), operator == "!=", dtype=bool)  # Numeric column vs non-numeric value
+            with np.errstate(invalid="ignore"):
+                return OPERATORS[operator](column, value)
+        if operator in ("==", "!=") and _hashable(value):
+            codes = self.codes[:self.size] if rows is None else self.codes[rows]
+            matches = codes == self.categories[value] if value in self.categories else np.zeros(len(codes), dtype=bool)
+            return matches if operator == "==" else ~matches & (codes != MISSING)
+
+        def compare(item):
+            try:
+                return item is not None and bool(OPERATORS[operator](item, value))
+            except TypeError:
+                return False  # Incomparable types never match
+        return np.fromiter((compare(item) for item in column), dtype=bool, count=len(column))
+
+    def _in(self, allowed, rows):
+        if self.numeric:
+            column = self.array() if rows is None else self.values[rows]
+            return np.isin(column, [value for value in allowed if isinstance(value, numbers.Number)])
+        codes = self.codes[:self.size] if rows is None else self.codes[rows]
+        allowed_codes = [self.categories[value] for value in allowed
+                         if _hashable(value) and value in self.categories]
+        return np.isin(codes, allowed_codes)
+
+    def _contains(self, value, rows):
+        mask = np.zeros(self.size, dtype=bool)
+        if self.numeric:
+            return mask if rows is None else mask[rows]
+        if _hashable(value):
+            matching = self.members.get(value)
+            if matching:
+                mask[np.fromiter(matching, dtype=np.int64, count=len(matching))] = True
+        if isinstance(value, str):
+            text_rows = np.flatnonzero(self.text[:self.size])
+            if len(text_rows):
+                mask[text_rows] |= np.char.find(self.values[text_rows].astype(str), value) >= 0
+        return mask if rows is None else mask[rows]
+
+    def _encode(self, row, value):
+        if value is None:
+            return
+        if isinstance(value, (list, tuple, set)):
+            for item in value:
+                if _hashable(item):
+                    self.members.setdefault(item, set()).add(row)
+        if isinstance(value, (list, tuple, set)) or not _hashable(value):
+            self.codes[row] = UNCODED
+            return
+        self.codes[row] = self.categories.setdefault(value, len(self.categories))
+        self.text[row] = isinstance(value, str)
+
+    def _convert(self, numeric):
+        """
+        Changes the column's type once its first value is present, or to object once a
+        numeric column gets a non-numeric value.
+        """
+        current = self.values[:self.size]
+        self.numeric = numeric
+        if numeric:
+            self.values = np.full(len(self.values), np.nan, dtype=np.float64)  # Every row so far is missing
+            return
+        values = self.values
+        if values.dtype != object:
+            values = np.empty(len(self.values), dtype=object)
+            values[:self.size] = np.where(np.isnan(current), None, current.astype(object))
+        self.values = values
+        self.codes = np.full(len(values), MISSING, dtype=np.int64)
+        self.text = np.zeros(len(values), dtype=bool)
+        self.categories, self.members = {}, {}
+        for row in range(self.size):
+            self._encode(row, values[row])
+
+    def _reserve(self, rows):
+        capacity = len(self.values)
+        if rows <= capacity:
+            return
+        capacity = max(16, capacity * 2, rows)
+        for name in ("values", "codes", "text"):
+            array = getattr(self, name)
+            grown = np.empty(capacity, dtype=array.dtype)
+            grown[:len(array)] = array
+            setattr(self, name, grown)
+
+def _is_number(value):
+    return isinstance(value, numbers.Number) and not isinstance(value, bool)
+
+def _hashable(value):
+    try:
+        hash(value)
+    except TypeError:
+        return False
+    return True
+
+def record_attributes(model_type, data, fields=()):
+    """
+    Extracts the filterable attributes of a record: its model plus those of the declared
+    fields that are top-level scalars or lists of scalars (e.g. tags). Other fields are
+    not stored with the embedding.
+    """
+    attributes = {"model": model_type}
+    if isinstance(data, dict):
+        for key in fields:
+            value = data.get(key)
+            if isinstance(value, (str, numbers.Number)):
+                attributes[key] = value
+            elif isinstance(value, list) and all(isinstance(item, (str, numbers.Number)) for item in value):
+                attributes[key] = value
+    return attributes
@@ -0,0 +1,134 @@
+import numpy as np
+from typing import Optional
+from .ann_index import normalize_rows
+
+class ScalarQuantizer:
+    """
+    Scalar int8 quantization of unit-normalised embeddings.
+    Each dimension is mapped linearly onto 256 levels between its trained min and max,
+    so a D-dimensional vector takes D bytes instead of 4 * D.
+    """
+    min_train_size = 256
+
+    def __init__(self, chunk_rows: int = 65536):
+        self.chunk_rows = chunk_rows  # Rows decoded at a time while scoring
+        self.offset = None
+        self.scale = None
+
+    def is_trained(self):
+        return self.offset is not None
+
+    def train(self, vectors):
+        units = normalize_rows(vectors)
+        self.offset = units.min(axis=0)
+        self.scale = np.maximum(units.max(axis=0) - self.offset, 1e-12) / 255.0
+
+    def encode(self, vectors):
+        units = normalize_rows(vectors)
+        return np.clip(np.rint((units - self.offset) / self.scale), 0, 255).astype(np.uint8)
+
+    def scores(self, query_unit, codes):
+        """
+        Returns approximate cosine similarities of a unit query against encoded rows.
+        The query is folded into the dequantization: q . (offset + scale * code).
+        """
+        weights = (query_unit * self.scale).astype(np.float32)
+        bias = float(query_unit @ self.offset)
+        scores = np.empty(codes.shape[0], dtype=np.float32)
+        for start in range(0, codes.shape[0], self.chunk_rows):
+            block = codes[start:start + self.chunk_rows]
+            scores[start:start + block.shape[0]] = block.astype(np.float32) @ weights + bias
+        return scores
+
+class ProductQuantizer:
+    """
+    Product quantization of unit-normalised embeddings.
+    Vectors are split into n_subvectors slices (by default one per 4 dimensions), each
+    encoded as the id of its nearest of 256 k-means centroids, so a vector takes
+    n_subvectors bytes. Scoring uses asymmetric
+    distance tables: the query is compared with every centroid once and row scores are
+    sums of table lookups.
+    """
+    min_train_size = 256
+
+    def __init__(self, n_subvectors: Optional[int] = None, kmeans_iterations: int = 15, max_train_samples: int = 65536,
+                 chunk_rows: int = 65536, seed: int = 0):
+        self.n_subvectors = n_subvectors
+        self.kmeans_iterations = kmeans_iterations
+        self.max_train_samples = max_train_samples
+        self.chunk_rows = chunk_rows
+        self.seed = seed
+        self.codebooks = None  # (n_subvectors, n_centroids, sub_dim)
+
+    def is_trained(self):
+        return self.codebooks is not None
+
+    def train(self, vectors):
+        units = normalize_rows(vectors)
+        if self.n_subvectors is None:
+            self.n_subvectors = max(1, units.shape[1] // 4)
+            while units.shape[1] % self.n_subvectors:
+                self.n_subvectors -= 1
+        if units.shape[1] % self.n_subvectors:
+            raise ValueError(f"Dimension {units.shape[1]} is not divisible by {self.n_subvectors} subvectors")
+        rng = np.random.default_rng(self.seed)
+        if units.shape[0] > self.max_train_samples:
+            units = units[rng.choice(units.shape[0], self.max_train_samples, replace=False)]
+        n_centroids = min(256, units.shape[0])
+
+        codebooks = []
+        for sub in self._split(units):
+            centroids = sub[rng.choice(sub.shape[0], n_centroids, replace=False)].copy()
+            for _ in range(self.kmeans_iterations):
+                assignments = self._nearest(sub, centroids)
+                counts = np.bincount(assignments, minlength=n_centroids)
+                sums = np.zeros_like(centroids)
+                np.add.at(sums, assignments, sub)
+                filled = counts > 0
+                centroids[filled] = sums[filled] / counts[filled, np.newaxis]
+            codebooks.append(centroids)
+        self.codebooks = np.stack(codebooks).astype(np.float32)
+
+    def encode(self, vectors):
+        units = normalize_rows(vectors)
+        codes = np.empty((units.shape[0], self.n_subvectors), dtype=np.uint8)
+        for start in range(0, units.shape[0], self.chunk_rows):
+            block = units[start:start + self.chunk_rows]
+            for column, (sub, codebook) in enumerate(zip(self._split(block), self.codebooks)):
+                codes[start:start + block.shape[0], column] = self._nearest(sub, codebook)
+        return codes
+
+    def scores(self, query_unit, codes):
+        """
+        Returns approximate cosine similarities of a unit query against encoded rows.
+        """
+        sub_queries = self._split(query_unit[np.newaxis, :])
+        tables = np.stack([codebook @ sub_query[0] for codebook, sub_query in zip(self.codebooks, sub_queries)])
+        columns = np.arange(self.n_subvectors)
+        scores = np.empty(codes.shape[0], dtype=np.float32)
+        for start in range(0, codes.shape[0], self.chunk_rows):
+            block = codes[start:start + self.chunk_rows]
+            scores[start:start + block.shape[0]] = tables[columns, block].sum(axis=1)
+        return scores
+
+    def _split(self, vectors):
+        return np.split(np.asarray(vectors, dtype=np.float32), self.n_subvectors, axis=1)
+
+    def _nearest(self, vectors, centroids):
+        # argmin ||v - c||^2 == argmin (||c||^2 - 2 v.c)
+        distances = (centroids * centroids).sum(axis=1)[np.newaxis, :] - 2 * (vectors @ centroids.T)
+        return np.argmin(distances, axis=1)
+
+def make_quantizer(compression):
+    """
+    Returns a quantizer for compression="int8" or "pq", passing instances through unchanged.
+    """
+    if compression is None or compression is False:
+        return None
+    if compression == "int8":
+        return ScalarQuantizer()
+    if compression == "pq":
+        return ProductQuantizer()
+    if isinstance(compression, str):
+        raise ValueError(f"Unknown compression mode: {compression}")
+    return compression
@@ -1,37 +1,565 @@
 import numpy as np
-from typing import List, Dict
+from typing import List, Dict, Optional, Tuple
+from core.metrics import metrics
+from .ann_index import IVFFlatIndex
+from .vector_store import VectorFileStore
+from .quantization import make_quantizer
+from .attributes import AttributeTable
 
 class VectorDBInterface:
     """
     Interface for interacting with a vector database.
     This is a simplified in-memory implementation for demonstration purposes.
+
+    Embeddings are stored as rows of a preallocated, growable float32 matrix with their
+    L2 norms cached at insert time, so a search is a single matrix-vector product.
+    With a path, rows are persisted to an append-only VectorFileStore and the matrix is a
+    memory map of it; replaced and deleted rows are tombstoned rather than rewritten.
+    Opening one reads no ids or attributes until they are needed. Several processes may
+    share a store: writes first pick up the rows others committed, and refresh() does so
+    for readers.
+    An optional approximate index (index="ivf" or an IVFFlatIndex instance) restricts
+    scoring to the candidate rows it returns once enough embeddings have been added.
+    Optional compression ("int8" or "pq") keeps a compact code per row and scores the codes
+    directly, re-ranking the best rerank candidates against the float rows. It requires a
+    persistent store: the float rows stay on disk, where training, re-ranking and
+    get_embedding read them, and only the codes occupy RAM.
+    Rows can carry attributes that search filters are pushed down to (see AttributeTable).
     """
-    def __init__(self):
-        self.vectors = {}  # In-memory storage for vectors
+    def __init__(self, initial_capacity: int = 1024, batch_memory_limit: int = 256 * 1024 * 1024, index=None,
+                 path: Optional[str] = None, compression=None, rerank: int = 0,
+                 prefilter_threshold: float = 0.05):
+        if compression is not None and not path:
+            raise ValueError("Compression requires a persistent store (path); in memory the float rows would stay in RAM")
+        self.initial_capacity = initial_capacity
+        self.batch_memory_limit = batch_memory_limit  # Max bytes of scores and selection indices held per batch chunk
+        self.dim = None
+        self._matrix = None  # float32 matrix of shape (capacity, dim)
+        self._norms = None  # float32 L2 norm of each row
+        self._live = np.zeros(0, dtype=bool)  # False for deleted rows
+        self._size = 0  # Number of rows in use, including deleted ones
+        self._ids = []  # row -> data_id (a lazily read StoredIds for a persistent store)
+        self._id_index = {}  # data_id -> live row; built on first use for a persistent store
+        self.index = IVFFlatIndex() if index == "ivf" else index
+        self.quantizer = make_quantizer(compression)
+        self.rerank = rerank  # Candidates re-scored exactly when compression is enabled
+        self._codes = None  # Quantized code of each row
+        self._trained_size = 0  # Live rows when the quantizer was trained
+        self._attributes = AttributeTable()  # Read on first use for a persistent store
+        self.prefilter_threshold = prefilter_threshold  # Max selectivity scored via a prefilter bitmap
+        self._tombstone_offset = 0  # Bytes of the store's tombstone table already applied
+        self.store = VectorFileStore(path) if path else None
+        if self.store is not None:
+            self._open_store()
+
+    def __len__(self):
+        return self._live_count()
+
+    def __contains__(self, data_id):
+        return data_id in self._id_to_row
+
+    @property
+    def attributes(self) -> AttributeTable:
+        """
+        The AttributeTable of every row. A persistent store's is read on first use.
+        """
+        if self._attributes is None:
+            table = AttributeTable()
+            for _, row_attributes in self._ids.entries(0, self._size):
+                table.append(row_attributes)
+            self._attributes = table
+        return self._attributes
+
+    @property
+    def _id_to_row(self):
+        if self._id_index is None:
+            ids = list(self._ids)  # One read of the id sidecar
+            self._id_index = {ids[row]: row for row in np.flatnonzero(self._live[:self._size]).tolist()}
+        return self._id_index
+
+    def refresh(self):
+        """
+        Picks up the rows other processes appended to or deleted from the persistent store
+        since it was opened (writes do this on their own).
+        """
+        if self.store is None:
+            return
+        with self.store.locked():
+            if self.store.changed():
+                self._open_store()  # Compacted elsewhere: every row number changed
+                self._retrain()
+                return
+            rows = self.store.committed_rows()
+            if rows > self._size:
+                self._load_rows(rows)
+            self._load_tombstones()
+
+    def add_embedding(self, data_id: str, embedding: List[float], attributes: Optional[Dict] = None):
+        """
+        Adds a vector embedding to the database, with optional filterable attributes.
+        Re-adding an existing data_id replaces its embedding.
+        """
+        vector = self._as_vector(embedding)
+        norm = np.linalg.norm(vector)
+        if self.store is not None:
+            self.add_embeddings([data_id], vector[np.newaxis, :], [attributes])
+            return
+        row = self._id_to_row.get(data_id)
+        if row is None:
+            row = self._size
+            self._reserve(row + 1)
+            self._size += 1
+        self._matrix[row] = vector
+        self._norms[row] = norm
+        if row == len(self._ids):
+            self._ids.append(data_id)
+            self.attributes.append(attributes)
+        else:
+            self.attributes.set(row, attributes)
+        self._id_to_row[data_id] = row
+        self._live[row] = True
+        if self.index is not None:
+            self.index.add([row], vector[np.newaxis, :])
+        if self.quantizer is not None and self.quantizer.is_trained():
+            self._set_codes(row, self.quantizer.encode(vector[np.newaxis, :]))
+
+    def add_embeddings(self, data_ids: List[str], embeddings: np.ndarray, attributes: Optional[List[Dict]] = None):
+        """
+        Adds many embeddings as one matrix append (one write per file for a persistent store).
+        Existing data_ids are replaced; if an id repeats, its last embedding wins.
+        """
+        matrix = np.asarray(embeddings, dtype=np.float32)
+        if matrix.ndim == 1:
+            matrix = matrix[np.newaxis, :]
+        if matrix.shape[0] != len(data_ids):
+            raise ValueError(f"Got {matrix.shape[0]} embeddings for {len(data_ids)} ids")
+        if not len(data_ids):
+            return
+        self._as_vector(matrix[0])  # Fixes or checks the dimension
+        if matrix.shape[1] != self.dim:
+            raise ValueError(f"Embedding dimension {matrix.shape[1]} does not match {self.dim}")
+        attributes = list(attributes) if attributes is not None else [None] * len(data_ids)
+
+        last_position = {data_id: position for position, data_id in enumerate(data_ids)}
+        if len(last_position) < len(data_ids):
+            keep = sorted(last_position.values())
+            data_ids = [data_ids[position] for position in keep]
+            attributes = [attributes[position] for position in keep]
+            matrix = matrix[keep]
+        norms = np.linalg.norm(matrix, axis=1)
+        if self.store is not None:
+            # Append-only: the new rows are written to disk and the old ones tombstoned
+            with self.store.locked():
+                self.refresh()
+                for data_id in data_ids:
+                    if data_id in self._id_to_row:
+                        self.delete_embedding(data_id)
+                self.store.append(matrix, norms, data_ids, attributes)
+                self._load_rows(self.store.committed_rows())
+            return
+
+        for data_id in data_ids:
+            if data_id in self._id_to_row:
+                self.delete_embedding(data_id)
+        start, end = self._size, self._size + len(data_ids)
+        self._reserve(end)
+        self._matrix[start:end] = matrix
+        self._norms[start:end] = norms
+        self._size = end
+        for row, (data_id, row_attributes) in enumerate(zip(data_ids, attributes), start):
+            self._ids.append(data_id)
+            self.attributes.append(row_attributes)
+            self._id_to_row[data_id] = row
+        self._live[start:end] = True
+        if self.index is not None:
+            self.index.add(np.arange(start, end), matrix)
+        if self.quantizer is not None and self.quantizer.is_trained():
+            self._set_codes(start, self.quantizer.encode(matrix))
+
+    def delete_embedding(self, data_id: str) -> bool:
+        """
+        Deletes an embedding. Returns False if data_id is unknown.
+        """
+        if self.store is not None:
+            with self.store.locked():
+                self.refresh()
+                row = self._id_to_row.pop(data_id, None)
+                if row is not None:
+                    self.store.delete([row])
+        else:
+            row = self._id_to_row.pop(data_id, None)
+        if row is None:
+            return False
+        self._live[row] = False
+        if self.index is not None:
+            self.index.remove(row)
+        return True
+
+    def get_embedding(self, data_id: str) -> Optional[np.ndarray]:
+        """
+        Returns the stored embedding for data_id, or None if it is unknown.
+        """
+        row = self._id_to_row.get(data_id)
+        if row is None:
+            return None
+        return np.array(self._matrix[row])
+
+    def get_attributes(self, data_id: str) -> Optional[Dict]:
+        """
+        Returns the attributes stored with data_id, or None if it is unknown.
+        """
+        row = self._id_to_row.get(data_id)
+        if row is None:
+            return None
+        if self._attributes is None:
+            return self._ids.entries(row, row + 1)[0][1] or {}
+        return self.attributes.rows[row]
+
+    def compact(self):
+        """
+        Drops deleted rows, rewriting the on-disk store when persistence is enabled.
+        """
+        if self.store is not None:
+            with self.store.locked():
+                self.refresh()
+                rows, ids, attributes, matrix, norms = self._live_rows()
+                self._matrix = self._norms = None  # Release the memory maps before swapping files
+                self.store.rewrite(matrix, norms, ids, attributes)
+                self._open_store()
+        else:
+            rows, ids, attributes, self._matrix, self._norms = self._live_rows()
+            self._ids = ids
+            self._attributes = AttributeTable()
+            for row_attributes in attributes:
+                self._attributes.append(row_attributes)
+            self._id_index = {data_id: row for row, data_id in enumerate(ids)}
+            self._size = len(ids)
+            self._live = np.ones(self._size, dtype=bool)
+        self._retrain()
+
+    def _live_rows(self):
+        rows = np.flatnonzero(self._live[:self._size])
+        entries = self._ids.entries(0, self._size) if self.store is not None else \
+            list(zip(self._ids, self.attributes.rows))
+        ids = [entries[row][0] for row in rows.tolist()]
+        attributes = [entries[row][1] for row in rows.tolist()]
+        matrix = np.array(self._matrix[rows]) if self._size else None
+        norms = np.array(self._norms[rows]) if self._size else None
+        return rows, ids, attributes, matrix, norms
 
-    def add_embedding(self, data_id: str, embedding: List[float]):
+    def _retrain(self):
         """
-        Adds a vector embedding to the database.
+        Re-trains a trained index and re-encodes every row after row numbers changed.
         """
-        self.vectors[data_id] = embedding
+        if self.index is not None and self.index.is_trained():
+            rows = np.flatnonzero(self._live[:self._size])
+            self.index.train(self._matrix[rows], rows)
+        if self.quantizer is not None and self.quantizer.is_trained():
+            self._codes = None
+            if self._size:
+                self._set_codes(0, self.quantizer.encode(self._matrix[:self._size]))
 
-    def search_embedding(self, query_embedding: List[float], top_k: int = 5) -> List[Dict]:
+    def search_embedding(self, query_embedding: List[float], top_k: int = 5,
+                         nprobe: Optional[int] = None, exact: bool = False,
+                         rerank: Optional[int] = None, filters: Optional[Dict] = None) -> List[Dict]:
         """
         Searches for the most similar embeddings.
         Returns a list of dictionaries with data_id and similarity score.
+        With an approximate index, nprobe trades recall for speed; with compression, rerank
+        overrides how many code-scored candidates are re-scored exactly. exact=True bypasses both.
+        filters restricts results to rows whose attributes match (see AttributeTable).
         """
-        if not self.vectors:
+        if top_k <= 0 or not self._live_count():
+            return []
+
+        start = metrics.start()
+        query_vector = self._as_vector(query_embedding)
+        if filters:
+            rows, scores = self._filtered_search(query_vector, top_k, filters, nprobe, exact, rerank)
+        else:
+            rows, scores = self._search_rows(query_vector, top_k, nprobe, exact, rerank)
+        results = [{"data_id": data_id, "similarity": float(score)}
+                   for data_id, score in zip(self._take_ids(rows), scores.tolist())]
+        metrics.stop("vector.search", start)
+        return results
+
+    def _search_rows(self, query_vector, top_k, nprobe=None, exact=False, rerank=None):
+        """
+        Returns the rows and scores of the top_k live matches, best first.
+        """
+        rows = None
+        if not exact and self._index_ready():
+            rows = self.index.candidates(query_vector, nprobe)
+
+        if not exact and self._quantizer_ready():
+            query_norm = np.linalg.norm(query_vector)
+            query_unit = query_vector / query_norm if query_norm > 0 else query_vector
+            codes = self._codes[:self._size] if rows is None else self._codes[rows]
+            scores = self.quantizer.scores(query_unit, codes)
+            metrics.increment("vector.codes_scored", len(codes))
+            if rows is None:
+                scores[~self._live[:self._size]] = -np.inf
+                rows = np.arange(self._size)
+            rerank = self.rerank if rerank is None else rerank
+            if rerank:
+                rows = rows[top_k_rows(scores, max(top_k, rerank))]
+                scores = self._cosine_scores(query_vector, rows)
+        else:
+            scores = self._cosine_scores(query_vector, rows)
+            if rows is None:
+                scores[~self._live[:self._size]] = -np.inf
+
+        top = top_k_rows(scores, top_k)
+        selected = top if rows is None else rows[top]
+        live = self._live[selected]
+        return selected[live], scores[top][live]
+
+    def _filtered_search(self, query_vector, top_k, filters, nprobe=None, exact=False, rerank=None):
+        """
+        Returns the rows and scores of the top_k live matches satisfying the filters.
+        Selective filters are evaluated into a bitmap first and only matching rows are scored
+        (pre-filtering); otherwise the unfiltered search over-fetches by the inverse of the
+        estimated selectivity and the candidates are filtered afterwards (post-filtering).
+        """
+        live_rows = np.flatnonzero(self._live[:self._size])
+        selectivity = self.attributes.estimate_selectivity(filters, live_rows)
+
+        if selectivity <= self.prefilter_threshold:
+            rows = live_rows[self.attributes.evaluate(filters, live_rows)]
+            scores = self._cosine_scores(query_vector, rows)
+            top = top_k_rows(scores, top_k)
+            return rows[top], scores[top]
+
+        fetch = int(np.ceil(top_k / selectivity * 1.2))
+        while True:
+            rows, scores = self._search_rows(query_vector, fetch, nprobe, exact, rerank)
+            keep = self.attributes.evaluate(filters, rows)
+            if keep.sum() >= top_k or len(rows) < fetch or fetch >= len(live_rows):
+                return rows[keep][:top_k], scores[keep][:top_k]
+            fetch *= 2
+
+    def _cosine_scores(self, query_vector, rows=None):
+        """
+        Calculates exact cosine similarity against the given rows (all rows if None) at once.
+        """
+        if rows is None:
+            matrix, norms = self._matrix[:self._size], self._norms[:self._size]
+        else:
+            matrix, norms = self._matrix[rows], self._norms[rows]
+        metrics.increment("vector.rows_scored", len(matrix))
+        scores = matrix @ query_vector
+        denominators = norms * np.linalg.norm(query_vector)
+        return np.divide(scores, denominators, out=np.full_like(scores, -np.inf), where=denominators > 0)
+
+    def search_embeddings_batch(self, queries: np.ndarray, top_k: int = 5,
+                                chunk_size: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Searches for the most similar embeddings of many queries at once (always exact).
+        Queries are scored with one matrix-matrix product per chunk of chunk_size queries;
+        by default chunks are sized so the per-chunk score and selection arrays stay within
+        batch_memory_limit.
+        Returns (ids, scores) arrays of shape (Q, k), best match first in each row.
+        """
+        queries = np.asarray(queries, dtype=np.float32)
+        if queries.ndim == 1:
+            queries = queries[np.newaxis, :]
+        top_k = max(0, min(top_k, self._live_count()))
+        ids = np.empty((queries.shape[0], top_k), dtype=object)
+        scores = np.empty((queries.shape[0], top_k), dtype=np.float32)
+        if not top_k or not queries.shape[0]:
+            return ids, scores
+        if queries.shape[1] != self.dim:
+            raise ValueError(f"Embedding dimension {queries.shape[1]} does not match {self.dim}")
+
+        if chunk_size is None:
+            # Per query row: the float32 scores plus the int64 indices from argpartition
+            chunk_size = max(1, self.batch_memory_limit // (self._size * (4 + 8)))
+        matrix = self._matrix[:self._size]
+        norms = self._norms[:self._size]
+        excluded = ~self._live[:self._size] | (norms <= 0)
+        row_norms = np.where(norms > 0, norms, 1).astype(np.float32)
+
+        timer = metrics.start()
+        metrics.increment("vector.rows_scored", queries.shape[0] * self._size)
+        for start in range(0, queries.shape[0], chunk_size):
+            block = queries[start:start + chunk_size]
+            # Scores are normalised and negated in place so the chunk holds a single score matrix
+            block_scores = block @ matrix.T
+            query_norms = np.linalg.norm(block, axis=1)
+            block_scores /= np.where(query_norms > 0, query_norms, 1)[:, np.newaxis]
+            block_scores /= row_norms[np.newaxis, :]
+            block_scores[:, excluded] = -np.inf
+            block_scores[query_norms <= 0] = -np.inf
+            np.negative(block_scores, out=block_scores)
+
+            if top_k < self._size:
+                candidates = np.argpartition(block_scores, top_k - 1, axis=1)[:, :top_k]
+            else:
+                candidates = np.broadcast_to(np.arange(self._size), block_scores.shape)
+            candidate_scores = -np.take_along_axis(block_scores, candidates, axis=1)
+            order = np.argsort(-candidate_scores, axis=1, kind="stable")
+            rows = np.take_along_axis(candidates, order, axis=1)
+
+            ids[start:start + block.shape[0]] = np.array(self._take_ids(rows.ravel()), dtype=object).reshape(rows.shape)
+            scores[start:start + block.shape[0]] = np.take_along_axis(candidate_scores, order, axis=1)
+            del block_scores, candidates  # Freed before the next chunk allocates its own
+        metrics.stop("vector.search_batch", timer)
+        return ids, scores
+
+    def _index_ready(self):
+        """
+        Trains (or retrains) the approximate index when the store has grown enough.
+        """
+        if self.index is None:
+            return False
+        if self.index.needs_training(self._live_count()):
+            rows = np.flatnonzero(self._live[:self._size])
+            self.index.train(self._matrix[rows], rows)
+        return self.index.is_trained()
+
+    def _quantizer_ready(self):
+        """
+        Trains (or retrains) the quantizer and encodes every row once enough embeddings exist.
+        """
+        if self.quantizer is None:
+            return False
+        live_count = self._live_count()
+        trained = self.quantizer.is_trained()
+        if (not trained and live_count >= self.quantizer.min_train_size) or \
+                (trained and live_count >= 4 * self._trained_size):
+            rows = np.flatnonzero(self._live[:self._size])
+            self.quantizer.train(self._matrix[rows])
+            self._trained_size = live_count
+            self._codes = None
+            self._set_codes(0, self.quantizer.encode(self._matrix[:self._size]))
+        return self.quantizer.is_trained()
+
+    def _set_codes(self, row, codes):
+        """
+        Stores quantized codes starting at row, growing the code matrix as needed.
+        """
+        end = row + codes.shape[0]
+        capacity = 0 if self._codes is None else self._codes.shape[0]
+        if end > capacity:
+            grown = np.zeros((max(self.initial_capacity, capacity * 2, end), codes.shape[1]), dtype=codes.dtype)
+            if capacity:
+                grown[:capacity] = self._codes
+            self._codes = grown
+        self._codes[row:end] = codes
+
+    def memory_usage(self) -> Dict[str, int]:
+        """
+        Returns the bytes held in RAM by the float rows and their norms (0 when memory-mapped
+        from a persistent store) and by the codes.
+        """
+        in_memory = self.store is None and self._matrix is not None
+        return {
+            "vectors": int(self._matrix.nbytes + self._norms.nbytes) if in_memory else 0,
+            "codes": 0 if self._codes is None else int(self._codes.nbytes),
+        }
+
+    def _open_store(self):
+        """
+        Memory-maps the vectors of the persistent store and applies its tombstones; ids and
+        attributes are read when first needed.
+        """
+        with self.store.locked():
+            rows = self.store.open()
+            self.dim = self.store.dim
+            self._matrix = self._norms = None
+            self._size, self._live, self._tombstone_offset = 0, np.zeros(0, dtype=bool), 0
+            self._ids, self._id_index, self._attributes = self.store.ids(0), None, None
+            self._load_rows(rows)
+            self._load_tombstones()
+
+    def _load_rows(self, rows):
+        """
+        Maps the committed rows of the store beyond the ones already loaded.
+        """
+        start = self._size
+        if rows <= start:
+            return
+        self._reserve(rows)
+        self._size = rows
+        self._matrix, self._norms = self.store.map(rows)
+        self._ids = self.store.ids(rows)
+        self._live[start:rows] = True
+        if self._id_index is not None or self._attributes is not None:
+            entries = self._ids.entries(start, rows)
+            for row, (data_id, row_attributes) in enumerate(entries, start):
+                if self._id_index is not None:
+                    self._id_index[data_id] = row
+                if self._attributes is not None:
+                    self._attributes.append(row_attributes)
+        if self.index is not None:
+            self.index.add(np.arange(start, rows), self._matrix[start:rows])
+        if self.quantizer is not None and self.quantizer.is_trained():
+            self._set_codes(start, self.quantizer.encode(self._matrix[start:rows]))
+
+    def _load_tombstones(self):
+        """
+        Applies the rows deleted in the store since the tombstone table was last read.
+        """
+        deleted, self._tombstone_offset = self.store.tombstones(self._tombstone_offset)
+        for row in deleted[deleted < self._size].tolist():
+            self._live[row] = False
+            if self._id_index is not None and self._id_index.get(self._ids[row]) == row:
+                del self._id_index[self._ids[row]]
+            if self.index is not None:
+                self.index.remove(row)
+
+    def _live_count(self):
+        return int(np.count_nonzero(self._live[:self._size]))
+
+    def _take_ids(self, rows):
+        """
+        Returns the ids of the given rows.
+        """
+        rows = np.asarray(rows, dtype=np.int64)
+        if self.store is None:
+            return [self._ids[row] for row in rows.tolist()]
+        return self._ids.take(rows)
+
+    def _as_vector(self, embedding):
+        """
+        Converts an embedding to a float32 vector, fixing the dimension on first use.
+        """
+        vector = np.asarray(embedding, dtype=np.float32).ravel()
+        if self.dim is None:
+            self.dim = vector.shape[0]
+        elif vector.shape[0] != self.dim:
+            raise ValueError(f"Embedding dimension {vector.shape[0]} does not match {self.dim}")
+        return vector
+
+    def _reserve(self, rows):
+        """
+        Grows the backing matrix (or, for a persistent store, the live mask) so it can
+        hold at least the given number of rows.
+        """
+        capacity = self._live.shape[0]
+        if rows <= capacity:
+            return
+        new_capacity = max(self.initial_capacity, capacity * 2, rows)
+        live = np.zeros(new_capacity, dtype=bool)
+        live[:self._size] = self._live[:self._size]
+        self._live = live
+        if self.store is not None:
             return
+        matrix = np.empty((new_capacity, self.dim), dtype=np.float32)
+        norms = np.empty(new_capacity, dtype=np.float32)
+        if self._size:
+            matrix[:self._size] = self._matrix[:self._size]
+            norms[:self._size] = self._norms[:self._size]
+        self._matrix, self._norms = matrix, norms
 
-        query_vector = np.array(query_embedding)
-        similarities = {}
-        for data_id, vector in self.vectors.items():
-            vector = np.array(vector)
-            # Calculate cosine similarity
-            similarity = np.dot(query_vector, vector) / (np.linalg.norm(query_vector) * np.linalg.norm(vector))
-            similarities[data_id] = similarity
-
-        # Get top-k results
-        sorted_similarities = sorted(similarities.items(), key=lambda item: item[1], reverse=True)
-        top_results = [{"data_id": data_id, "similarity": score} for data_id, score in sorted_similarities[:top_k]]
-        return top_results
\ No newline at end of file
+def top_k_rows(scores, top_k):
+    """
+    Returns the indices of the top_k highest scores, best first.
+    Uses argpartition so only the selected rows are sorted.
+    """
+    top_k = min(top_k, scores.shape[0])
+    if top_k < scores.shape[0]:
+        candidates = np.argpartition(-scores, top_k - 1)[:top_k]
+    else:
+        candidates = np.arange(scores.shape[0])
+    return candidates[np.argsort(-scores[candidates], kind="stable")]
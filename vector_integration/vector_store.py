@@ -0,0 +1,286 @@
+import os
+import json
+import shutil
+import numpy as np
+from core.file_lock import FileLock
+
+class VectorFileStore:
+    """
+    Append-only on-disk storage for embeddings, shared by any number of processes.
+    Rows live in a raw float32 file and their cached norms in a parallel float32 file;
+    ids and row attributes are JSON lines in a sidecar, and a uint64 file records where
+    each row's line ends, so looking up the id of a row is one positioned read. Nothing
+    is parsed on open: the files are memory-mapped, so opening a store costs O(1)
+    regardless of its size. Deleted rows are listed in an int64 tombstone table.
+    Appends, deletes and compaction hold an exclusive lock on the store's lock file. A
+    row is committed once its line end is written, last; readers only see committed
+    rows, and the next writer cuts away the tail of an append torn by a crash.
+    """
+    def __init__(self, path):
+        self.path = path
+        self.meta_path = os.path.join(path, "meta.json")
+        self.vectors_path = os.path.join(path, "embeddings.f32")
+        self.norms_path = os.path.join(path, "norms.f32")
+        self.ids_path = os.path.join(path, "ids.jsonl")
+        self.offsets_path = os.path.join(path, "ids.u64")
+        self.tombstones_path = os.path.join(path, "tombstones.i64")
+        self.dim = None
+        self._lock = FileLock(path + ".lock")  # Beside the directory, which compaction replaces
+        self._inode = None  # Of the vector file when opened; changed by another process's compaction
+        if not os.path.exists(self.path):
+            with self._lock:
+                self._recover_compaction()
+                os.makedirs(self.path, exist_ok=True)
+
+    def files(self):
+        """
+        Returns the paths of the store's files and its directory.
+        """
+        return [self.meta_path, self.vectors_path, self.norms_path, self.ids_path, self.offsets_path,
+                self.tombstones_path, self.path]
+
+    def locked(self):
+        """
+        Returns the writers' lock. Hold it across reading the committed rows and appending,
+        so the rows an append creates are known.
+        """
+        return self._lock
+
+    def open(self):
+        """
+        Opens the store and returns the number of committed rows.
+        """
+        with self._lock:
+            try:
+                with open(self.meta_path, 'r') as f:
+                    self.dim = json.load(f)["dim"]
+            except FileNotFoundError:
+                self.dim, self._inode = None, None
+                return 0
+            self._inode = os.stat(self.vectors_path).st_ino
+            return self.committed_rows()
+
+    def changed(self):
+        """
+        Returns True if another process compacted the store since it was opened here.
+        """
+        try:
+            inode = os.stat(self.vectors_path).st_ino
+        except FileNotFoundError:
+            return self._inode is not None
+        return inode != self._inode
+
+    def committed_rows(self):
+        """
+        Returns the number of rows present in every file; a crash between the appends
+        leaves the files at different lengths.
+        """
+        if self.dim is None:
+            return 0
+        if not os.path.exists(self.offsets_path) and os.path.getsize(self.ids_path):
+            self._write_offsets()  # Stores written before line ends were recorded
+        return min(self._file_rows(self.vectors_path, self.dim * 4), self._file_rows(self.norms_path, 4),
+                   self._file_rows(self.offsets_path, 8))
+
+    def map(self, rows):
+        """
+        Memory-maps the first rows of the vector and norm files.
+        """
+        if not rows:
+            return None, None
+        matrix = np.memmap(self.vectors_path, dtype=np.float32, mode='r', shape=(rows, self.dim))
+        norms = np.memmap(self.norms_path, dtype=np.float32, mode='r', shape=(rows,))
+        return matrix, norms
+
+    def ids(self, rows):
+        """
+        Returns the ids of the first rows as a lazily read sequence.
+        """
+        return StoredIds(self, rows)
+
+    def tombstones(self, offset=0):
+        """
+        Returns the deleted rows recorded from byte offset on, and the offset to read from next.
+        """
+        try:
+            with open(self.tombstones_path, 'rb') as f:
+                f.seek(offset)
+                payload = f.read()
+        except FileNotFoundError:
+            return np.empty(0, dtype=np.int64), offset
+        payload = payload[:len(payload) - len(payload) % 8]  # A torn entry is read once complete
+        return np.frombuffer(payload, dtype=np.int64), offset + len(payload)
+
+    def append(self, vectors, norms, ids, attributes=None):
+        """
+        Appends rows to the store and returns the row number of the first. The line ends
+        are written last and act as the commit record.
+        """
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+        with self._lock:
+            if self.dim is None and not os.path.exists(self.meta_path):
+                self.dim = vectors.shape[1]
+                with open(self.meta_path, 'w') as f:
+                    json.dump({"dim": self.dim, "dtype": "float32"}, f)
+                for path in (self.vectors_path, self.norms_path, self.ids_path, self.offsets_path):
+                    open(path, 'ab').close()
+                self._inode = os.stat(self.vectors_path).st_ino
+            elif self.dim is None:
+                self.open()
+            start = self._cut_torn_tail()
+            lines = [_id_line(data_id, row_attributes).encode("utf-8")
+                     for data_id, row_attributes in zip(ids, attributes or [None] * len(ids))]
+            with open(self.vectors_path, 'ab') as f:
+                f.write(vectors.tobytes())
+            with open(self.norms_path, 'ab') as f:
+                f.write(np.ascontiguousarray(norms, dtype=np.float32).tobytes())
+            with open(self.ids_path, 'ab') as f:
+                base = f.tell()
+                f.write(b"".join(lines))
+            with open(self.offsets_path, 'ab') as f:
+                f.write((np.uint64(base) + np.cumsum([len(line) for line in lines], dtype=np.uint64)).tobytes())
+            return start
+
+    def delete(self, rows):
+        """
+        Records rows as deleted in the tombstone table.
+        """
+        with self._lock:
+            with open(self.tombstones_path, 'ab') as f:
+                f.write(np.asarray(rows, dtype=np.int64).tobytes())
+
+    def rewrite(self, vectors, norms, ids, attributes=None):
+        """
+        Replaces the store contents with the given rows (used by compaction).
+        The new store is built beside the old one and swapped in by renaming directories.
+        """
+        with self._lock:
+            compact_path = self.path + ".compact"
+            shutil.rmtree(compact_path, ignore_errors=True)
+            compacted = VectorFileStore(compact_path)
+            if len(ids):
+                compacted.append(vectors, norms, ids, attributes)
+            os.rename(self.path, self.path + ".old")
+            os.rename(compact_path, self.path)
+            shutil.rmtree(self.path + ".old")
+            if os.path.exists(compacted.locked().path):
+                os.remove(compacted.locked().path)
+            self.dim = compacted.dim
+
+    def _cut_torn_tail(self):
+        """
+        Cuts every file back to the committed rows, so the next append lands at the right
+        offsets, and returns their number. Only called with the lock held, when no append
+        can be in progress.
+        """
+        rows = self.committed_rows()
+        self._truncate(self.vectors_path, rows * self.dim * 4)
+        self._truncate(self.norms_path, rows * 4)
+        self._truncate(self.offsets_path, rows * 8)
+        self._truncate(self.ids_path, int(self._line_end(rows - 1)) if rows else 0)
+        if os.path.exists(self.tombstones_path):
+            tombstones, _ = self.tombstones()
+            if tombstones.nbytes != os.path.getsize(self.tombstones_path) or (tombstones >= rows).any():
+                # Torn tombstone, or tombstones of rows that were cut: later rows will reuse their numbers
+                with open(self.tombstones_path, 'wb') as f:
+                    f.write(tombstones[tombstones < rows].tobytes())
+        return rows
+
+    def _write_offsets(self):
+        ends, end = [], 0
+        with open(self.ids_path, 'rb') as f:
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break  # Torn final line
+                end += len(line)
+                ends.append(end)
+        with open(self.offsets_path + ".tmp", 'wb') as f:
+            f.write(np.asarray(ends, dtype=np.uint64).tobytes())
+        os.replace(self.offsets_path + ".tmp", self.offsets_path)
+
+    def _line_end(self, row):
+        with open(self.offsets_path, 'rb') as f:
+            f.seek(row * 8)
+            return int(np.frombuffer(f.read(8), dtype=np.uint64)[0])
+
+    def _recover_compaction(self):
+        """
+        Finishes or rolls back a compaction interrupted between its directory renames.
+        """
+        old_path, compact_path = self.path + ".old", self.path + ".compact"
+        if not os.path.exists(self.path):
+            if os.path.exists(compact_path) and os.path.exists(old_path):
+                os.rename(compact_path, self.path)
+            elif os.path.exists(old_path):
+                os.rename(old_path, self.path)
+        shutil.rmtree(old_path, ignore_errors=True)
+        shutil.rmtree(compact_path, ignore_errors=True)
+
+    def _truncate(self, path, size):
+        try:
+            if os.path.getsize(path) > size:
+                os.truncate(path, size)
+        except FileNotFoundError:
+            pass
+
+    def _file_rows(self, path, row_bytes):
+        try:
+            return os.path.getsize(path) // row_bytes
+        except FileNotFoundError:
+            return 0
+
+class StoredIds:
+    """
+    Read-only sequence of the ids of a store's first rows, read from the sidecar on demand.
+    """
+    def __init__(self, store, rows):
+        self.store = store
+        self.rows = rows
+        self._ends = np.memmap(store.offsets_path, dtype=np.uint64, mode='r', shape=(rows,)) if rows else None
+
+    def __len__(self):
+        return self.rows
+
+    def __getitem__(self, row):
+        row = int(row)
+        return self.entries(row, row + 1)[0][0]
+
+    def __iter__(self):
+        return (data_id for data_id, _ in self.entries(0, self.rows))
+
+    def take(self, rows):
+        """
+        Returns the ids of the given rows, reading the whole sidecar once if they are many.
+        """
+        unique = np.unique(rows).tolist()
+        if len(unique) * 64 > self.rows:
+            ids = [data_id for data_id, _ in self.entries(0, self.rows)]
+            return [ids[row] for row in rows.tolist()]
+        lookup = {}
+        with open(self.store.ids_path, 'rb') as f:
+            for row in unique:
+                begin = int(self._ends[row - 1]) if row else 0
+                f.seek(begin)
+                lookup[row] = json.loads(f.read(int(self._ends[row]) - begin))["id"]
+        return [lookup[row] for row in rows.tolist()]
+
+    def entries(self, start, end):
+        """
+        Returns the (id, attributes) pairs of rows start..end-1, reading their lines at once.
+        """
+        if start == end:
+            return []
+        if not 0 <= start < end <= self.rows:
+            raise IndexError(f"Rows {start}..{end} out of range for {self.rows} rows")
+        begin = int(self._ends[start - 1]) if start else 0
+        with open(self.store.ids_path, 'rb') as f:
+            f.seek(begin)
+            payload = f.read(int(self._ends[end - 1]) - begin)
+        entries = [json.loads(line) for line in payload.splitlines()]
+        return [(entry["id"], entry.get("attributes")) for entry in entries]
+
+def _id_line(data_id, attributes):
+    entry = {"id": data_id}
+    if attributes:
+        entry["attributes"] = attributes
+    return json.dumps(entry) + "\n"